@@ -1,219 +1,3352 @@
-import pyndi
+import ndi_runtime
 import numpy as np
 import sounddevice as sd
+import argparse
 import json
 import os
+import tempfile
 import threading
-import librosa
+import logging
+import math
+import multiprocessing
+import queue
+import re
+import struct
 import time
-from pydub import AudioSegment
-from pydub.effects import equalize, compressor
+from bisect import bisect_right
+from multiprocessing import shared_memory
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter, sosfilt
+try:
+    import soundfile  # only needed for FLAC recording
+except ImportError:
+    soundfile = None
 from tkinter import Tk, Frame, Label, Entry, Button, OptionMenu, StringVar, Scale, HORIZONTAL, TOP, LEFT, messagebox
 from tkinter import filedialog
 from tkinter import Canvas, Checkbutton, IntVar
 
 # Define constants
 CONFIG_FILE_NAME = 'ndi_source_config.json'
+CONFIG_DEBOUNCE_SECONDS = 1.0
+CONFIG_MAX_DELAY_SECONDS = 10.0
+CONFIG_POLL_SECONDS = 0.5
 DEFAULT_NDI_NAMES = ['NDI Source 1', 'NDI Source 2', 'NDI Source 3']
+DEFAULT_SAMPLE_RATE = 48000
+DEFAULT_CHANNELS = 2
+DEFAULT_BLOCKSIZE = 1024
+DEFAULT_LATENCY_PROFILE = 'program'
+LATENCY_PROFILES = {
+    # Small blocks and a short jitter buffer for IFB and talkback
+    'talkback': {'blocksize': 128, 'min_blocksize': 64, 'max_blocksize': 256, 'target_latency_ms': 10, 'stream_latency': 'low'},
+    # Roomy blocks for program mixing, where a dropout costs more than a few milliseconds
+    'program': {'blocksize': 1024, 'min_blocksize': 256, 'max_blocksize': 2048, 'target_latency_ms': 40, 'stream_latency': 'high'},
+}
+BLOCKSIZE_ADAPT_SECONDS = 2.0
+BLOCKSIZE_STEP_UP_LOAD = 0.7
+BLOCKSIZE_STEP_DOWN_LOAD = 0.3
+BLOCKSIZE_CALM_INTERVALS = 5
+DISCOVERY_INTERVAL_SECONDS = 5.0
+DEFAULT_CONTROL_HOST = '127.0.0.1'
+DEFAULT_CONTROL_PORT = 8765
+GAIN_SMOOTHING_MS = 10
+AUTOMIX_ATTACK_MS = 5
+AUTOMIX_RELEASE_MS = 150
+AUTOMIX_HOLD_DB = -55.0  # below this total level the gains freeze, holding the last mic open
+AUTOMIX_FLOOR_DB = -40.0
+DEFAULT_SCENE_FADE_SECONDS = 1.0
+SCENE_CONTROL_SECONDS = 0.02
+EQ_BAND_PARAMETERS = ['eq_low_db', 'eq_mid_db', 'eq_high_db']
+EQ_BAND_TYPES = ['peak', 'lowshelf', 'highshelf', 'lowpass', 'highpass']
+SOURCE_PARAMETERS = np.dtype([
+    ('gain', 'f4'), ('mute', 'f4'), ('delay_ms', 'f4'), ('invert', 'f4'), ('phase_deg', 'f4'),
+    ('eq_enabled', 'f4'), ('eq_low_db', 'f4'), ('eq_mid_db', 'f4'), ('eq_high_db', 'f4'),
+    ('compression_enabled', 'f4'), ('compression_threshold_db', 'f4'),
+    ('automix', 'f4'), ('automix_weight', 'f4'),
+])
+MASTER_PARAMETERS = np.dtype([
+    ('gain', 'f4'), ('eq_enabled', 'f4'), ('eq_low_db', 'f4'), ('eq_mid_db', 'f4'), ('eq_high_db', 'f4'),
+    ('compression_enabled', 'f4'), ('compression_threshold_db', 'f4'),
+    ('phase_enabled', 'f4'), ('invert', 'f4'), ('phase_deg', 'f4'), ('automix_enabled', 'f4'),
+])
+DEFAULT_SOURCE_PARAMETERS = {'gain': 1.0, 'compression_threshold_db': -18.0, 'automix': 1.0, 'automix_weight': 1.0}
+DEFAULT_MASTER_PARAMETERS = {'gain': 1.0, 'compression_threshold_db': -18.0}
+DEFAULT_TARGET_LATENCY_MS = 40
+RING_BUFFER_SECONDS = 1.0
+RESAMPLER_TAPS = 32
+RESAMPLER_PHASES = 256
+RESAMPLER_BANDWIDTH = 0.95
+DRIFT_SMOOTHING_SECONDS = 1.0
+DRIFT_KP = 0.2
+DRIFT_KI = 0.01
+DRIFT_MAX_PPM = 1000
+DEFAULT_EQ_BANDS = [
+    {'type': 'lowshelf', 'freq': 100.0, 'gain_db': 0.0, 'q': 0.707},
+    {'type': 'peak', 'freq': 1000.0, 'gain_db': 0.0, 'q': 1.0},
+    {'type': 'highshelf', 'freq': 8000.0, 'gain_db': 0.0, 'q': 0.707},
+]
+CONTROL_BLOCK = 16
+TRUE_PEAK_OVERSAMPLING = 4
+TRUE_PEAK_TAPS = 12
+DEFAULT_LIMITER_CEILING = 0.9
+MAX_DELAY_SECONDS = 5.0
+DELAY_CROSSFADE_MS = 20
+MAX_GAIN = 4.0  # +12 dB above the faders' unity
+MAX_EQ_GAIN_DB = 24.0
+MAX_AUTOMIX_WEIGHT = 10.0
+# What the parameter store accepts; booleans are stored as 0/1 and phase_deg is wrapped to [-180, 180)
+PARAMETER_RANGES = {
+    'gain': (0.0, MAX_GAIN), 'delay_ms': (0.0, MAX_DELAY_SECONDS * 1000),
+    'eq_low_db': (-MAX_EQ_GAIN_DB, MAX_EQ_GAIN_DB), 'eq_mid_db': (-MAX_EQ_GAIN_DB, MAX_EQ_GAIN_DB),
+    'eq_high_db': (-MAX_EQ_GAIN_DB, MAX_EQ_GAIN_DB), 'compression_threshold_db': (-60.0, 0.0),
+    'automix_weight': (0.0, MAX_AUTOMIX_WEIGHT),
+}
+BOOLEAN_PARAMETERS = {'mute', 'invert', 'eq_enabled', 'compression_enabled', 'phase_enabled', 'automix', 'automix_enabled'}
+# Olli Niemitalo's all-pass pairs; their outputs stay 90 degrees apart across most of the audio band
+HILBERT_PATH_A = [0.6923878, 0.9360654322959, 0.9882295226860, 0.9987488452737]
+HILBERT_PATH_B = [0.4021921162426, 0.8561710882420, 0.9722909545651, 0.9952884791278]
+METER_SLOTS = 16
+METER_QUEUE_SECONDS = 0.1
+METER_POLL_SECONDS = 0.01
+METER_REFRESH_MS = 33
+METER_FLOOR_DB = -120.0
+METER_PEAK_FALL_DB_PER_SECOND = 20.0
+METER_RMS_MS = 300
+LOUDNESS_BIN_SECONDS = 0.1
+ALARM_CONDITIONS = ['silence', 'clipping', 'dc_offset', 'feedback']
+ALARM_DECIMATION = 4  # the monitor keeps one averaged sample in four
+ALARM_HISTORY_SECONDS = 6.0
+ALARM_INTERVAL_SECONDS = 0.5
+ALARM_SILENCE_SECONDS = 4.0
+ALARM_SILENCE_DB = -60.0
+ALARM_CLIP_LEVEL = 0.999
+ALARM_CLIP_SECONDS = 2.0
+ALARM_CLIP_RATIO = 0.001  # share of the window's samples at full scale
+ALARM_DC_SECONDS = 2.0
+ALARM_DC_LEVEL = 0.02
+ALARM_FFT_SIZE = 4096
+ALARM_FEEDBACK_MIN_HZ = 100.0
+ALARM_FEEDBACK_MIN_DB = -50.0
+ALARM_FEEDBACK_PROMINENCE_DB = 30.0  # peak bin over the spectrum's median
+ALARM_FEEDBACK_GROWTH_DB = 6.0  # rise across ALARM_FEEDBACK_HISTORY analyses
+ALARM_FEEDBACK_HISTORY = 4
+SENDER_POOL_SIZE = 8
+SENDER_QUEUE_SECONDS = 0.05
+DSP_HEADER_FIELDS = 8  # int64 words ahead of each shared block: frames, stop flag, spare
+DSP_FRAMES = 0
+DSP_STOP = 1
+DSP_DEADLINE_FRACTION = 0.5  # share of the block period the callback waits for the workers
+DSP_WORKER_JOIN_SECONDS = 1.0
+DSP_CONTROL_POLL_SECONDS = 0.05  # how often an idle worker checks for control messages
+DSP_SYNC_SECONDS = 1.0
+RECEIVER_JOIN_SECONDS = 1.0
+DSP_POOL_RETIRE_SECONDS = 1.0
+SENDER_POLL_SECONDS = 0.002
+TELEMETRY_STAGES = ['ring', 'delay', 'phase', 'eq', 'dynamics', 'workers', 'mix', 'master_eq', 'master_compressor',
+                    'master_phase', 'limiter', 'send', 'buses', 'meters', 'record']
+TELEMETRY_HISTOGRAM_US = np.geomspace(50, 200000, 37)  # 50 us to 200 ms, four bins per octave
+TELEMETRY_LOG_SECONDS = 60.0
+RECORD_FORMATS = ['wav', 'flac']
+RECORD_QUEUE_SECONDS = 2.0  # audio the tap holds while the disk is slow
+RECORD_POLL_SECONDS = 0.05
+RECORD_PREROLL_SECONDS = 5.0
+RECORD_ROTATE_SECONDS = 3600.0
+RECORD_HEADER_SECONDS = 5.0  # how often an open WAV's sizes are brought up to date
+RECORD_FILE_BUFFER_BYTES = 4 * 1024 * 1024
+RECORD_FLAC_SUBTYPE = 'PCM_24'
+WAVE_FLOAT_GUID = bytes.fromhex('0300000000001000800000aa00389b71')
+MOMENTARY_BINS = 4
+SHORT_TERM_BINS = 30
 
 # Configuration class
 class Configuration:
-    def __init__(self, file_name):
+    # The saved mixer: source list, full mixer settings and named snapshots. Everything
+    # reads the in-memory copy; changes reach disk from a background thread once they
+    # settle, through a temp file renamed over the old one, so a crash mid-write leaves
+    # either the previous file or the new one and never half of either.
+    def __init__(self, file_name, debounce_seconds=CONFIG_DEBOUNCE_SECONDS):
         self.file_name = file_name
+        self.debounce_seconds = debounce_seconds
+        self.data = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.changed_at = 0.0
+        self.writer = None
 
     def read(self):
-        if os.path.exists(self.file_name):
-            with open(self.file_name, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {
-                'ndi_sources': DEFAULT_NDI_NAMES
-            }
-            self.write(config)
-        return config
+        if self.data is None:
+            if os.path.exists(self.file_name):
+                with open(self.file_name, 'r') as f:
+                    self.data = json.load(f)
+            else:
+                self.data = {
+                    'ndi_sources': DEFAULT_NDI_NAMES
+                }
+                self.write(self.data)
+        return self.data
 
     def write(self, config):
-        with open(self.file_name, 'w') as f:
-            json.dump(config, f)
+        self.write_text(json.dumps(config))
+
+    def write_text(self, text):
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        fd, temp_name = tempfile.mkstemp(prefix='.' + os.path.basename(self.file_name) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, self.file_name)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except OSError:
+                pass
+            raise
+
+    def update(self, **fields):
+        # Change top-level fields in memory and schedule a write
+        self.read()
+        with self.lock:
+            self.data.update(fields)
+        self.schedule_write()
 
     def update_ndi_sources(self, ndi_sources):
-        config = self.read()
-        config['ndi_sources'] = ndi_sources
-        self.write(config)
+        self.update(ndi_sources=list(ndi_sources))
+
+    def schedule_write(self):
+        self.changed_at = time.monotonic()
+        self.dirty.set()
+        if self.writer is None:
+            self.writer = ConfigWriterThread(self)
+            self.writer.start()
+
+    def flush(self):
+        # Write pending changes now; the writer thread calls this once changes settle
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty.is_set():
+                    return
+                self.dirty.clear()
+                text = json.dumps(self.data)
+            self.write_text(text)
+
+    def snapshot_names(self):
+        return sorted(self.read().get('snapshots', {}))
+
+    def snapshot(self, name):
+        # A named snapshot's settings, straight from memory
+        return self.read().get('snapshots', {})[name]
+
+    def store_snapshot(self, name, settings):
+        self.read()
+        with self.lock:
+            snapshots = dict(self.data.get('snapshots', {}))
+            snapshots[name] = settings
+            self.data['snapshots'] = snapshots
+        self.schedule_write()
+
+    def delete_snapshot(self, name):
+        self.read()
+        with self.lock:
+            snapshots = dict(self.data.get('snapshots', {}))
+            del snapshots[name]
+            self.data['snapshots'] = snapshots
+        self.schedule_write()
+
+class ConfigWriterThread(threading.Thread):
+    # Writes the configuration once it has been quiet for debounce_seconds, but never
+    # holds a change back for longer than CONFIG_MAX_DELAY_SECONDS
+    def __init__(self, config):
+        super().__init__(daemon=True)
+        self.config = config
+
+    def run(self):
+        while True:
+            self.config.dirty.wait()
+            first_change = time.monotonic()
+            while True:
+                now = time.monotonic()
+                write_at = min(self.config.changed_at + self.config.debounce_seconds,
+                               first_change + CONFIG_MAX_DELAY_SECONDS)
+                if now >= write_at:
+                    break
+                time.sleep(write_at - now)
+            try:
+                self.config.flush()
+            except Exception:
+                logging.exception("Writing %s failed", self.config.file_name)
+                time.sleep(self.config.debounce_seconds)
+
+class MixerAutosaveThread(threading.Thread):
+    # Polls the mixer's settings and hands any change to the configuration to be saved
+    def __init__(self, config, mixer, interval=CONFIG_POLL_SECONDS):
+        super().__init__(daemon=True)
+        self.config = config
+        self.mixer = mixer
+        self.interval = interval
+        self.saved = config.read().get('mixer')
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.save()
+            except Exception:
+                logging.exception("Saving the mixer settings failed")
+
+    def save(self):
+        settings = self.mixer.settings()
+        if settings != self.saved:
+            self.config.update(ndi_sources=list(self.mixer.ndi_names), mixer=settings)
+            self.saved = settings
+
+    def stop(self):
+        self.stop_event.set()
+
+# Parameter store
+def finite_number(value, name):
+    # float(value), refusing null, strings and NaN/Infinity (which Python's json accepts)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+class ParameterStore:
+    # Typed parameter tables shared by every control surface (Tk, remote control,
+    # scripts) and the engine. Writers update one field at a time; the audio
+    # callback reads the arrays directly without taking a lock.
+    def __init__(self, num_sources, sources=None, master=None, listener=None):
+        self.sources = np.zeros(num_sources, dtype=SOURCE_PARAMETERS)
+        for name, value in DEFAULT_SOURCE_PARAMETERS.items():
+            self.sources[name] = value
+        if sources is not None:
+            count = min(num_sources, len(sources))
+            self.sources[:count] = sources[:count]
+        self.master = np.zeros(1, dtype=MASTER_PARAMETERS)
+        for name, value in DEFAULT_MASTER_PARAMETERS.items():
+            self.master[name] = value
+        if master is not None:
+            self.master[:] = master
+        self.listener = listener
+        self.version = 0
+
+    def resized(self, num_sources):
+        return ParameterStore(num_sources, self.sources, self.master, self.listener)
+
+    def removed(self, index):
+        return ParameterStore(len(self.sources) - 1, np.delete(self.sources, index), self.master, self.listener)
+
+    def set_source(self, index, name, value):
+        value = self.checked_value(name, value)
+        self.sources[name][index] = value
+        self.changed(index, name, value)
+
+    def set_master(self, name, value):
+        value = self.checked_value(name, value)
+        self.master[name][0] = value
+        self.changed(None, name, value)
+
+    def update(self, values, index=None):
+        # Apply a dict of values to one source, or to the master when index is None. Every
+        # value is checked before any is stored, so a bad field leaves the tables untouched.
+        values = self.checked(values, MASTER_PARAMETERS if index is None else SOURCE_PARAMETERS)
+        for name, value in values.items():
+            if index is None:
+                self.set_master(name, value)
+            else:
+                self.set_source(index, name, value)
+
+    @staticmethod
+    def checked(values, fields):
+        # Known fields with finite numeric values only; a NaN gain would stick in the mix engine's smoothing
+        if not isinstance(values, dict):
+            raise TypeError("Parameters must be a JSON object")
+        checked = {}
+        for name, value in values.items():
+            if name not in fields.names:
+                raise KeyError(f"Unknown parameter {name}")
+            checked[name] = ParameterStore.checked_value(name, value)
+        return checked
+
+    @staticmethod
+    def checked_value(name, value):
+        # The same limits the UI's controls have, so no control surface can store what they cannot show
+        value = finite_number(value, name)
+        if name in BOOLEAN_PARAMETERS:
+            return 1.0 if value else 0.0
+        if name == 'phase_deg':
+            return (value + 180.0) % 360.0 - 180.0
+        low, high = PARAMETER_RANGES.get(name, (-math.inf, math.inf))
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low:g} and {high:g}")
+        return value
+
+    def get_source(self, index, name):
+        return self.sources[name][index].item()
+
+    def get_master(self, name):
+        return self.master[name][0].item()
+
+    def replace(self, sources, master):
+        # Swap in whole tables at once, e.g. for a scene recall; listeners hear about each changed field
+        old_sources, old_master = self.sources, self.master
+        self.sources, self.master = sources, master
+        for name in SOURCE_PARAMETERS.names:
+            for index in np.flatnonzero(old_sources[name] != sources[name]):
+                self.changed(int(index), name, sources[name][index].item())
+        for name in MASTER_PARAMETERS.names:
+            if old_master[name][0] != master[name][0]:
+                self.changed(None, name, master[name][0].item())
+
+    def changed(self, index, name, value):
+        self.version += 1
+        if self.listener is not None:
+            self.listener(index, name, value)
+
+# Mix engine
+class GainFade:
+    # A linear move from one gain vector to the live targets over length frames
+    def __init__(self, from_gains, length):
+        self.from_gains = from_gains
+        self.length = length
+        self.position = 0
+
+class MixEngine:
+    # Holds one preallocated (sources, frames, channels) block and mixes it down
+    # with a single gain-vector product, so the audio callback allocates nothing.
+    # Gain changes from the parameter store are smoothed per sample, or follow a
+    # linear fade of a given length while a scene is being recalled.
+    def __init__(self, num_sources, max_frames, channels, parameters, samplerate=DEFAULT_SAMPLE_RATE):
+        self.num_sources = num_sources
+        self.max_frames = max_frames
+        self.channels = channels
+        self.parameters = parameters
+        self.source_block = np.zeros((num_sources, max_frames, channels), dtype=np.float32)
+        self.source_matrix = self.source_block.reshape(num_sources, max_frames * channels)
+        self.scaled_block = np.zeros((num_sources, max_frames, channels), dtype=np.float32)
+        self.scaled_matrix = self.scaled_block.reshape(num_sources, max_frames * channels)
+        self.ones = np.ones(num_sources, dtype=np.float32)
+        self.target_gains = np.zeros(num_sources, dtype=np.float32)
+        self.current_gains = np.zeros(num_sources, dtype=np.float32)
+        self.gain_delta = np.zeros(num_sources, dtype=np.float32)
+        self.gain_ramps = np.zeros((num_sources, max_frames), dtype=np.float32)
+        coef = math.exp(-1000 / (GAIN_SMOOTHING_MS * samplerate))
+        self.smoothing_curve = (coef ** np.arange(1, max_frames + 1)).astype(np.float32)
+        self.sample_index = np.arange(1, max_frames + 1, dtype=np.float32)
+        self.fade_progress = np.zeros(max_frames, dtype=np.float32)
+        self.fade = None
+        self.automix = AutoMixer(num_sources, samplerate)
+        self.update_target_gains()
+        self.current_gains[:] = self.target_gains
+
+    def source_buffer(self, index, frames):
+        # Preallocated (frames, channels) view that a source writes its block into
+        return self.source_block[index, :frames]
+
+    def update_target_gains(self):
+        # gain * (1 - mute) * master gain, straight from the parameter store
+        sources = self.parameters.sources
+        target = self.target_gains
+        np.subtract(1.0, sources['mute'], out=target)
+        target *= sources['gain']
+        target *= self.parameters.master['gain'][0]
+        if self.parameters.master['automix_enabled'][0]:
+            target *= self.automix.gains
+        return target
+
+    def start_fade(self, frames):
+        # Fade from the gains playing now to whatever the targets are over the next frames
+        self.fade = GainFade(self.current_gains.copy(), max(int(frames), 1))
+
+    def mix(self, outdata, frames):
+        # Sum all sources into outdata with one (sources,) @ (sources, frames * channels) product
+        samples = frames * self.channels
+        if self.parameters.master['automix_enabled'][0]:
+            self.automix.process(self.source_matrix, frames, samples, self.parameters.sources)
+        target = self.update_target_gains()
+        delta = self.gain_delta
+        fade = self.fade
+        if fade is not None:
+            # Scene fade: gains move linearly, sample by sample, from the recall point to the targets
+            progress = self.fade_progress[:frames]
+            np.add(self.sample_index[:frames], fade.position, out=progress)
+            progress *= 1.0 / fade.length
+            np.minimum(progress, 1.0, out=progress)
+            np.subtract(target, fade.from_gains, out=delta)
+            ramps = self.gain_ramps[:, :frames]
+            np.multiply(delta[:, None], progress[None, :], out=ramps)
+            ramps += fade.from_gains[:, None]
+            fade.position += frames
+            if fade.position >= fade.length:
+                self.fade = None
+            return self.mix_ramped(outdata, frames, samples, ramps)
+        np.subtract(self.current_gains, target, out=delta)
+        if np.abs(delta).max(initial=0.0) < 1e-6:
+            self.current_gains[:] = target
+            np.matmul(self.current_gains, self.source_matrix[:, :samples], out=outdata.reshape(samples))
+            return outdata
+
+        # A gain moved: ramp every source exponentially towards its target, sample by sample
+        ramps = self.gain_ramps[:, :frames]
+        np.multiply(delta[:, None], self.smoothing_curve[None, :frames], out=ramps)
+        ramps += target[:, None]
+        return self.mix_ramped(outdata, frames, samples, ramps)
+
+    def mix_ramped(self, outdata, frames, samples, ramps):
+        np.multiply(self.source_block[:, :frames], ramps[:, :, None], out=self.scaled_block[:, :frames])
+        np.matmul(self.ones, self.scaled_matrix[:, :samples], out=outdata.reshape(samples))
+        self.current_gains[:] = ramps[:, -1]
+        return outdata
+
+# Auto-mix
+class AutoMixer:
+    # Dugan-style gain sharing for open speech mics. Each participating source gets the
+    # share of the total weighted level that its own envelope makes up, as a power ratio,
+    # so the mix stays at about one open mic's worth of gain however many are live.
+    # Envelopes follow each block's mean square with a fast attack and slow release, and
+    # every source is updated in one vector step per block. When the whole room goes
+    # quiet the gains freeze, which leaves the last talker's mic open (last-mic-hold).
+    def __init__(self, num_sources, samplerate):
+        self.samplerate = samplerate
+        self.power = np.zeros(num_sources, dtype=np.float32)
+        self.envelope = np.zeros(num_sources, dtype=np.float32)
+        self.rising = np.zeros(num_sources, dtype=bool)
+        self.bypassed = np.zeros(num_sources, dtype=bool)
+        self.coef = np.zeros(num_sources, dtype=np.float32)
+        self.weighted = np.zeros(num_sources, dtype=np.float32)
+        self.gains = np.ones(num_sources, dtype=np.float32)
+        self.hold_power = 10 ** (AUTOMIX_HOLD_DB / 10)
+        self.floor = 10 ** (AUTOMIX_FLOOR_DB / 20)
+        self.holding = True
+
+    def process(self, source_matrix, frames, samples, sources):
+        # source_matrix is (sources, frames * channels), after the per-source DSP
+        block = source_matrix[:, :samples]
+        np.einsum('ij,ij->i', block, block, out=self.power)
+        self.power *= 1.0 / samples
+
+        # envelope = power + coef * (envelope - power), attack while rising, release while falling
+        attack = math.exp(-1000 * frames / (AUTOMIX_ATTACK_MS * self.samplerate))
+        release = math.exp(-1000 * frames / (AUTOMIX_RELEASE_MS * self.samplerate))
+        np.greater(self.power, self.envelope, out=self.rising)
+        np.multiply(self.rising, attack - release, out=self.coef)
+        self.coef += release
+        self.envelope -= self.power
+        self.envelope *= self.coef
+        self.envelope += self.power
+
+        # Muted sources and those left out of the auto-mix take no share and keep unity gain
+        weighted = self.weighted
+        np.subtract(1.0, sources['mute'], out=weighted)
+        weighted *= sources['automix']
+        weighted *= sources['automix_weight']
+        np.less_equal(weighted, 0.0, out=self.bypassed)
+        weighted *= self.envelope
+        total = weighted.sum()
+        self.holding = bool(total < self.hold_power)
+        if not self.holding:
+            np.divide(weighted, total, out=self.gains)
+            np.sqrt(self.gains, out=self.gains)
+            np.maximum(self.gains, self.floor, out=self.gains)
+        np.copyto(self.gains, 1.0, where=self.bypassed)
+        return self.gains
+
+# Per-source jitter buffer
+class SourceRingBuffer:
+    # Single-producer/single-consumer float32 ring. The receiver thread only moves
+    # write_pos and the audio callback only moves read_pos, so neither needs a lock.
+    def __init__(self, capacity, channels, target_latency, underrun_fill='silence', clock=time.monotonic):
+        self.capacity = capacity
+        self.channels = channels
+        self.target_latency = min(target_latency, capacity // 2)
+        self.underrun_fill = underrun_fill
+        self.buffer = np.zeros((capacity, channels), dtype=np.float32)
+        self.last_frame = np.zeros(channels, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.clock = clock
+        self.read_time = None
+        self.read_frames = 0
+        self.primed = False
+        self.underruns = 0
+        self.overruns = 0
+
+    def fill_level(self):
+        return self.write_pos - self.read_pos
+
+    def buffered_frames(self, now, samplerate):
+        # Fill as a continuous level for the drift loop. The callback takes a whole block at a
+        # time, so the raw fill is a block-high sawtooth that slides past the producer's blocks
+        # at the drift rate; discounting what the sound card has played since the last read
+        # leaves only the latency the clocks actually move.
+        if self.read_time is None:
+            return self.fill_level()
+        return self.fill_level() - min(max(now - self.read_time, 0.0) * samplerate, self.read_frames)
+
+    def write(self, block):
+        # Producer side: copy (frames, 1 or channels) samples in, dropping what does not fit
+        frames = min(len(block), self.capacity - self.fill_level())
+        if frames < len(block):
+            self.overruns += 1
+        if frames <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if first < frames:
+            self.buffer[:frames - first] = block[first:frames]
+        self.write_pos += frames
+        return frames
+
+    def read_into(self, out):
+        # Consumer side: fill out from the ring without blocking, padding on underrun
+        frames = len(out)
+        available = self.fill_level()
+        if not self.primed:
+            # Build up the target latency before playing, and again after every underrun
+            if available < self.target_latency + frames:
+                self.pad(out, 0)
+                return 0
+            self.primed = True
+        elif available > 2 * self.target_latency + frames:
+            # Too far behind the producer: skip ahead to bound the latency
+            self.read_pos = self.write_pos - self.target_latency - frames
+            available = self.target_latency + frames
+        self.read_time = self.clock()
+        self.read_frames = frames
+        count = min(frames, available)
+        start = self.read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < count:
+            out[first:count] = self.buffer[:count - first]
+        self.read_pos += count
+        if count < frames:
+            self.underruns += 1
+            self.primed = False
+            self.pad(out, count)
+        elif count:
+            self.last_frame[:] = out[count - 1]
+        return count
+
+    def pad(self, out, start):
+        if self.underrun_fill == 'hold':
+            if start:
+                self.last_frame[:] = out[start - 1]
+            out[start:] = self.last_frame
+        else:
+            out[start:] = 0.0
+            self.last_frame[:] = 0.0
+
+class DriftController:
+    # PI loop that holds a ring buffer at a constant fill by trimming the source's
+    # resample ratio, absorbing the difference between the sender's clock and the
+    # sound card's. Fill is smoothed first so block-sized jitter does not modulate pitch.
+    def __init__(self, samplerate, target_fill, kp=DRIFT_KP, ki=DRIFT_KI, max_ppm=DRIFT_MAX_PPM):
+        self.samplerate = samplerate
+        self.target_fill = target_fill
+        self.kp = kp
+        self.ki = ki
+        self.max_adjust = max_ppm * 1e-6
+        self.smoothed_fill = None
+        self.integral = 0.0
+        self.ratio_adjust = 1.0
+        self.last_time = None
+
+    @property
+    def drift_ppm(self):
+        # Estimated clock offset: the integral term alone, which settles on the drift
+        return self.ki * self.integral * 1e6
+
+    @property
+    def correction_ppm(self):
+        # Ratio trim currently applied, including the proportional term
+        return (self.ratio_adjust - 1.0) * 1e6
+
+    @property
+    def buffer_ms(self):
+        return 0.0 if self.smoothed_fill is None else self.smoothed_fill * 1000 / self.samplerate
+
+    def update(self, fill_level, now):
+        if self.last_time is None:
+            self.last_time = now
+            self.smoothed_fill = float(fill_level)
+            return self.ratio_adjust
+        dt = now - self.last_time
+        self.last_time = now
+        coef = math.exp(-dt / DRIFT_SMOOTHING_SECONDS)
+        self.smoothed_fill = fill_level + coef * (self.smoothed_fill - fill_level)
+
+        # Error in seconds of latency; a full buffer means we produce too fast, so raise the ratio
+        error = (self.smoothed_fill - self.target_fill) / self.samplerate
+        # Only integrate while the output is inside its limit, so a large start-up fill
+        # does not wind the integral up and overshoot once the buffer has drained
+        integral = self.integral + error * dt
+        adjust = self.kp * error + self.ki * integral
+        if abs(adjust) <= self.max_adjust:
+            self.integral = integral
+        else:
+            adjust = self.kp * error + self.ki * self.integral
+        self.ratio_adjust = 1.0 + min(max(adjust, -self.max_adjust), self.max_adjust)
+        return self.ratio_adjust
+
+class SourceReceiverThread(threading.Thread):
+    # Pulls audio from one NDI receiver, converts it to the bus format and pushes it
+    # into that source's ring buffer, trimming the resample ratio to cancel clock drift
+    def __init__(self, receiver, ring_buffer, frames, samplerate, channels, channel_matrix=None):
+        super().__init__(daemon=True)
+        self.receiver = receiver
+        self.ring_buffer = ring_buffer
+        self.frames = frames
+        self.samplerate = samplerate
+        self.channels = channels
+        self.channel_matrix = channel_matrix
+        self.converter = None
+        # buffered_frames() leaves out the block being played, so the target is just the latency margin
+        self.drift = DriftController(samplerate, ring_buffer.target_latency)
+        self.stop_event = threading.Event()
+
+    def set_channel_matrix(self, channel_matrix):
+        self.channel_matrix = channel_matrix
+        if self.converter is not None:
+            self.converter.set_channel_matrix(channel_matrix)
+
+    def set_frames(self, frames):
+        # Follow the output block size, so low-latency mode also pulls small frames
+        self.frames = frames
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.receive()
+
+    def receive(self):
+        # Pull one frame, convert it and push it into the ring buffer; the benchmark
+        # calls this directly to drive a source without the thread
+        audio_data = self.receiver.receive_audio(self.frames)
+        if audio_data is None or len(audio_data) == 0:
+            return
+        # Senders may change format mid-stream, so check it on every frame
+        in_rate = self.receiver.audio_sample_rate or self.samplerate
+        in_channels = self.receiver.audio_channels or 1
+        if self.converter is None or not self.converter.matches(in_rate, in_channels):
+            self.converter = FormatConverter(in_rate, in_channels, self.samplerate, self.channels, self.channel_matrix)
+        audio_data = np.asarray(audio_data, dtype=np.float32).reshape(-1, in_channels)
+        self.ring_buffer.write(self.converter.process(audio_data))
+        if self.ring_buffer.primed:
+            now = time.monotonic()
+            fill = self.ring_buffer.buffered_frames(now, self.samplerate)
+            self.converter.set_ratio_adjust(self.drift.update(fill, now))
+
+    def stop(self):
+        self.stop_event.set()
+
+# Format conversion
+def default_channel_matrix(in_channels, out_channels):
+    # (out_channels, in_channels) mix: mono spreads to every output, anything to mono
+    # averages, otherwise channels map one-to-one and extra inputs fold in at -3 dB
+    if in_channels == out_channels:
+        return np.eye(out_channels, dtype=np.float32)
+    if in_channels == 1:
+        return np.ones((out_channels, 1), dtype=np.float32)
+    if out_channels == 1:
+        return np.full((1, in_channels), 1.0 / in_channels, dtype=np.float32)
+    matrix = np.eye(out_channels, in_channels, dtype=np.float32)
+    for channel in range(out_channels, in_channels):
+        matrix[channel % out_channels, channel] = math.sqrt(0.5)
+    return matrix
+
+class StreamingResampler:
+    # Polyphase windowed-sinc resampler for arbitrary (and slowly varying) ratios.
+    # Each output sample interpolates between the two nearest of RESAMPLER_PHASES
+    # precomputed filter phases; input history and the fractional read position
+    # carry across blocks so the output is continuous.
+    def __init__(self, in_rate, out_rate, channels, taps=RESAMPLER_TAPS, phases=RESAMPLER_PHASES):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.taps = taps
+        self.phases = phases
+        self.center = taps // 2 - 1
+        self.step = in_rate / out_rate
+        self.ratio_adjust = 1.0
+        cutoff = min(1.0, out_rate / in_rate) * RESAMPLER_BANDWIDTH
+        positions = (np.arange(taps)[None, :] - self.center) - (np.arange(phases + 1)[:, None] / phases)
+        window = np.i0(8.0 * np.sqrt(np.clip(1 - (positions / (taps / 2)) ** 2, 0, 1))) / np.i0(8.0)
+        table = np.sinc(cutoff * positions) * window
+        self.table = (table / table.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.tap_offsets = np.arange(taps) - self.center
+        self.history = np.zeros((taps - 1, channels), dtype=np.float32)
+        self.position = float(self.center)
+
+    def set_ratio_adjust(self, adjust):
+        # Fine-tune the conversion ratio, e.g. to follow clock drift; 1.0 is nominal
+        self.ratio_adjust = adjust
+
+    def process(self, block):
+        buffer = np.concatenate((self.history, block))
+        step = self.step * self.ratio_adjust
+        limit = len(buffer) - self.taps // 2
+        count = max(0, math.ceil((limit - self.position) / step))
+        times = self.position + step * np.arange(count)
+        indices = times.astype(np.int64)
+        phase = (times - indices) * self.phases
+        phase_index = phase.astype(np.int64)
+        weight = (phase - phase_index).astype(np.float32)[:, None]
+        coefficients = self.table[phase_index] * (1 - weight) + self.table[phase_index + 1] * weight
+        windows = buffer[indices[:, None] + self.tap_offsets[None, :]]
+        output = np.einsum('kt,ktc->kc', coefficients, windows)
+
+        # Keep only the input the next block still needs
+        next_position = self.position + step * count
+        drop = max(0, int(next_position) - self.center)
+        self.history = buffer[drop:]
+        self.position = next_position - drop
+        return output
+
+class FormatConverter:
+    # Brings one source to the bus sample rate and channel layout. Channel mixing
+    # runs on whichever side of the resampler has fewer channels.
+    def __init__(self, in_rate, in_channels, out_rate, out_channels, channel_matrix=None):
+        self.in_rate = in_rate
+        self.in_channels = in_channels
+        self.out_rate = out_rate
+        self.out_channels = out_channels
+        self.set_channel_matrix(channel_matrix)
+        self.resampler = None
+        if in_rate != out_rate:
+            self.resampler = StreamingResampler(in_rate, out_rate, min(in_channels, out_channels))
+
+    def set_channel_matrix(self, channel_matrix=None):
+        if channel_matrix is None:
+            channel_matrix = default_channel_matrix(self.in_channels, self.out_channels)
+        channel_matrix = np.asarray(channel_matrix, dtype=np.float32)
+        if channel_matrix.shape != (self.out_channels, self.in_channels):
+            raise ValueError(f"Channel matrix must be {self.out_channels}x{self.in_channels}, got {channel_matrix.shape}")
+        self.channel_matrix = channel_matrix
+        self.passthrough = self.in_channels == self.out_channels and np.array_equal(channel_matrix, np.eye(self.out_channels))
+
+    def matches(self, in_rate, in_channels):
+        return in_rate == self.in_rate and in_channels == self.in_channels
+
+    def set_ratio_adjust(self, adjust):
+        if self.resampler is None and adjust != 1.0:
+            self.resampler = StreamingResampler(self.in_rate, self.out_rate, min(self.in_channels, self.out_channels))
+        if self.resampler is not None:
+            self.resampler.set_ratio_adjust(adjust)
+
+    def mix_channels(self, block):
+        return block if self.passthrough else block @ self.channel_matrix.T
+
+    def process(self, block):
+        # (frames, in_channels) at in_rate -> (frames', out_channels) at out_rate
+        if self.resampler is None:
+            return self.mix_channels(block)
+        if self.in_channels > self.out_channels:
+            return self.resampler.process(self.mix_channels(block))
+        return self.mix_channels(self.resampler.process(block))
+
+# Parametric EQ
+def check_eq_band_index(eq, band):
+    # No negative indices: -1 would silently alias the last band
+    if not 0 <= band < len(eq.bands):
+        raise IndexError(f"No EQ band {band}")
+
+def checked_eq_band(params):
+    # Validate band edits before they reach the filter design: a known type, finite numbers, positive freq and Q
+    checked = {}
+    for name, value in params.items():
+        if name == 'type':
+            if value not in EQ_BAND_TYPES:
+                raise ValueError(f"Unknown EQ band type: {value}")
+            checked[name] = value
+            continue
+        if name not in ('freq', 'gain_db', 'q'):
+            raise KeyError(f"Unknown EQ band field {name}")
+        checked[name] = finite_number(value, f"EQ band {name}")
+        if name != 'gain_db' and checked[name] <= 0:
+            raise ValueError(f"EQ band {name} must be positive")
+    return checked
+
+def biquad_coefficients(band_type, freq, gain_db, q, samplerate):
+    # RBJ audio EQ cookbook biquad, returned as one normalized second-order section
+    a = 10 ** (gain_db / 40)
+    w0 = 2 * math.pi * min(freq, 0.49 * samplerate) / samplerate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    if band_type == 'peak':
+        b = (1 + alpha * a, -2 * cos_w0, 1 - alpha * a)
+        den = (1 + alpha / a, -2 * cos_w0, 1 - alpha / a)
+    elif band_type in ('lowshelf', 'highshelf'):
+        sqrt_a = 2 * math.sqrt(a) * alpha
+        sign = 1 if band_type == 'lowshelf' else -1
+        b = (a * ((a + 1) - sign * (a - 1) * cos_w0 + sqrt_a),
+             sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0),
+             a * ((a + 1) - sign * (a - 1) * cos_w0 - sqrt_a))
+        den = ((a + 1) + sign * (a - 1) * cos_w0 + sqrt_a,
+               -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0),
+               (a + 1) + sign * (a - 1) * cos_w0 - sqrt_a)
+    elif band_type == 'lowpass':
+        b = ((1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2)
+        den = (1 + alpha, -2 * cos_w0, 1 - alpha)
+    elif band_type == 'highpass':
+        b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+        den = (1 + alpha, -2 * cos_w0, 1 - alpha)
+    else:
+        raise ValueError(f"Unknown EQ band type: {band_type}")
+    return np.array(b + den) / den[0]
+
+class BiquadEQ:
+    # Cascade of biquads filtered with sosfilt across all channels at once. The filter
+    # state carries over between callbacks, and a band's section is only recomputed
+    # when that band changes.
+    STATE = ('zi',)
+
+    def __init__(self, samplerate, channels, bands=None, enabled=False):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.enabled = enabled
+        self.bands = [dict(band) for band in (bands if bands is not None else DEFAULT_EQ_BANDS)]
+        self.sos = np.array([self.band_section(band) for band in self.bands]).reshape(-1, 6)
+        self.zi = np.zeros((len(self.bands), 2, channels))
+
+    def band_section(self, band):
+        return biquad_coefficients(band['type'], band['freq'], band.get('gain_db', 0.0), band.get('q', 0.707), self.samplerate)
+
+    def set_band(self, index, **params):
+        band = dict(self.bands[index], **params)
+        if band == self.bands[index]:
+            return
+        # Swap in a new section array so the callback never filters with a half-updated one
+        sos = self.sos.copy()
+        sos[index] = self.band_section(band)
+        self.bands[index] = band
+        self.sos = sos
+
+    def add_band(self, band_type, freq, gain_db=0.0, q=0.707):
+        band = {'type': band_type, 'freq': freq, 'gain_db': gain_db, 'q': q}
+        sos = np.vstack((self.sos, self.band_section(band)))
+        zi = np.vstack((self.zi, np.zeros((1, 2, self.channels))))
+        self.bands.append(band)
+        self.sos, self.zi = sos, zi
+
+    def remove_band(self, index):
+        self.bands.pop(index)
+        self.sos, self.zi = np.delete(self.sos, index, axis=0), np.delete(self.zi, index, axis=0)
+
+    def process(self, block):
+        # Filter a (frames, channels) block in place
+        sos, zi = self.sos, self.zi
+        if not self.enabled or len(sos) == 0 or len(zi) != len(sos):
+            return block
+        filtered, self.zi = sosfilt(sos, block, axis=0, zi=zi)
+        block[:] = filtered
+        return block
+
+# Dynamics
+def true_peak_filters(oversampling=TRUE_PEAK_OVERSAMPLING, taps=TRUE_PEAK_TAPS):
+    # Polyphase windowed-sinc interpolator; row p estimates the signal p/oversampling
+    # of a sample after the centre tap of each window
+    offsets = np.arange(taps)[::-1] - (taps // 2 - 1)
+    phases = np.arange(oversampling)[:, None] / oversampling
+    positions = offsets[None, :] + phases
+    filters = np.sinc(positions) * np.kaiser(taps, 5.0)[None, :]
+    return filters / filters.sum(axis=1, keepdims=True)
+
+class DynamicsProcessor:
+    # Streaming compressor/limiter. The detector runs at CONTROL_BLOCK resolution
+    # with attack/release envelopes that carry across callbacks, the audio path is
+    # delayed by the look-ahead so gain reduction lands before the peak, and
+    # brickwall mode hard-limits to the ceiling, optionally on true (inter-sample) peaks.
+    STATE = ('delay_buffer', 'chunk_targets', 'tp_buffer', 'envelope_db', 'mean_square', 'gain_reduction_db')
+
+    def __init__(self, samplerate, channels, max_frames, threshold_db=-18.0, ratio=4.0,
+                 attack_ms=5.0, release_ms=100.0, lookahead_ms=5.0, makeup_db=0.0,
+                 detector='rms', rms_ms=10.0, brickwall=False, true_peak=False, enabled=False):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.max_frames = max_frames
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self.makeup_db = makeup_db
+        self.detector = detector
+        self.brickwall = brickwall
+        self.true_peak = true_peak
+        self.enabled = enabled
+        self.set_times(attack_ms, release_ms, rms_ms)
+
+        self.lookahead = int(samplerate * lookahead_ms / 1000)
+        self.delay_buffer = np.zeros((max_frames + self.lookahead, channels), dtype=np.float32)
+        max_chunks = -(-max_frames // CONTROL_BLOCK)
+        self.hold_chunks = -(-self.lookahead // CONTROL_BLOCK)
+        self.chunk_starts = np.arange(0, max_frames, CONTROL_BLOCK)
+        self.chunk_levels = np.zeros(max_chunks, dtype=np.float32)
+        self.chunk_targets = np.zeros(self.hold_chunks + max_chunks, dtype=np.float32)
+        self.chunk_held = np.zeros(max_chunks, dtype=np.float32)
+        self.chunk_gains = np.zeros(max_chunks + 1, dtype=np.float32)
+        self.ramp = (np.arange(1, CONTROL_BLOCK + 1, dtype=np.float32) / CONTROL_BLOCK)[None, :]
+        self.sample_gains = np.zeros((max_chunks, CONTROL_BLOCK), dtype=np.float32)
+        self.sample_levels = np.zeros(max_frames, dtype=np.float32)
+        self.work = np.zeros((max_frames, channels), dtype=np.float32)
+        self.tp_filters = true_peak_filters()
+        self.tp_buffer = np.zeros((max_frames + TRUE_PEAK_TAPS - 1, channels), dtype=np.float32)
+        self.tp_values = np.zeros((max_frames, channels, TRUE_PEAK_OVERSAMPLING), dtype=np.float32)
+        self.envelope_db = 0.0
+        self.mean_square = 0.0
+        self.gain_reduction_db = 0.0
+
+    @classmethod
+    def limiter(cls, samplerate, channels, max_frames, ceiling=DEFAULT_LIMITER_CEILING, true_peak=True, **kwargs):
+        # Brickwall peak limiter: infinite ratio at the ceiling with a fast attack and hard clip
+        params = dict(threshold_db=20 * math.log10(ceiling), ratio=math.inf, attack_ms=1.0, release_ms=50.0,
+                      lookahead_ms=2.0, detector='peak', brickwall=True, true_peak=true_peak, enabled=True)
+        params.update(kwargs)
+        return cls(samplerate, channels, max_frames, **params)
+
+    def set_times(self, attack_ms, release_ms, rms_ms=None):
+        # One-pole coefficients per control chunk
+        self.attack_coef = math.exp(-CONTROL_BLOCK / (max(attack_ms, 1e-3) * self.samplerate / 1000))
+        self.release_coef = math.exp(-CONTROL_BLOCK / (max(release_ms, 1e-3) * self.samplerate / 1000))
+        if rms_ms is not None:
+            self.rms_coef = math.exp(-CONTROL_BLOCK / (max(rms_ms, 1e-3) * self.samplerate / 1000))
+            self.rms_filter = (np.array([1.0 - self.rms_coef]), np.array([1.0, -self.rms_coef]))
+
+    def set_params(self, threshold_db=None, ratio=None, makeup_db=None):
+        if threshold_db is not None:
+            self.threshold_db = threshold_db
+        if ratio is not None:
+            self.ratio = ratio
+        if makeup_db is not None:
+            self.makeup_db = makeup_db
+
+    @property
+    def ceiling(self):
+        return 10 ** (self.threshold_db / 20)
+
+    def detect(self, block, frames):
+        # Per-sample detector level, linked across channels
+        levels = self.sample_levels[:frames]
+        if self.true_peak:
+            taps = TRUE_PEAK_TAPS
+            self.tp_buffer[taps - 1:taps - 1 + frames] = block
+            windows = sliding_window_view(self.tp_buffer[:frames + taps - 1], taps, axis=0)
+            values = self.tp_values[:frames]
+            np.matmul(windows, self.tp_filters.T, out=values)
+            np.abs(values, out=values)
+            np.max(values, axis=(1, 2), out=levels)
+            self.tp_buffer[:taps - 1] = self.tp_buffer[frames:frames + taps - 1]
+        elif self.detector == 'rms':
+            work = self.work[:frames]
+            np.square(block, out=work)
+            np.mean(work, axis=1, out=levels)
+        else:
+            work = self.work[:frames]
+            np.abs(block, out=work)
+            np.max(work, axis=1, out=levels)
+        return levels
+
+    def process(self, block):
+        # Compress/limit a (frames, channels) block in place
+        if not self.enabled:
+            return block
+        frames = len(block)
+        chunks = -(-frames // CONTROL_BLOCK)
+        levels = self.detect(block, frames)
+
+        chunk_levels = self.chunk_levels[:chunks]
+        rms = self.detector == 'rms' and not self.true_peak
+        if rms:
+            np.add.reduceat(levels, self.chunk_starts[:chunks], out=chunk_levels)
+            chunk_levels /= CONTROL_BLOCK
+            if frames % CONTROL_BLOCK:
+                # The last chunk is short; average it over the samples it actually has
+                chunk_levels[-1] *= CONTROL_BLOCK / (frames % CONTROL_BLOCK)
+        else:
+            np.maximum.reduceat(levels, self.chunk_starts[:chunks], out=chunk_levels)
+
+        # Static gain computer for all chunks at once, in dB of gain reduction
+        slope = 1.0 if math.isinf(self.ratio) else 1.0 - 1.0 / self.ratio
+        hold = self.hold_chunks
+        targets = self.chunk_targets
+        chunk_db = targets[hold:hold + chunks]
+        if rms:
+            # One-pole mean square across chunks, carried between callbacks
+            b, a = self.rms_filter
+            mean_square, _ = lfilter(b, a, chunk_levels, zi=[self.rms_coef * self.mean_square])
+            self.mean_square = float(mean_square[-1])
+            np.add(mean_square, 1e-20, out=chunk_db)
+            np.log10(chunk_db, out=chunk_db)
+            chunk_db *= 10
+        else:
+            np.add(chunk_levels, 1e-10, out=chunk_db)
+            np.log10(chunk_db, out=chunk_db)
+            chunk_db *= 20
+        chunk_db -= self.threshold_db
+        np.maximum(chunk_db, 0.0, out=chunk_db)
+        chunk_db *= slope
+
+        # Hold each target across the look-ahead window, then smooth with attack/release
+        held = self.chunk_held[:chunks]
+        np.max(sliding_window_view(targets[:hold + chunks], hold + 1), axis=1, out=held)
+        targets[:hold] = targets[chunks:chunks + hold]
+        gains = self.chunk_gains
+        envelope = self.envelope_db
+        gains[0] = -envelope
+        attack, release = self.attack_coef, self.release_coef
+        # Whether a chunk attacks or releases depends on the envelope so far, so this one
+        # recursion stays sequential; it runs on plain floats and writes the gains in one go
+        envelopes = []
+        for target in held.tolist():
+            envelope = target + (attack if target > envelope else release) * (envelope - target)
+            envelopes.append(envelope)
+        np.negative(envelopes, out=gains[1:chunks + 1])
+        self.envelope_db = envelope
+        self.gain_reduction_db = envelope
+
+        # Ramp linearly between chunk gains and convert dB to linear
+        sample_gains = self.sample_gains[:chunks]
+        np.subtract(gains[1:chunks + 1, None], gains[:chunks, None], out=sample_gains)
+        sample_gains *= self.ramp
+        sample_gains += gains[:chunks, None]
+        if self.makeup_db:
+            sample_gains += self.makeup_db
+        sample_gains *= math.log(10) / 20
+        np.exp(sample_gains, out=sample_gains)
+
+        # Delay the audio by the look-ahead and apply the gain
+        lookahead = self.lookahead
+        delay_buffer = self.delay_buffer
+        delay_buffer[lookahead:lookahead + frames] = block
+        block[:] = delay_buffer[:frames]
+        delay_buffer[:lookahead] = delay_buffer[frames:frames + lookahead]
+        block *= sample_gains.reshape(-1)[:frames, None]
+        if self.brickwall:
+            ceiling = self.ceiling
+            np.clip(block, -ceiling, ceiling, out=block)
+        return block
+
+# Lip-sync delay
+class DelayLine:
+    # Circular per-source delay line. Every block is written once and read back at
+    # the current delay; a delay change crossfades from the old read position to the
+    # new one over DELAY_CROSSFADE_MS instead of jumping.
+    STATE = ('buffer', 'write_pos', 'delay', 'fade_pos')
+
+    def __init__(self, samplerate, channels, max_frames, max_delay_seconds=MAX_DELAY_SECONDS, crossfade_ms=DELAY_CROSSFADE_MS):
+        self.samplerate = samplerate
+        self.max_delay = int(samplerate * max_delay_seconds)
+        self.capacity = self.max_delay + max_frames
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.fade_buffer = np.zeros((max_frames, channels), dtype=np.float32)
+        self.fade_weights = np.zeros(max_frames, dtype=np.float32)
+        self.sample_index = np.arange(1, max_frames + 1, dtype=np.float32)
+        self.fade_length = max(1, int(samplerate * crossfade_ms / 1000))
+        self.write_pos = 0
+        self.delay = 0
+        self.target_delay = 0
+        self.fade_pos = 0
+
+    def set_delay_frames(self, frames):
+        self.target_delay = int(min(max(frames, 0), self.max_delay))
+
+    def set_delay_ms(self, delay_ms):
+        self.set_delay_frames(round(delay_ms * self.samplerate / 1000))
+
+    @property
+    def delay_ms(self):
+        return self.target_delay * 1000 / self.samplerate
+
+    def read_into(self, out, delay):
+        # Copy the frames that were written delay samples before the newest block
+        frames = len(out)
+        start = (self.write_pos - frames - delay) % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < frames:
+            out[first:] = self.buffer[:frames - first]
+
+    def process(self, block):
+        # Delay a (frames, channels) block in place
+        frames = len(block)
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if first < frames:
+            self.buffer[:frames - first] = block[first:]
+        self.write_pos += frames
+
+        target_delay = self.target_delay
+        if target_delay == self.delay:
+            if self.delay:
+                self.read_into(block, self.delay)
+            return block
+
+        # Crossfade from the old delay to the new one, possibly across several blocks
+        self.read_into(block, self.delay)
+        fade_audio = self.fade_buffer[:frames]
+        self.read_into(fade_audio, target_delay)
+        weights = self.fade_weights[:frames]
+        np.add(self.sample_index[:frames], self.fade_pos, out=weights)
+        weights /= self.fade_length
+        np.minimum(weights, 1.0, out=weights)
+        fade_audio -= block
+        fade_audio *= weights[:, None]
+        block += fade_audio
+        self.fade_pos += frames
+        if self.fade_pos >= self.fade_length:
+            self.delay = target_delay
+            self.fade_pos = 0
+        return block
+
+# Phase
+def allpass_sections(coefficients, delay=False):
+    # Second-order all-pass sections (a^2 - z^-2) / (1 - a^2 z^-2), plus an optional z^-1
+    sections = [[a * a, 0.0, -1.0, 1.0, 0.0, -a * a] for a in coefficients]
+    if delay:
+        sections.append([0.0, 1.0, 0.0, 1.0, 0.0, 0.0])
+    return np.array(sections)
+
+class PhaseRotator:
+    # Streaming polarity flip and constant phase rotation. Inversion is a sign flip;
+    # any other angle mixes the in-phase and quadrature outputs of a Hilbert all-pass
+    # pair as cos(angle) * I + sin(angle) * Q, with filter state kept across callbacks.
+    STATE = ('zi_i', 'zi_q')
+
+    def __init__(self, channels, invert=False, angle_deg=0.0, enabled=False):
+        self.channels = channels
+        self.invert = invert
+        self.enabled = enabled
+        self.sos_i = allpass_sections(HILBERT_PATH_A, delay=True)
+        self.sos_q = allpass_sections(HILBERT_PATH_B)
+        self.zi_i = np.zeros((len(self.sos_i), 2, channels))
+        self.zi_q = np.zeros((len(self.sos_q), 2, channels))
+        self.set_angle(angle_deg)
+
+    def set_angle(self, angle_deg):
+        angle = math.radians(angle_deg)
+        self.angle_deg = angle_deg
+        self.mix_weights = (math.cos(angle), math.sin(angle))
+
+    def set_phase(self, invert=None, angle_deg=None):
+        if invert is not None:
+            self.invert = invert
+        if angle_deg is not None:
+            self.set_angle(angle_deg)
+
+    def process(self, block):
+        # Rotate a (frames, channels) block in place
+        if not self.enabled:
+            return block
+        if self.angle_deg % 360:
+            cos_weight, sin_weight = self.mix_weights
+            in_phase, self.zi_i = sosfilt(self.sos_i, block, axis=0, zi=self.zi_i)
+            quadrature, self.zi_q = sosfilt(self.sos_q, block, axis=0, zi=self.zi_q)
+            in_phase *= cos_weight
+            quadrature *= sin_weight
+            in_phase += quadrature
+            block[:] = in_phase
+        if self.invert:
+            np.negative(block, out=block)
+        return block
+
+# Metering
+def k_weighting_sections(samplerate):
+    # ITU-R BS.1770 K-weighting (pre-filter shelf + RLB high-pass) for any sample rate
+    k = math.tan(math.pi * 1681.974450955533 / samplerate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    k = math.tan(math.pi * 38.13547087602444 / samplerate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    high_pass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, high_pass])
+
+def level_to_db(level, out=None):
+    # Amplitude to dBFS with a floor, so digital silence never hits log10(0)
+    out = np.maximum(level, 10 ** (METER_FLOOR_DB / 20), out=out)
+    np.log10(out, out=out)
+    out *= 20
+    return out
+
+class MeterSnapshot:
+    # One published set of readings; row i is source i and the last row is the bus
+    def __init__(self, rows):
+        self.peak_db = np.full(rows, METER_FLOOR_DB, dtype=np.float32)
+        self.rms_db = np.full(rows, METER_FLOOR_DB, dtype=np.float32)
+        self.momentary_lufs = np.full(rows, METER_FLOOR_DB, dtype=np.float32)
+        self.short_term_lufs = np.full(rows, METER_FLOOR_DB, dtype=np.float32)
+        self.sequence = 0
+
+class MeterThread(threading.Thread):
+    # The audio callback only copies the blocks it already has into a preallocated
+    # slot ring; this thread computes peak/RMS ballistics and EBU R128 momentary and
+    # short-term loudness, then publishes a snapshot by swapping one reference.
+    def __init__(self, samplerate, num_sources, channels, max_frames, slots=METER_SLOTS, monitor=None):
+        super().__init__(daemon=True)
+        self.samplerate = samplerate
+        self.monitor = monitor
+        self.rows = num_sources + 1
+        self.channels = channels
+        self.slots = slots
+        self.blocks = np.zeros((slots, self.rows, max_frames, channels), dtype=np.float32)
+        self.slot_frames = [0] * slots
+        self.write_index = 0
+        self.read_index = 0
+        self.dropped_blocks = 0
+        self.stop_event = threading.Event()
+
+        self.k_sections = k_weighting_sections(samplerate)
+        self.k_state = np.zeros((len(self.k_sections), self.rows, 2, channels))
+        self.peak_db = np.full(self.rows, METER_FLOOR_DB, dtype=np.float32)
+        self.mean_square = np.zeros(self.rows)
+        self.bin_energy = np.zeros(self.rows)
+        self.bin_frames = 0
+        self.bin_length = int(samplerate * LOUDNESS_BIN_SECONDS)
+        self.loudness_bins = np.zeros((self.rows, SHORT_TERM_BINS))
+        self.bin_index = 0
+        self.snapshot = MeterSnapshot(self.rows)
+        self.spare_snapshot = MeterSnapshot(self.rows)
+
+    def push(self, source_block, bus, frames):
+        # Audio thread: copy this block's sources and bus into the next free slot, never blocking
+        if self.write_index - self.read_index >= self.slots:
+            self.dropped_blocks += 1
+            return
+        slot = self.write_index % self.slots
+        sources = min(len(source_block), self.rows - 1)
+        self.blocks[slot, :sources, :frames] = source_block[:sources, :frames]
+        self.blocks[slot, -1, :frames] = bus
+        self.slot_frames[slot] = frames
+        self.write_index += 1
+
+    def run(self):
+        while not self.stop_event.wait(METER_POLL_SECONDS):
+            if self.read_index == self.write_index:
+                continue
+            while self.read_index < self.write_index:
+                slot = self.read_index % self.slots
+                block = self.blocks[slot, :, :self.slot_frames[slot]]
+                self.analyse(block)
+                if self.monitor is not None:
+                    self.monitor.push(block)
+                self.read_index += 1
+            self.publish()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def analyse(self, block):
+        # block is (rows, frames, channels)
+        frames = block.shape[1]
+        seconds = frames / self.samplerate
+
+        # Peak with hold-and-fall ballistics
+        peak_db = level_to_db(np.abs(block).max(axis=(1, 2)))
+        np.maximum(peak_db, self.peak_db - METER_PEAK_FALL_DB_PER_SECOND * seconds, out=self.peak_db)
+
+        # RMS integrated with a METER_RMS_MS time constant
+        coef = math.exp(-seconds * 1000 / METER_RMS_MS)
+        self.mean_square *= coef
+        self.mean_square += (1 - coef) * np.square(block).mean(axis=(1, 2))
+
+        # K-weighted energy summed over channels, binned every 100 ms for R128
+        weighted, self.k_state = sosfilt(self.k_sections, block, axis=1, zi=self.k_state)
+        self.bin_energy += np.square(weighted).sum(axis=(1, 2))
+        self.bin_frames += frames
+        if self.bin_frames >= self.bin_length:
+            self.loudness_bins[:, self.bin_index % SHORT_TERM_BINS] = self.bin_energy / self.bin_frames
+            self.bin_index += 1
+            self.bin_energy[:] = 0.0
+            self.bin_frames = 0
+
+    def loudness(self, bins):
+        # Mean energy over the newest bins, as LUFS
+        count = min(bins, max(self.bin_index, 1))
+        columns = [(self.bin_index - 1 - i) % SHORT_TERM_BINS for i in range(count)]
+        energy = self.loudness_bins[:, columns].mean(axis=1)
+        return -0.691 + 10 * np.log10(np.maximum(energy, 10 ** (METER_FLOOR_DB / 10)))
+
+    def publish(self):
+        snapshot = self.spare_snapshot
+        snapshot.peak_db[:] = self.peak_db
+        level_to_db(np.sqrt(self.mean_square), out=snapshot.rms_db)
+        snapshot.momentary_lufs[:] = self.loudness(MOMENTARY_BINS)
+        snapshot.short_term_lufs[:] = self.loudness(SHORT_TERM_BINS)
+        snapshot.sequence = self.snapshot.sequence + 1
+        self.spare_snapshot = self.snapshot
+        self.snapshot = snapshot
+
+class SignalMonitor(threading.Thread):
+    # Watches every source and the bus for dead air, sustained clipping, DC offset and
+    # feedback. The meter thread hands over each block it has analysed; only a decimated
+    # history (mid signal, power and a full-rate clip flag per group of samples) is kept,
+    # and this thread checks all rows at once every ALARM_INTERVAL_SECONDS. Feedback is a
+    # narrow spectral peak that stands far above the rest and keeps growing in one bin.
+    def __init__(self, samplerate, names, interval=ALARM_INTERVAL_SECONDS):
+        super().__init__(daemon=True)
+        self.names = list(names)
+        self.rows = len(self.names)
+        self.interval = interval
+        self.rate = samplerate / ALARM_DECIMATION
+        self.length = int(self.rate * ALARM_HISTORY_SECONDS)
+        self.mid = np.zeros((self.rows, self.length), dtype=np.float32)
+        self.power = np.zeros((self.rows, self.length), dtype=np.float32)
+        self.clipped = np.zeros((self.rows, self.length), dtype=bool)
+        self.write_pos = 0
+        self.stop_event = threading.Event()
+
+        self.fft_size = min(ALARM_FFT_SIZE, self.length)
+        self.window = np.hanning(self.fft_size).astype(np.float32)
+        self.min_bin = int(ALARM_FEEDBACK_MIN_HZ * self.fft_size / self.rate)
+        self.peak_db = np.full((self.rows, ALARM_FEEDBACK_HISTORY), METER_FLOOR_DB)
+        self.peak_bin = np.zeros((self.rows, ALARM_FEEDBACK_HISTORY), dtype=int)
+        self.analyses = 0
+        self.active = np.zeros((self.rows, len(ALARM_CONDITIONS)), dtype=bool)
+        self.since = np.zeros((self.rows, len(ALARM_CONDITIONS)))
+        self.state = {}
+
+    def push(self, block):
+        # Meter thread: fold a (rows, frames, channels) block into the decimated history
+        rows, frames, channels = block.shape
+        rows = min(rows, self.rows)
+        count = frames // ALARM_DECIMATION
+        if count == 0:
+            return
+        groups = block[:rows, :count * ALARM_DECIMATION].reshape(rows, count, ALARM_DECIMATION * channels)
+        start = self.write_pos % self.length
+        first = min(count, self.length - start)
+        for target, values in ((self.mid, groups.mean(axis=2)),
+                               (self.power, np.square(groups).mean(axis=2)),
+                               (self.clipped, np.abs(groups).max(axis=2) >= ALARM_CLIP_LEVEL)):
+            target[:rows, start:start + first] = values[:, :first]
+            target[:rows, :count - first] = values[:, first:]
+        self.write_pos += count
+
+    def recent(self, history, seconds):
+        # Newest samples of one history, oldest first; None until enough have arrived
+        count = min(int(self.rate * seconds), self.length)
+        if self.write_pos < count:
+            return None
+        return np.take(history, np.arange(self.write_pos - count, self.write_pos) % self.length, axis=1)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Signal monitor check failed")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def check(self):
+        found = np.zeros_like(self.active)
+        detail = {}
+
+        power = self.recent(self.power, ALARM_SILENCE_SECONDS)
+        if power is not None:
+            detail['rms_db'] = level_to_db(np.sqrt(power.mean(axis=1)))
+            found[:, 0] = detail['rms_db'] < ALARM_SILENCE_DB
+
+        clipped = self.recent(self.clipped, ALARM_CLIP_SECONDS)
+        if clipped is not None:
+            detail['clip_ratio'] = clipped.mean(axis=1)
+            found[:, 1] = detail['clip_ratio'] > ALARM_CLIP_RATIO
+
+        mid = self.recent(self.mid, ALARM_DC_SECONDS)
+        if mid is not None:
+            detail['dc_offset'] = mid.mean(axis=1)
+            found[:, 2] = np.abs(detail['dc_offset']) > ALARM_DC_LEVEL
+
+        mid = self.recent(self.mid, self.fft_size / self.rate)
+        if mid is not None:
+            found[:, 3] = self.check_feedback(mid, detail)
+
+        now = time.time()
+        raised = found & ~self.active
+        cleared = self.active & ~found
+        self.since[raised] = now
+        for row, condition in zip(*np.nonzero(raised)):
+            logging.warning("Alarm raised: %s %s", self.names[row], ALARM_CONDITIONS[condition])
+        for row, condition in zip(*np.nonzero(cleared)):
+            logging.warning("Alarm cleared: %s %s", self.names[row], ALARM_CONDITIONS[condition])
+        self.active = found
+        self.publish(detail)
+
+    def check_feedback(self, mid, detail):
+        # One windowed FFT per row; the loudest bin above ALARM_FEEDBACK_MIN_HZ is a
+        # candidate when it dwarfs the median bin, and feedback once it has grown
+        # steadily in the same bin. A howl that has stopped growing at full scale stays
+        # flagged while the same peak is still there.
+        spectrum = np.abs(np.fft.rfft((mid - mid.mean(axis=1, keepdims=True)) * self.window, axis=1))
+        spectrum_db = level_to_db(spectrum[:, self.min_bin:] * (2 / self.window.sum()))
+        peak_bin = spectrum_db.argmax(axis=1)
+        peak_db = spectrum_db[np.arange(self.rows), peak_bin]
+        prominent = (peak_db - np.median(spectrum_db, axis=1) > ALARM_FEEDBACK_PROMINENCE_DB) & \
+                    (peak_db > ALARM_FEEDBACK_MIN_DB)
+
+        self.peak_db = np.roll(self.peak_db, -1, axis=1)
+        self.peak_bin = np.roll(self.peak_bin, -1, axis=1)
+        self.peak_db[:, -1] = peak_db
+        self.peak_bin[:, -1] = peak_bin
+        self.analyses += 1
+
+        same_bin = np.abs(self.peak_bin - peak_bin[:, None]).max(axis=1) <= 1
+        rising = (np.diff(self.peak_db, axis=1) > 0).all(axis=1) & \
+                 (self.peak_db[:, -1] - self.peak_db[:, 0] > ALARM_FEEDBACK_GROWTH_DB)
+        growing = same_bin & rising & (self.analyses >= ALARM_FEEDBACK_HISTORY)
+        held = self.active[:, 3] & (np.abs(self.peak_bin[:, -2] - peak_bin) <= 1)
+        detail['peak_hz'] = (peak_bin + self.min_bin) * self.rate / self.fft_size
+        return prominent & (growing | held)
+
+    def publish(self, detail):
+        # Build the whole state off to the side and swap it in, like the meter snapshot
+        state = {}
+        for row, name in enumerate(self.names):
+            alarms = {condition: float(self.since[row, i])
+                      for i, condition in enumerate(ALARM_CONDITIONS) if self.active[row, i]}
+            readings = {key: float(values[row]) for key, values in detail.items()}
+            state[name] = {'alarms': alarms, **readings}
+        self.state = state
+
+# Telemetry
+class CallbackTelemetry:
+    # Counters the audio callback updates in place: a histogram of callback times,
+    # deadline misses against frames / samplerate, PortAudio status flags, and time
+    # spent per stage and per source. Every list is preallocated, and the stage and
+    # source breakdown of the latest miss is kept so a glitch can be traced to its cause.
+    def __init__(self, samplerate, num_sources, stages=TELEMETRY_STAGES, edges_us=TELEMETRY_HISTOGRAM_US):
+        self.samplerate = samplerate
+        self.stages = stages
+        self.stage_slots = {stage: i for i, stage in enumerate(stages)}
+        self.edges_ns = [int(edge * 1000) for edge in edges_us]
+        self.histogram = [0] * (len(self.edges_ns) + 1)
+        self.callbacks = 0
+        self.deadline_misses = 0
+        self.output_underflows = 0
+        self.output_overflows = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.callback_start = 0
+        self.zero_stages = [0] * len(stages)
+        self.stage_ns = [0] * len(stages)
+        self.stage_max_ns = [0] * len(stages)
+        self.current_stage_ns = [0] * len(stages)
+        self.miss_stage_ns = [0] * len(stages)
+        self.last_miss_time = None
+        self.last_miss_ns = 0
+        self.resize_sources(num_sources)
+
+    def resize_sources(self, num_sources, removed=None):
+        # Build new per-source lists and swap them in; the callback never sees a half-built one
+        def resized(values):
+            values = list(values)
+            if removed is not None:
+                values.pop(removed)
+            return values[:num_sources] + [0] * (num_sources - len(values))
+        self.zero_sources = [0] * num_sources
+        self.current_source_ns = [0] * num_sources
+        self.source_ns = resized(getattr(self, 'source_ns', []))
+        self.source_max_ns = resized(getattr(self, 'source_max_ns', []))
+        self.miss_source_ns = [0] * num_sources
+
+    def begin(self, status):
+        # Audio thread: count PortAudio's flags and start timing this callback
+        if status:
+            self.output_underflows += bool(status.output_underflow)
+            self.output_overflows += bool(status.output_overflow)
+        self.current_stage_ns[:] = self.zero_stages
+        self.current_source_ns[:] = self.zero_sources
+        self.callback_start = time.perf_counter_ns()
+        return self.callback_start
+
+    def mark(self, stage, start):
+        # Audio thread: charge the time since start to stage and return now for the next mark
+        now = time.perf_counter_ns()
+        slot = self.stage_slots[stage]
+        elapsed = now - start
+        self.current_stage_ns[slot] += elapsed
+        self.stage_ns[slot] += elapsed
+        if elapsed > self.stage_max_ns[slot]:
+            self.stage_max_ns[slot] = elapsed
+        return now
+
+    def mark_source(self, index, start, elapsed=None):
+        # Audio thread: charge one source's DSP time, measured from start here or reported by a worker
+        now = time.perf_counter_ns()
+        if index < len(self.current_source_ns):
+            if elapsed is None:
+                elapsed = now - start
+            self.current_source_ns[index] = elapsed
+            self.source_ns[index] += elapsed
+            if elapsed > self.source_max_ns[index]:
+                self.source_max_ns[index] = elapsed
+        return now
+
+    def end(self, frames):
+        # Audio thread: file the callback's duration and keep the breakdown of a missed deadline
+        elapsed = time.perf_counter_ns() - self.callback_start
+        self.callbacks += 1
+        self.total_ns += elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        self.histogram[bisect_right(self.edges_ns, elapsed)] += 1
+        if elapsed * self.samplerate > frames * 1_000_000_000:
+            self.deadline_misses += 1
+            self.last_miss_ns = elapsed
+            self.last_miss_time = time.time()
+            self.miss_stage_ns[:] = self.current_stage_ns
+            if len(self.miss_source_ns) == len(self.current_source_ns):
+                self.miss_source_ns[:] = self.current_source_ns
+
+    def percentile_us(self, fraction, histogram=None):
+        # Upper edge of the histogram bin holding the given fraction of callbacks
+        histogram = histogram or self.histogram
+        count = sum(histogram)
+        if not count:
+            return 0.0
+        running = 0
+        for i, bin_count in enumerate(histogram):
+            running += bin_count
+            if running >= fraction * count:
+                return self.edges_ns[min(i, len(self.edges_ns) - 1)] / 1000
+        return self.edges_ns[-1] / 1000
+
+    def state(self, source_names=()):
+        # Plain-dict copy of every counter, for the control API and the log line
+        callbacks = max(self.callbacks, 1)
+        stages = {stage: {'mean_us': self.stage_ns[i] / callbacks / 1000, 'max_us': self.stage_max_ns[i] / 1000}
+                  for i, stage in enumerate(self.stages)}
+        sources = {name: {'mean_us': total / callbacks / 1000, 'max_us': peak / 1000}
+                   for name, total, peak in zip(source_names, list(self.source_ns), list(self.source_max_ns))}
+        last_miss = None
+        if self.last_miss_time is not None:
+            last_miss = {'time': self.last_miss_time, 'callback_us': self.last_miss_ns / 1000,
+                         'stages_us': {stage: ns / 1000 for stage, ns in zip(self.stages, list(self.miss_stage_ns))},
+                         'sources_us': {name: ns / 1000 for name, ns in zip(source_names, list(self.miss_source_ns))}}
+        return {'callbacks': self.callbacks, 'deadline_misses': self.deadline_misses,
+                'output_underflows': self.output_underflows, 'output_overflows': self.output_overflows,
+                'mean_us': self.total_ns / callbacks / 1000, 'max_us': self.max_ns / 1000,
+                'p50_us': self.percentile_us(0.5), 'p99_us': self.percentile_us(0.99),
+                'histogram': {'edges_us': [edge / 1000 for edge in self.edges_ns], 'counts': list(self.histogram)},
+                'stages': stages, 'sources': sources, 'last_miss': last_miss}
+
+class TelemetryLogThread(threading.Thread):
+    # Logs one line of callback telemetry every interval, as a warning when deadlines were missed
+    def __init__(self, mixer, interval=TELEMETRY_LOG_SECONDS):
+        super().__init__(daemon=True)
+        self.mixer = mixer
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        callbacks = misses = underflows = 0
+        histogram = None
+        while not self.stop_event.wait(self.interval):
+            telemetry = self.mixer.telemetry
+            current = list(telemetry.histogram)
+            window = [a - b for a, b in zip(current, histogram)] if histogram else current
+            state = self.mixer.telemetry_state()
+            new_misses = telemetry.deadline_misses - misses
+            new_underflows = telemetry.output_underflows - underflows
+            worst = max(state['stages'], key=lambda stage: state['stages'][stage]['max_us'])
+            underruns = sum(source['underruns'] for source in state['sources'].values())
+            logging.log(logging.WARNING if new_misses or new_underflows else logging.INFO,
+                        "audio: %d callbacks, p99 %.0f us, %d deadline misses, %d underflows, "
+                        "%d source underruns, slowest stage %s (max %.0f us)",
+                        telemetry.callbacks - callbacks, telemetry.percentile_us(0.99, window), new_misses,
+                        new_underflows, underruns, worst, state['stages'][worst]['max_us'])
+            callbacks, misses, underflows = telemetry.callbacks, telemetry.deadline_misses, telemetry.output_underflows
+            histogram = current
+
+    def stop(self):
+        self.stop_event.set()
+
+class BlockSizeController(threading.Thread):
+    # Steps the output block size between the mixer's limits from measured callback
+    # headroom: up at once when callbacks run close to (or past) their deadline, down
+    # only after several calm intervals, since every step restarts the audio device
+    def __init__(self, mixer, interval=BLOCKSIZE_ADAPT_SECONDS):
+        super().__init__(daemon=True)
+        self.mixer = mixer
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        histogram = None
+        misses = calm = 0
+        while not self.stop_event.wait(self.interval):
+            telemetry = self.mixer.telemetry
+            current = list(telemetry.histogram)
+            window = [a - b for a, b in zip(current, histogram)] if histogram else current
+            new_misses = telemetry.deadline_misses + telemetry.output_underflows - misses
+            histogram, misses = current, telemetry.deadline_misses + telemetry.output_underflows
+            if not sum(window):
+                continue
+            stream = self.mixer.output_stream
+            blocksize = stream.blocksize
+            load = telemetry.percentile_us(0.99, window) * stream.samplerate / (blocksize * 1e6)
+            if new_misses or load > BLOCKSIZE_STEP_UP_LOAD:
+                calm = 0
+                if blocksize < self.mixer.max_blocksize:
+                    self.step(blocksize * 2, load)
+            elif load < BLOCKSIZE_STEP_DOWN_LOAD:
+                calm += 1
+                if calm >= BLOCKSIZE_CALM_INTERVALS and blocksize > self.mixer.min_blocksize:
+                    calm = 0
+                    self.step(blocksize // 2, load)
+            else:
+                calm = 0
+
+    def step(self, blocksize, load):
+        try:
+            previous = self.mixer.output_stream.blocksize
+            blocksize = self.mixer.set_blocksize(blocksize)
+            logging.info("audio: block size %d -> %d frames at %.0f%% p99 callback load", previous, blocksize, load * 100)
+        except Exception:
+            logging.exception("Changing the block size failed")
+
+    def stop(self):
+        self.stop_event.set()
+
+# NDI output
+class NDISenderThread(threading.Thread):
+    # Publishes the mixed bus as NDI audio. The callback copies each block into one
+    # of a small pool of preallocated planar float32 frames; this thread sends them,
+    # so network I/O never runs on the audio thread. When the pool is full the
+    # newest block is dropped and counted rather than waiting.
+    def __init__(self, sender, samplerate, channels, max_frames, pool_size=SENDER_POOL_SIZE, release=None):
+        super().__init__(daemon=True)
+        self.sender = sender
+        self.release = release or sender.close
+        self.samplerate = samplerate
+        self.frames = np.zeros((pool_size, channels, max_frames), dtype=np.float32)
+        self.frame_lengths = [0] * pool_size
+        self.pool_size = pool_size
+        self.write_index = 0
+        self.read_index = 0
+        self.dropped_frames = 0
+        self.sent_frames = 0
+        self.stop_event = threading.Event()
+
+    def push(self, block, frames):
+        # Audio thread: transpose (frames, channels) into the next free planar frame
+        if self.write_index - self.read_index >= self.pool_size:
+            self.dropped_frames += 1
+            return
+        slot = self.write_index % self.pool_size
+        self.frames[slot, :, :frames] = block.T
+        self.frame_lengths[slot] = frames
+        self.write_index += 1
+
+    def run(self):
+        while not self.stop_event.wait(SENDER_POLL_SECONDS):
+            while self.read_index < self.write_index:
+                slot = self.read_index % self.pool_size
+                try:
+                    self.sender.send_audio(self.frames[slot, :, :self.frame_lengths[slot]], sample_rate=self.samplerate)
+                    self.sent_frames += 1
+                except Exception:
+                    logging.exception("Sending NDI audio failed")
+                self.read_index += 1
+        self.release()
+
+    def stop(self):
+        self.stop_event.set()
 
-# Read the configuration file
-config = Configuration(CONFIG_FILE_NAME)
-configuration_data = config.read()
-ndi_names = configuration_data['ndi_sources']
+# Bus routing
+class RoutingMatrix:
+    # Aux buses (monitor, mix-minus, subgroups) fed from the stacked source block
+    # with one (buses, sources) @ (sources, frames * channels) product. Each send is
+    # pre- or post-fader; when the effective gains change, the block crossfades from
+    # the old matrix to the new one so sends move without clicks.
+    def __init__(self, num_sources, max_frames, channels, buses=None):
+        self.num_sources = num_sources
+        self.max_frames = max_frames
+        self.channels = channels
+        self.buses = [dict(bus) for bus in (buses or [])]
+        num_buses = len(self.buses)
+        self.sends = np.zeros((num_buses, num_sources), dtype=np.float32)
+        self.pre_fader = np.zeros((num_buses, num_sources), dtype=np.float32)
+        for b, bus in enumerate(self.buses):
+            count = min(num_sources, len(bus['sends']))
+            self.sends[b, :count] = bus['sends'][:count]
+            self.sends[b, count:] = bus['default_send']
+            self.pre_fader[b, :count] = bus['pre_fader'][:count]
+            self.pre_fader[b, count:] = bus['default_pre_fader']
+            if bus.get('exclude') is not None and bus['exclude'] < num_sources:
+                self.sends[b, bus['exclude']] = 0.0
+        self.post_fader = 1.0 - self.pre_fader
+        self.bus_block = np.zeros((num_buses, max_frames, channels), dtype=np.float32)
+        self.bus_matrix = self.bus_block.reshape(num_buses, max_frames * channels)
+        self.fade_block = np.zeros((num_buses, max_frames, channels), dtype=np.float32)
+        self.fade_matrix = self.fade_block.reshape(num_buses, max_frames * channels)
+        self.sample_index = np.arange(1, max_frames + 1, dtype=np.float32)[:, None]
+        self.ramp = np.zeros((max_frames, 1), dtype=np.float32)
+        self.unmuted = np.zeros(num_sources, dtype=np.float32)
+        self.faders = np.zeros(num_sources, dtype=np.float32)
+        self.effective = np.zeros((num_buses, num_sources), dtype=np.float32)
+        self.post_gains = np.zeros((num_buses, num_sources), dtype=np.float32)
+        self.gain_delta = np.zeros((num_buses, num_sources), dtype=np.float32)
+        self.previous = None
+
+    @property
+    def num_buses(self):
+        return len(self.buses)
+
+    def bus_index(self, bus):
+        # Accept a bus index or name
+        if isinstance(bus, int) or bus.isdigit():
+            index = int(bus)
+            if not 0 <= index < self.num_buses:
+                raise IndexError(f"No bus with index {index}")
+            return index
+        return [b['name'] for b in self.buses].index(bus)
+
+    def bus_settings(self):
+        return [dict(bus, sends=self.sends[b].tolist(), pre_fader=self.pre_fader[b].tolist())
+                for b, bus in enumerate(self.buses)]
+
+    def with_bus(self, name, sender_name, default_send=0.0, pre_fader=False, exclude=None):
+        bus = {'name': name, 'sender_name': sender_name, 'default_send': default_send,
+               'default_pre_fader': float(pre_fader), 'exclude': exclude, 'sends': [], 'pre_fader': []}
+        return RoutingMatrix(self.num_sources, self.max_frames, self.channels, self.bus_settings() + [bus])
+
+    def without_bus(self, index):
+        buses = self.bus_settings()
+        return RoutingMatrix(self.num_sources, self.max_frames, self.channels, buses[:index] + buses[index + 1:])
+
+    def resized(self, num_sources):
+        return RoutingMatrix(num_sources, self.max_frames, self.channels, self.bus_settings())
+
+    def removed(self, index):
+        buses = self.bus_settings()
+        for bus in buses:
+            bus['sends'] = bus['sends'][:index] + bus['sends'][index + 1:]
+            bus['pre_fader'] = bus['pre_fader'][:index] + bus['pre_fader'][index + 1:]
+            if bus['exclude'] is not None and bus['exclude'] >= index:
+                bus['exclude'] = None if bus['exclude'] == index else bus['exclude'] - 1
+        return RoutingMatrix(self.num_sources - 1, self.max_frames, self.channels, buses)
+
+    def set_send(self, bus, source, gain=None, pre_fader=None):
+        if gain is not None:
+            self.sends[bus, source] = gain
+        if pre_fader is not None:
+            self.pre_fader[bus, source] = float(pre_fader)
+            self.post_fader[bus, source] = 1.0 - float(pre_fader)
+
+    def mix(self, source_matrix, parameters, frames):
+        # Fill bus_block[:, :frames] from the (sources, frames * channels) source matrix
+        samples = frames * self.channels
+        sources = parameters.sources
+        np.subtract(1.0, sources['mute'], out=self.unmuted)
+        np.multiply(sources['gain'], self.unmuted, out=self.faders)
+        effective = self.effective
+        np.multiply(self.pre_fader, self.unmuted[None, :], out=effective)
+        np.multiply(self.post_fader, self.faders[None, :], out=self.post_gains)
+        effective += self.post_gains
+        effective *= self.sends
+        np.matmul(effective, source_matrix[:, :samples], out=self.bus_matrix[:, :samples])
+
+        if self.previous is None:
+            self.previous = effective.copy()
+            return self.bus_block
+        delta = self.gain_delta
+        np.subtract(self.previous, effective, out=delta)
+        if np.abs(delta, out=delta).max(initial=0.0) > 1e-6:
+            # Crossfade linearly from the previous gains across this block
+            np.matmul(self.previous, source_matrix[:, :samples], out=self.fade_matrix[:, :samples])
+            ramp = self.ramp[:frames]
+            np.multiply(self.sample_index[:frames], 1.0 / frames, out=ramp)
+            bus_audio = self.bus_block[:, :frames]
+            fade_audio = self.fade_block[:, :frames]
+            bus_audio -= fade_audio
+            bus_audio *= ramp
+            bus_audio += fade_audio
+            self.previous[:] = effective
+        return self.bus_block
+
+# Multi-process DSP
+def source_dsp_chain(delay, phase, eq, dynamics):
+    # The delay always runs so its history stays current; the rest only when switched on
+    chain = [('delay', delay)]
+    for stage, processor in (('phase', phase), ('eq', eq), ('dynamics', dynamics)):
+        if processor.enabled:
+            chain.append((stage, processor))
+    return tuple(chain)
+
+def apply_dsp_parameter(name, value, eq, dynamics, phase, delay=None):
+    # Push one parameter-store value into the DSP objects that own it; delay is None on the master
+    if name == 'delay_ms':
+        delay.set_delay_ms(value)
+    elif name == 'eq_enabled':
+        eq.enabled = bool(value)
+    elif name in EQ_BAND_PARAMETERS:
+        eq.set_band(EQ_BAND_PARAMETERS.index(name), gain_db=float(value))
+    elif name == 'compression_enabled':
+        dynamics.enabled = bool(value)
+    elif name == 'compression_threshold_db':
+        dynamics.set_params(threshold_db=float(value))
+    elif name == 'phase_enabled':
+        phase.enabled = bool(value)
+    elif name in ('invert', 'phase_deg'):
+        phase.set_phase(invert=bool(value) if name == 'invert' else None,
+                        angle_deg=float(value) if name == 'phase_deg' else None)
+        if delay is not None:
+            # Per-source phase is skipped while both settings are neutral
+            phase.enabled = phase.invert or bool(phase.angle_deg % 360)
+
+def dsp_state(processors):
+    # The running state of one source's processors (delay history, filter memories,
+    # envelopes) without their settings, which the control messages keep in step anyway
+    return [{name: getattr(processor, name) for name in processor.STATE} for processor in processors]
+
+def restore_dsp_state(processors, states):
+    for processor, state in zip(processors, states):
+        for name, value in state.items():
+            setattr(processor, name, value)
+
+def run_dsp_worker(shm_name, num_sources, max_frames, channels, processors, control, states, start_signal, done_signal):
+    # Worker process: wait for a block, apply any queued control messages, then run
+    # every source's chain in place on the shared block and signal done. While no
+    # blocks come the control queue is still polled, so a state request is answered
+    # even when the callback has stopped using this worker.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header = np.ndarray(DSP_HEADER_FIELDS, dtype=np.int64, buffer=shm.buf)
+    block = np.ndarray((num_sources, max_frames, channels), dtype=np.float32, buffer=shm.buf, offset=header.nbytes)
+    timings = np.ndarray(num_sources, dtype=np.int64, buffer=shm.buf, offset=header.nbytes + block.nbytes)
+    chains = [source_dsp_chain(*source_processors) for source_processors in processors]
+    try:
+        while True:
+            started = start_signal.acquire(timeout=DSP_CONTROL_POLL_SECONDS)
+            if header[DSP_STOP]:
+                break
+            while True:
+                try:
+                    index, target, method, args, kwargs = control.get_nowait()
+                except queue.Empty:
+                    break
+                if target == 'state':
+                    states.put([dsp_state(source_processors) for source_processors in processors])
+                    continue
+                delay, phase, eq, dynamics = processors[index]
+                if target is None:
+                    apply_dsp_parameter(*args, eq, dynamics, phase, delay)
+                else:
+                    processor = {'delay': delay, 'phase': phase, 'eq': eq, 'dynamics': dynamics}[target]
+                    getattr(processor, method)(*args, **kwargs)
+                chains[index] = source_dsp_chain(*processors[index])
+            if not started:
+                continue
+            frames = int(header[DSP_FRAMES])
+            for i, chain in enumerate(chains):
+                source_start = time.perf_counter_ns()
+                source_audio = block[i, :frames]
+                for stage, processor in chain:
+                    processor.process(source_audio)
+                timings[i] = time.perf_counter_ns() - source_start
+            done_signal.release()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del header, block, timings
+        shm.close()
+
+class DSPShard:
+    # One worker process and the shared-memory block for its contiguous range of sources
+    def __init__(self, first, last, processors, max_frames, channels):
+        self.first = first
+        self.last = last
+        size = DSP_HEADER_FIELDS * 8 + (last - first) * (max_frames * channels * 4 + 8)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.header = np.ndarray(DSP_HEADER_FIELDS, dtype=np.int64, buffer=self.shm.buf)
+        self.header[:] = 0
+        self.block = np.ndarray((last - first, max_frames, channels), dtype=np.float32,
+                                buffer=self.shm.buf, offset=self.header.nbytes)
+        # Nanoseconds each source's chain took on the last block, for the callback's telemetry
+        self.timings = np.ndarray(last - first, dtype=np.int64, buffer=self.shm.buf,
+                                  offset=self.header.nbytes + self.block.nbytes)
+        self.control = multiprocessing.Queue()
+        self.states = multiprocessing.Queue()
+        self.start_signal = multiprocessing.Semaphore(0)
+        self.done_signal = multiprocessing.Semaphore(0)
+        self.busy = False
+        self.dispatched = False
+        self.late_blocks = 0
+        self.worker = multiprocessing.Process(
+            target=run_dsp_worker, daemon=True,
+            args=(self.shm.name, last - first, max_frames, channels, processors[first:last],
+                  self.control, self.states, self.start_signal, self.done_signal))
+        self.worker.start()
+
+    def close(self):
+        self.header[DSP_STOP] = 1
+        self.start_signal.release()
+        self.worker.join(DSP_WORKER_JOIN_SECONDS)
+        if self.worker.is_alive():
+            self.worker.terminate()
+        self.control.close()
+        self.states.close()
+        del self.header, self.block, self.timings
+        self.shm.close()
+        self.shm.unlink()
+
+class DSPWorkerPool:
+    # Shards the per-source chains (delay, phase, EQ, dynamics) across worker processes,
+    # so large source counts are not bound to one core by the GIL. The callback reads each
+    # shard's rings straight into its shared-memory block, wakes every worker and copies
+    # the processed rows back into the mix engine; audio never goes through pickle, only
+    # the small control messages that keep the workers' processors in step with the mixer's.
+    # A worker that misses the deadline leaves its sources silent for that block and is
+    # skipped until it has caught up. The workers own the running state of their
+    # processors; sync() copies it back into this process's copies.
+    def __init__(self, processors, workers, max_frames, channels):
+        self.processors = processors
+        self.num_sources = len(processors)
+        bounds = [round(i * self.num_sources / workers) for i in range(workers + 1)]
+        self.shards = [DSPShard(first, last, processors, max_frames, channels)
+                       for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+        self.shard_of = [(shard, index - shard.first) for shard in self.shards for index in range(shard.first, shard.last)]
+
+    @property
+    def late_blocks(self):
+        return sum(shard.late_blocks for shard in self.shards)
+
+    def send(self, index, target, method, *args, **kwargs):
+        # Forward a processor change to the worker that owns source index
+        shard, local = self.shard_of[index]
+        shard.control.put((local, target, method, args, kwargs))
+
+    def sync(self, timeout):
+        # Pull every worker's delay, filter and envelope state back into the processors the
+        # pool was forked from, so in-process DSP or a new pool carries on where it left off
+        for shard in self.shards:
+            shard.control.put((None, 'state', None, (), {}))
+        for shard in self.shards:
+            try:
+                states = shard.states.get(timeout=timeout)
+            except queue.Empty:
+                logging.warning("DSP worker for sources %d-%d did not report its state", shard.first, shard.last - 1)
+                continue
+            for source_processors, source_states in zip(self.processors[shard.first:shard.last], states):
+                restore_dsp_state(source_processors, source_states)
+
+    def begin(self):
+        # Audio thread: take back workers that finished a late block since the last callback
+        for shard in self.shards:
+            if shard.busy and shard.done_signal.acquire(False):
+                shard.busy = False
+
+    def source_buffer(self, index, frames, engine):
+        # Where the callback reads source index: its worker's shared block, or the engine's
+        # own row while that worker is still busy
+        shard, local = self.shard_of[index]
+        if shard.busy:
+            return engine.source_buffer(index, frames)
+        return shard.block[local, :frames]
+
+    def run(self, source_block, frames, timeout, telemetry):
+        # Audio thread: process one block on every idle worker and gather the results
+        for shard in self.shards:
+            shard.dispatched = not shard.busy
+            if shard.dispatched:
+                shard.header[DSP_FRAMES] = frames
+                shard.busy = True
+                shard.start_signal.release()
+        deadline = time.monotonic() + timeout
+        for shard in self.shards:
+            rows = source_block[shard.first:shard.last, :frames]
+            if shard.dispatched and shard.done_signal.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                shard.busy = False
+                rows[:] = shard.block[:, :frames]
+                for local, elapsed in enumerate(shard.timings):
+                    telemetry.mark_source(shard.first + local, None, int(elapsed))
+            else:
+                shard.late_blocks += shard.dispatched
+                rows[:] = 0.0
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+# Scenes
+class Scene:
+    # A snapshot compiled against the current source list: whole parameter tables ready
+    # to swap into the store, EQ band shapes and a (buses, sources) send matrix, so a
+    # recall does no name lookups or parsing. Masks mark what the snapshot actually set;
+    # everything else keeps its live value.
+    def __init__(self, names, sources, source_mask, master, source_bands, master_bands, bus_names, sends, send_mask):
+        self.names = names
+        self.sources = sources
+        self.source_mask = source_mask
+        self.master = master
+        self.source_bands = source_bands
+        self.master_bands = master_bands
+        self.bus_names = bus_names
+        self.sends = sends
+        self.send_mask = send_mask
+
+class SceneFader(threading.Thread):
+    # Walks what cannot ramp per sample, EQ band gains and bus sends, from where they were
+    # to the scene's values at control rate while the mix engine fades the source gains
+    def __init__(self, mixer, eq_moves, routing, send_from, send_to, seconds):
+        super().__init__(daemon=True)
+        self.mixer = mixer
+        self.eq_moves = eq_moves
+        self.routing = routing
+        self.send_from = send_from
+        self.send_to = send_to
+        self.seconds = seconds
+        self.stop_event = threading.Event()
+
+    def run(self):
+        parameters = self.mixer.parameters
+        begin = time.monotonic()
+        while True:
+            progress = min(1.0, (time.monotonic() - begin) / self.seconds) if self.seconds > 0 else 1.0
+            for index, name, start, end in self.eq_moves:
+                value = start + (end - start) * progress
+                if index is None:
+                    parameters.set_master(name, value)
+                else:
+                    parameters.set_source(index, name, value)
+            if self.routing is self.mixer.routing:
+                self.routing.sends[:] = self.send_from + (self.send_to - self.send_from) * progress
+            if progress >= 1.0 or self.stop_event.wait(SCENE_CONTROL_SECONDS):
+                break
+
+    def stop(self):
+        self.stop_event.set()
+
+# Recording
+class RecordTap:
+    # SPSC ring of interleaved frames laid out exactly as they go to disk: each source's
+    # channels in turn, then the program bus. The audio callback copies every block in,
+    # or counts it as dropped when the writer has fallen behind, and never waits.
+    def __init__(self, names, samplerate, channels, capacity):
+        self.names = list(names)
+        self.samplerate = samplerate
+        self.rows = len(self.names)
+        self.channels = channels
+        self.tracks = self.rows * channels
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, self.tracks), dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.dropped_frames = 0
+
+    def push(self, source_block, bus, frames):
+        # Audio thread
+        if self.capacity - (self.write_pos - self.read_pos) < frames:
+            self.dropped_frames += frames
+            return
+        sources = min(len(source_block), self.rows - 1)
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.copy(self.buffer[start:start + first], source_block, bus, 0, first, sources)
+        if first < frames:
+            self.copy(self.buffer[:frames - first], source_block, bus, first, frames, sources)
+        self.write_pos += frames
+
+    def copy(self, target, source_block, bus, begin, end, sources):
+        target = target.reshape(end - begin, self.rows, self.channels)
+        target[:, :sources] = source_block[:sources, begin:end].transpose(1, 0, 2)
+        target[:, -1] = bus[begin:end]
+
+    def pending(self):
+        # Writer side: the unread frames as at most two contiguous views of the ring
+        available = self.write_pos - self.read_pos
+        start = self.read_pos % self.capacity
+        first = min(available, self.capacity - start)
+        return [view for view in (self.buffer[start:start + first], self.buffer[:available - first]) if len(view)]
+
+    def consume(self, frames):
+        self.read_pos += frames
+
+class WaveWriter:
+    # Streams float32 frames into a WAVE_FORMAT_EXTENSIBLE file. A JUNK chunk reserves
+    # room for an EBU Tech 3306 ds64 chunk, so a file that outgrows the 4 GiB RIFF limit
+    # becomes RF64 on close without moving any audio. The sizes in the header are
+    # refreshed every RECORD_HEADER_SECONDS, so a crash still leaves a readable file.
+    HEADER_BYTES = 116
+
+    def __init__(self, path, samplerate, names, channels):
+        self.path = path
+        self.samplerate = samplerate
+        self.tracks = len(names) * channels
+        self.frames = 0
+        self.header_frames = 0
+        self.file = open(path, 'wb', buffering=RECORD_FILE_BUFFER_BYTES)
+        block_align = self.tracks * 4
+        self.file.write(b'RIFF' + struct.pack('<I', 0) + b'WAVE')
+        self.file.write(b'JUNK' + struct.pack('<I', 28) + bytes(28))
+        self.file.write(b'fmt ' + struct.pack('<IHHIIHHHHI', 40, 0xFFFE, self.tracks, samplerate,
+                                              samplerate * block_align, block_align, 32, 22, 32, 0) + WAVE_FLOAT_GUID)
+        self.file.write(b'fact' + struct.pack('<II', 4, 0))
+        self.file.write(b'data' + struct.pack('<I', 0))
+        with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+            json.dump({'samplerate': samplerate, 'channels_per_track': channels, 'tracks': list(names),
+                       'started': time.strftime('%Y-%m-%dT%H:%M:%S')}, f, indent=4)
+
+    def write(self, block):
+        # block is a contiguous (frames, tracks) float32 view, written as it is
+        self.file.write(block)
+        self.frames += len(block)
+        if self.frames - self.header_frames >= RECORD_HEADER_SECONDS * self.samplerate:
+            self.update_header()
+
+    def update_header(self, final=False):
+        data_bytes = self.frames * self.tracks * 4
+        riff_bytes = self.HEADER_BYTES - 8 + data_bytes
+        position = self.file.tell()
+        if riff_bytes <= 0xFFFFFFFF:
+            self.file.seek(4)
+            self.file.write(struct.pack('<I', riff_bytes))
+            self.file.seek(104)
+            self.file.write(struct.pack('<I', self.frames))
+            self.file.seek(112)
+            self.file.write(struct.pack('<I', data_bytes))
+        elif final:
+            self.file.seek(0)
+            self.file.write(b'RF64' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE')
+            self.file.write(b'ds64' + struct.pack('<IQQQI', 28, riff_bytes, data_bytes, self.frames, 0))
+            self.file.seek(104)
+            self.file.write(struct.pack('<I', 0xFFFFFFFF))
+            self.file.seek(112)
+            self.file.write(struct.pack('<I', 0xFFFFFFFF))
+        self.file.seek(position)
+        self.header_frames = self.frames
+
+    def close(self):
+        self.update_header(final=True)
+        self.file.close()
+
+class FlacWriter:
+    # FLAC stops at eight channels, so each source and the program bus get a file of
+    # their own, written through soundfile as 24-bit PCM
+    def __init__(self, path, samplerate, names, channels):
+        if soundfile is None:
+            raise RuntimeError("FLAC recording needs the soundfile package")
+        stem = os.path.splitext(path)[0]
+        self.path = path
+        self.channels = channels
+        self.frames = 0
+        safe_names = [re.sub(r'[^\w.-]+', '_', name) for name in names]
+        self.files = [soundfile.SoundFile(f"{stem}-{i:02d}-{name}.flac", 'w', samplerate, channels,
+                                          RECORD_FLAC_SUBTYPE, format='FLAC')
+                      for i, name in enumerate(safe_names)]
+
+    def write(self, block):
+        block = np.clip(block, -1.0, 1.0).reshape(len(block), len(self.files), self.channels)
+        for track, f in enumerate(self.files):
+            f.write(block[:, track])
+        self.frames += len(block)
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+class RecorderThread(threading.Thread):
+    # Drains the mixer's record tap off the audio thread. While idle it keeps only the
+    # newest pre-roll seconds; a recording starts with those and then takes everything
+    # the tap delivers, in large sequential writes. Files rotate every rotate_seconds
+    # and whenever the source list changes, since that changes the track layout.
+    def __init__(self, mixer, directory, file_format='wav', rotate_seconds=RECORD_ROTATE_SECONDS,
+                 preroll_seconds=RECORD_PREROLL_SECONDS, prefix='mix'):
+        super().__init__(daemon=True)
+        if file_format not in RECORD_FORMATS:
+            raise ValueError(f"Unknown recording format {file_format!r}")
+        if file_format == 'flac' and soundfile is None:
+            raise RuntimeError("FLAC recording needs the soundfile package")
+        self.mixer = mixer
+        self.directory = directory
+        self.file_format = file_format
+        self.rotate_seconds = rotate_seconds
+        self.preroll_seconds = preroll_seconds
+        self.prefix = prefix
+        self.tap = None
+        self.preroll = None
+        self.preroll_frames = 0
+        self.writer = None
+        self.files = []
+        self.commands = queue.Queue()
+        self.stop_event = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    def start_recording(self):
+        self.commands.put('start')
+
+    def stop_recording(self):
+        self.commands.put('stop')
+
+    def state(self):
+        writer = self.writer
+        tap = self.tap
+        return {'recording': writer is not None, 'format': self.file_format,
+                'file': writer.path if writer is not None else None,
+                'seconds': writer.frames / tap.samplerate if writer is not None else 0.0,
+                'files': list(self.files), 'dropped_frames': tap.dropped_frames if tap is not None else 0}
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(RECORD_POLL_SECONDS):
+                try:
+                    self.poll()
+                except Exception:
+                    logging.exception("Recording failed")
+                    self.close_file()
+        finally:
+            self.drain()
+            self.close_file()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def poll(self):
+        tap = self.mixer.record_tap
+        if tap is not self.tap:
+            # New track layout: finish the old file and carry on recording in a new one
+            recording = self.writer is not None
+            self.drain()
+            self.close_file()
+            self.tap = tap
+            self.preroll = np.zeros((int(self.preroll_seconds * tap.samplerate), tap.tracks), dtype=np.float32)
+            self.preroll_frames = 0
+            if recording:
+                self.open_file()
+        while not self.commands.empty():
+            command = self.commands.get_nowait()
+            self.drain()
+            if command == 'start' and self.writer is None:
+                self.open_file()
+            elif command == 'stop':
+                self.close_file()
+        self.drain()
+
+    def drain(self):
+        tap = self.tap
+        if tap is None:
+            return
+        for block in tap.pending():
+            if self.writer is not None:
+                self.record(block)
+            else:
+                self.keep_preroll(block)
+            tap.consume(len(block))
+
+    def record(self, block):
+        # Write up to the rotation point, then carry on in the next file
+        rotate_frames = int(self.rotate_seconds * self.tap.samplerate)
+        while len(block):
+            room = max(rotate_frames - self.writer.frames, 0)
+            self.writer.write(block[:room])
+            block = block[room:]
+            if self.writer.frames >= rotate_frames:
+                self.close_file()
+                self.open_file(preroll=False)
+
+    def keep_preroll(self, block):
+        length = len(self.preroll)
+        if not length:
+            return
+        block = block[-length:]
+        start = self.preroll_frames % length
+        first = min(len(block), length - start)
+        self.preroll[start:start + first] = block[:first]
+        self.preroll[:len(block) - first] = block[first:]
+        self.preroll_frames += len(block)
+
+    def open_file(self, preroll=True):
+        tap = self.tap
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{len(self.files):03d}.{self.file_format}")
+        writer_class = FlacWriter if self.file_format == 'flac' else WaveWriter
+        self.writer = writer_class(path, tap.samplerate, tap.names, tap.channels)
+        self.files.append(path)
+        logging.info("Recording %d tracks to %s", len(tap.names), path)
+        if preroll and self.preroll_frames > len(self.preroll):
+            # The pre-roll ring has wrapped: oldest frames first
+            start = self.preroll_frames % len(self.preroll)
+            self.writer.write(self.preroll[start:])
+            self.writer.write(self.preroll[:start])
+        elif preroll:
+            self.writer.write(self.preroll[:self.preroll_frames])
+        self.preroll_frames = 0
+
+    def close_file(self):
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            writer.close()
+            logging.info("Recorded %.1f s to %s", writer.frames / self.tap.samplerate, writer.path)
+
+# Source discovery
+class SourceDiscoveryThread(threading.Thread):
+    # One long-lived thread that periodically reconciles the mixer with the NDI network
+    def __init__(self, mixer, interval=DISCOVERY_INTERVAL_SECONDS):
+        super().__init__(daemon=True)
+        self.mixer = mixer
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.mixer.update_sources()
+            except Exception:
+                logging.exception("NDI source discovery failed")
+
+    def stop(self):
+        self.stop_event.set()
+
+# Remote control
+class ControlServer:
+    # Local HTTP control API, so the engine can be driven without Tk. All bodies are JSON.
+    #
+    #   GET    /state                      sources (name, online, parameters) and master parameters
+    #   POST   /master                     {"gain": 0.8, "eq_enabled": 1, "eq_low_db": 3, ...}
+    #   POST   /sources                    {"name": "NDI Source 4"} adds a source
+    #   POST   /sources/<source>           {"gain": 0.5, "mute": 1, "delay_ms": 40, ...}
+    #   POST   /sources/<source>/eq/<band> {"type": "peak", "freq": 2500, "q": 1.4, "gain_db": -3}
+    #   POST   /master/eq/<band>           same as above for the master EQ
+    #   DELETE /sources/<source>           removes a source
+    #   POST   /buses                      {"name": "Guest 1", "sender_name": "...", "mix_minus": "Guest 1 Cam"}
+    #   POST   /buses/<bus>/sends/<source> {"gain": 0.7, "pre_fader": 1}
+    #   DELETE /buses/<bus>                removes an aux bus
+    #   POST   /stream                     {"blocksize": 256} reopens the output at a new block size
+    #   GET    /snapshots                  names of the saved snapshots
+    #   POST   /snapshots                  {"name": "Panel"} saves the current settings as a snapshot
+    #   POST   /snapshots/<name>/recall    {"fade": 2.0} fades to a snapshot over that many seconds
+    #   DELETE /snapshots/<name>           removes a snapshot
+    #   GET    /meters                     latest meter snapshot
+    #   GET    /meters/stream              the same snapshots as a Server-Sent Events feed
+    #   GET    /metrics                    callback timing histogram, deadline misses, xruns and underruns
+    #   GET    /alarms                     silence, clipping, DC offset and feedback alarms per source
+    #   GET    /record                     whether a recording is running, its file and dropped frames
+    #   POST   /record/start               starts recording every source and the program bus, with pre-roll
+    #   POST   /record/stop                finishes the current recording
+    #
+    # <source> is either the source index or its URL-encoded NDI name. Parameter names are
+    # the fields of SOURCE_PARAMETERS and MASTER_PARAMETERS.
+    def __init__(self, mixer, host=DEFAULT_CONTROL_HOST, port=DEFAULT_CONTROL_PORT, config=None):
+        self.mixer = mixer
+        self.config = config
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def handler_class(self):
+        mixer = self.mixer
+        config = self.config
+
+        class ControlRequestHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug("control: " + format, *args)
+
+            def send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(body, dict):
+                    raise ValueError("Request body must be a JSON object")
+                return body
+
+            def path_parts(self):
+                return [unquote(part) for part in urlparse(self.path).path.strip('/').split('/') if part]
+
+            def do_GET(self):
+                parts = self.path_parts()
+                if parts == ['state']:
+                    self.send_json(200, mixer.state())
+                elif parts == ['meters']:
+                    self.send_json(200, mixer.meter_state())
+                elif parts == ['meters', 'stream']:
+                    self.stream_meters()
+                elif parts == ['metrics']:
+                    self.send_json(200, mixer.telemetry_state())
+                elif parts == ['alarms']:
+                    self.send_json(200, mixer.alarm_state())
+                elif parts == ['record']:
+                    self.send_json(200, mixer.recording_state())
+                elif parts == ['snapshots'] and config is not None:
+                    self.send_json(200, {'snapshots': config.snapshot_names()})
+                else:
+                    self.send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                parts = self.path_parts()
+                try:
+                    body = self.read_json()
+                    if parts == ['master']:
+                        mixer.parameters.update(body)
+                    elif len(parts) == 3 and parts[:2] == ['master', 'eq']:
+                        mixer.set_master_eq_band(int(parts[2]), **body)
+                    elif parts == ['sources']:
+                        mixer.add_ndi_source(body['name'])
+                    elif len(parts) == 2 and parts[0] == 'sources':
+                        mixer.parameters.update(body, mixer.source_index(parts[1]))
+                    elif len(parts) == 4 and parts[0] == 'sources' and parts[2] == 'eq':
+                        mixer.set_source_eq_band(mixer.source_index(parts[1]), int(parts[3]), **body)
+                    elif parts == ['stream']:
+                        mixer.set_blocksize(finite_number(body['blocksize'], 'blocksize'))
+                    elif parts == ['snapshots'] and config is not None:
+                        config.store_snapshot(body['name'], mixer.settings())
+                    elif len(parts) == 3 and parts[0] == 'snapshots' and parts[2] == 'recall' and config is not None:
+                        mixer.recall_snapshot(parts[1], config.snapshot(parts[1]),
+                                              finite_number(body.get('fade', DEFAULT_SCENE_FADE_SECONDS), 'fade'))
+                    elif parts == ['record', 'start'] and mixer.recorder is not None:
+                        mixer.start_recording()
+                    elif parts == ['record', 'stop'] and mixer.recorder is not None:
+                        mixer.stop_recording()
+                    elif parts == ['buses']:
+                        mixer.add_bus(body['name'], body.get('sender_name'),
+                                      finite_number(body.get('default_send', 0.0), 'default_send'),
+                                      bool(body.get('pre_fader', False)), body.get('mix_minus'))
+                    elif len(parts) == 4 and parts[0] == 'buses' and parts[2] == 'sends':
+                        gain, pre_fader = body.get('gain'), body.get('pre_fader')
+                        mixer.set_bus_send(parts[1], parts[3], None if gain is None else finite_number(gain, 'gain'),
+                                           None if pre_fader is None else bool(pre_fader))
+                    else:
+                        self.send_json(404, {'error': 'not found'})
+                        return
+                except (KeyError, ValueError, IndexError, TypeError, AttributeError) as e:
+                    self.send_json(400, {'error': str(e)})
+                    return
+                self.send_json(200, mixer.state())
+
+            def do_DELETE(self):
+                parts = self.path_parts()
+                if len(parts) != 2 or parts[0] not in ('sources', 'buses', 'snapshots') or (
+                        parts[0] == 'snapshots' and config is None):
+                    self.send_json(404, {'error': 'not found'})
+                    return
+                try:
+                    if parts[0] == 'sources':
+                        mixer.remove_ndi_source_at(mixer.source_index(parts[1]))
+                    elif parts[0] == 'buses':
+                        mixer.remove_bus(parts[1])
+                    else:
+                        config.delete_snapshot(parts[1])
+                except (KeyError, ValueError, IndexError, TypeError, AttributeError) as e:
+                    self.send_json(400, {'error': str(e)})
+                    return
+                self.send_json(200, mixer.state())
+
+            def stream_meters(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                sequence = -1
+                try:
+                    while True:
+                        snapshot = mixer.meter_snapshot()
+                        if snapshot.sequence != sequence:
+                            sequence = snapshot.sequence
+                            self.wfile.write(b'data: ' + json.dumps(mixer.meter_state()).encode() + b'\n\n')
+                            self.wfile.flush()
+                        time.sleep(METER_REFRESH_MS / 1000)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return ControlRequestHandler
 
 class NDI_Audio_Mixer:
-    def __init__(self, ndi_names):
-        self.ndi_names = ndi_names
-        self.finder = pyndi.Finder()
+    def __init__(self, ndi_names, target_latency_ms=DEFAULT_TARGET_LATENCY_MS, underrun_fill='silence',
+                 samplerate=None, channels=None, blocksize=DEFAULT_BLOCKSIZE, min_blocksize=None,
+                 max_blocksize=None, stream_latency='high', dsp_workers=0, backend=None):
+        self.ndi_names = list(dict.fromkeys(ndi_names))
+        self.samplerate = samplerate
+        self.channels = channels
+        # Every buffer is sized for max_blocksize, so the block size can move within the limits at run time
+        self.blocksize = blocksize
+        self.min_blocksize = min(min_blocksize or blocksize, blocksize)
+        self.max_blocksize = max(max_blocksize or blocksize, blocksize)
+        self.stream_latency = stream_latency
+        self.dsp_workers = dsp_workers
+        self.dsp_pool = None
+        self.scene_fader = None
+        self.scene_cache = {}
+        self.channel_matrices = {}
+        self.target_latency_ms = target_latency_ms
+        self.underrun_fill = underrun_fill
+        # Pooled NDI handles: a backend name (or None) shares the process runtime, an opened backend gets its own
+        if backend is None or isinstance(backend, str):
+            self.runtime = ndi_runtime.get_runtime(backend)
+        else:
+            self.runtime = ndi_runtime.NDIRuntime(backend)
+        self.sources_lock = threading.RLock()
+        self.parameters = ParameterStore(len(self.ndi_names), listener=self.apply_parameter)
+        self.mix_engine = None
+        self.receivers = [None] * len(self.ndi_names)
+        self.source_online = [False] * len(self.ndi_names)
+        self.ring_buffers = []
+        self.receiver_threads = [None] * len(self.ndi_names)
+        self.source_delays = []
+        self.source_eqs = []
+        self.source_dynamics = []
+        self.source_phases = []
+        self.source_chains = []
+        self.master_chain = ()
+        self.master_eq = None
+        self.master_phase = None
+        self.master_compressor = None
+        self.master_limiter = None
+        self.meter = None
+        self.signal_monitor = None
+        self.record_tap = None
+        self.recorder = None
+        self.telemetry = None
+        self.sender_thread = None
+        self.routing = None
+        self.bus_senders = []
+        self.bus_limiters = []
         self.update_sources()
-        self.update_sources_periodically()
         self.init_output_stream()
         self.init_ndi_sender()
-        
+        self.discovery_thread = SourceDiscoveryThread(self)
+        self.discovery_thread.start()
+
     def update_sources(self):
-        sources = self.finder.get_sources()
-        self.ndi_sources = [next((source for source in sources if source.name == name), None) for name in self.ndi_names]
-        if None in self.ndi_sources:
-            raise ValueError(f"Some NDI sources could not be found: {', '.join(name for name, source in zip(self.ndi_names, self.ndi_sources) if source is None)}")
-        self.receivers = [pyndi.Receiver() for _ in self.ndi_sources]
-        for receiver, ndi_source in zip(self.receivers, self.ndi_sources):
-            receiver.create_receiver(ndi_source)
-
-    def update_sources_periodically(self, interval=5.0):
-        self.update_sources()
-        threading.Timer(interval, self.update_sources_periodically).start()
+        # Diff the sources on the network against our slots: connect the ones that
+        # appeared, mark the ones that vanished offline and leave live receivers alone
+        sources = set(self.runtime.find_sources())
+        with self.sources_lock:
+            for i, name in enumerate(self.ndi_names):
+                if name not in sources:
+                    if self.source_online[i]:
+                        self.disconnect_source(i)
+                elif not self.source_online[i]:
+                    self.connect_source(i, name)
+
+    def connect_source(self, index, name):
+        self.receivers[index] = self.runtime.acquire_receiver(name)
+        self.source_online[index] = True
+        if self.mix_engine is not None:
+            self.start_receiver_thread(index)
+
+    def disconnect_source(self, index):
+        self.release_receiver(index)
+        self.source_online[index] = False
+        if self.mix_engine is not None:
+            # A fresh, empty ring plays silence until the source comes back
+            self.ring_buffers[index] = self.new_ring_buffer()
 
     def add_ndi_source(self, name):
-        self.ndi_names.append(name)
+        # One slot per NDI name: the runtime pools receivers by name, so a second slot would
+        # share the first one's receiver and each thread would get only part of the audio
+        if not isinstance(name, str) or not name:
+            raise ValueError("Source name must be a non-empty string")
+        with self.sources_lock:
+            if name in self.ndi_names:
+                raise ValueError(f"Source {name} is already in the mix")
+            self.stop_scene_fade()
+            # Before the source counts change, while the workers are still the ones running
+            self.sync_dsp_pool()
+            self.ndi_names.append(name)
+            self.receivers = self.receivers + [None]
+            self.source_online = self.source_online + [False]
+            self.receiver_threads = self.receiver_threads + [None]
+            self.parameters = self.parameters.resized(len(self.ndi_names))
+            if self.mix_engine is not None:
+                self.mix_engine = self.new_mix_engine()
+                self.routing = self.routing.resized(len(self.ndi_names))
+                self.telemetry.resize_sources(len(self.ndi_names))
+                self.update_source_processors()
         self.update_sources()
 
     def remove_ndi_source(self, name):
-        self.ndi_names.remove(name)
-        self.update_sources()
+        with self.sources_lock:
+            self.remove_ndi_source_at(self.ndi_names.index(name))
+
+    def remove_ndi_source_at(self, index):
+        with self.sources_lock:
+            if not 0 <= index < len(self.ndi_names):
+                raise IndexError(f"No source with index {index}")
+            self.stop_scene_fade()
+            self.sync_dsp_pool()
+            self.release_receiver(index)
+            self.ndi_names.pop(index)
+            # Rebuild the per-source lists rather than mutating them under the audio callback
+            for attribute in ('receivers', 'source_online', 'receiver_threads', 'ring_buffers', 'source_delays',
+                              'source_eqs', 'source_dynamics', 'source_phases', 'source_chains'):
+                values = getattr(self, attribute)
+                setattr(self, attribute, values[:index] + values[index + 1:])
+            self.parameters = self.parameters.removed(index)
+            if self.mix_engine is not None:
+                self.mix_engine = self.new_mix_engine()
+                self.routing = self.routing.removed(index)
+                self.telemetry.resize_sources(len(self.ndi_names), removed=index)
+                self.update_source_processors()
 
     def init_output_stream(self):
-        samplerate = self.receivers[0].audio_sample_rate
-        blocksize = 1024
-        channels = self.receivers[0].audio_channels
-        self.output_stream = sd.OutputStream(
+        # Use the configured bus format, else the first online source's, else the defaults;
+        # every source is converted to it on its receiver thread
+        receiver = next((receiver for receiver in self.receivers if receiver is not None), None)
+        samplerate = self.samplerate or (receiver.audio_sample_rate if receiver is not None else DEFAULT_SAMPLE_RATE)
+        channels = self.channels or (receiver.audio_channels if receiver is not None else DEFAULT_CHANNELS)
+        max_frames = self.max_blocksize
+        self.mix_engine = MixEngine(len(self.ndi_names), max_frames, channels, self.parameters, samplerate)
+        self.output_stream = self.new_output_stream(samplerate, self.blocksize, channels)
+        self.master_eq = BiquadEQ(samplerate, channels)
+        self.master_compressor = DynamicsProcessor(samplerate, channels, max_frames)
+        self.master_limiter = DynamicsProcessor.limiter(samplerate, channels, max_frames)
+        self.master_phase = PhaseRotator(channels)
+        self.routing = RoutingMatrix(len(self.ndi_names), max_frames, channels)
+        self.telemetry = CallbackTelemetry(samplerate, len(self.ndi_names))
+        with self.sources_lock:
+            self.update_source_processors()
+            for i, online in enumerate(self.source_online):
+                if online:
+                    self.start_receiver_thread(i)
+
+    def new_output_stream(self, samplerate, blocksize, channels):
+        return sd.OutputStream(
             samplerate=samplerate,
             blocksize=blocksize,
             channels=channels,
-            dtype='float32'
+            dtype='float32',
+            latency=self.stream_latency,
+            callback=self.mix_audio
         )
 
+    def set_blocksize(self, blocksize):
+        # Reopen the output stream at a new block size within the mixer's limits. The DSP
+        # buffers already fit max_blocksize, so only the device restarts.
+        blocksize = min(max(int(blocksize), self.min_blocksize), self.max_blocksize)
+        with self.sources_lock:
+            old_stream = self.output_stream
+            if blocksize == old_stream.blocksize:
+                return blocksize
+            active = old_stream.active
+            old_stream.stop()
+            old_stream.close()
+            self.blocksize = blocksize
+            self.output_stream = self.new_output_stream(old_stream.samplerate, blocksize, old_stream.channels)
+            for receiver_thread in self.receiver_threads:
+                if receiver_thread is not None:
+                    receiver_thread.set_frames(blocksize)
+            if active:
+                self.output_stream.start()
+        return blocksize
+
+    def queue_depth(self, seconds, minimum):
+        # Slots for a queue that holds at least this long at the smallest block size
+        return max(minimum, math.ceil(seconds * self.output_stream.samplerate / self.min_blocksize))
+
+    def update_record_tap(self):
+        # A fresh tap for the current sources; the recorder rotates to a new file when it sees it
+        engine = self.mix_engine
+        capacity = int(RECORD_QUEUE_SECONDS * self.output_stream.samplerate) + engine.max_frames
+        self.record_tap = RecordTap(self.ndi_names[:engine.num_sources] + ['program'],
+                                    self.output_stream.samplerate, engine.channels, capacity)
+
+    def enable_recording(self, directory, file_format='wav', rotate_seconds=RECORD_ROTATE_SECONDS,
+                         preroll_seconds=RECORD_PREROLL_SECONDS):
+        # Start tapping every source and the program bus; nothing is written until start_recording
+        if self.recorder is not None:
+            return self.recorder
+        self.recorder = RecorderThread(self, directory, file_format, rotate_seconds, preroll_seconds)
+        with self.sources_lock:
+            self.update_record_tap()
+        self.recorder.start()
+        return self.recorder
+
+    def disable_recording(self):
+        # Finish any open file and stop tapping
+        if self.recorder is None:
+            return
+        recorder, self.recorder = self.recorder, None
+        recorder.stop()
+        recorder.join()
+        self.record_tap = None
+
+    def start_recording(self):
+        if self.recorder is None:
+            raise RuntimeError("Recording is not enabled")
+        self.recorder.start_recording()
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.stop_recording()
+
+    def recording_state(self):
+        if self.recorder is None:
+            return {'enabled': False, 'recording': False}
+        return {'enabled': True, **self.recorder.state()}
+
+    def new_mix_engine(self):
+        return MixEngine(len(self.ndi_names), self.mix_engine.max_frames, self.mix_engine.channels,
+                         self.parameters, self.output_stream.samplerate)
+
+    def update_source_processors(self):
+        # Keep one DSP chain per source, preserving the settings of sources that stay
+        num_sources = self.mix_engine.num_sources
+        samplerate = self.output_stream.samplerate
+        channels = self.mix_engine.channels
+        max_frames = self.mix_engine.max_frames
+        self.ring_buffers = self.ring_buffers[:num_sources] + [
+            self.new_ring_buffer() for _ in range(num_sources - len(self.ring_buffers))]
+        self.source_delays = self.source_delays[:num_sources] + [
+            DelayLine(samplerate, channels, max_frames) for _ in range(num_sources - len(self.source_delays))]
+        self.source_eqs = self.source_eqs[:num_sources] + [
+            BiquadEQ(samplerate, channels) for _ in range(num_sources - len(self.source_eqs))]
+        self.source_dynamics = self.source_dynamics[:num_sources] + [
+            DynamicsProcessor(samplerate, channels, max_frames) for _ in range(num_sources - len(self.source_dynamics))]
+        self.source_phases = self.source_phases[:num_sources] + [
+            PhaseRotator(channels) for _ in range(num_sources - len(self.source_phases))]
+        self.update_chains()
+        if self.meter is not None:
+            self.meter.stop()
+        if self.signal_monitor is not None:
+            self.signal_monitor.stop()
+        self.signal_monitor = SignalMonitor(samplerate, self.ndi_names[:num_sources] + ['master'])
+        self.meter = MeterThread(samplerate, num_sources, channels, max_frames,
+                                 self.queue_depth(METER_QUEUE_SECONDS, METER_SLOTS), self.signal_monitor)
+        self.meter.start()
+        self.signal_monitor.start()
+        if self.recorder is not None:
+            self.update_record_tap()
+
+        if self.dsp_workers:
+            self.restart_dsp_pool()
+
+    def update_chains(self):
+        with self.sources_lock:
+            self.source_chains = [self.source_chain(i) for i in range(len(self.source_delays))]
+            self.update_chain(None)
+
+    def source_chain(self, index):
+        return source_dsp_chain(self.source_delays[index], self.source_phases[index],
+                                self.source_eqs[index], self.source_dynamics[index])
+
+    def update_chain(self, index):
+        # Recompile one source's (or the master's) chain of active processors, so the callback
+        # does no per-block work for processors that are switched off
+        with self.sources_lock:
+            if index is None:
+                self.master_chain = tuple((stage, processor) for stage, processor in (
+                    ('master_eq', self.master_eq), ('master_compressor', self.master_compressor),
+                    ('master_phase', self.master_phase)) if processor.enabled)
+            elif index < len(self.source_chains):
+                chains = list(self.source_chains)
+                chains[index] = self.source_chain(index)
+                self.source_chains = chains
+
+    def set_dsp_workers(self, workers):
+        # Run the per-source DSP in this many worker processes; 0 brings it back into the callback
+        with self.sources_lock:
+            self.dsp_workers = workers
+            self.sync_dsp_pool()
+            if workers:
+                self.restart_dsp_pool()
+            elif self.dsp_pool is not None:
+                self.retire_dsp_pool(self.dsp_pool)
+                self.dsp_pool = None
+
+    def sync_dsp_pool(self):
+        # Bring this process's processors up to date with the workers' running state. Only
+        # while the callback still uses the pool: once it has fallen back to in-process DSP
+        # the local state is the live one.
+        with self.sources_lock:
+            pool = self.dsp_pool
+            if pool is not None and self.mix_engine is not None and pool.num_sources == self.mix_engine.num_sources:
+                pool.sync(DSP_SYNC_SECONDS)
+
+    def restart_dsp_pool(self):
+        # Fork workers from the current processors, which carry every setting so far and the
+        # old workers' state, then swap them in; the callback falls back to in-process DSP
+        # until the source counts agree
+        with self.sources_lock:
+            self.sync_dsp_pool()
+            processors = list(zip(self.source_delays, self.source_phases, self.source_eqs, self.source_dynamics))
+            old_pool = self.dsp_pool
+            self.dsp_pool = DSPWorkerPool(processors, min(self.dsp_workers, len(processors)) or 1,
+                                          self.mix_engine.max_frames, self.mix_engine.channels) if processors else None
+            if old_pool is not None:
+                self.retire_dsp_pool(old_pool)
+
+    def retire_dsp_pool(self, pool):
+        # Close an old pool once no callback can still be using its shared blocks
+        threading.Timer(DSP_POOL_RETIRE_SECONDS, pool.close).start()
+
+    def close_dsp_pool(self):
+        # Only once the output stream has stopped
+        if self.dsp_pool is not None:
+            self.dsp_pool.close()
+            self.dsp_pool = None
+
+    def new_ring_buffer(self):
+        samplerate = self.output_stream.samplerate
+        capacity = int(samplerate * RING_BUFFER_SECONDS)
+        target_latency = int(samplerate * self.target_latency_ms / 1000)
+        return SourceRingBuffer(capacity, self.mix_engine.channels, target_latency, self.underrun_fill)
+
+    def start_receiver_thread(self, index):
+        # One receiver thread per source, each with a fresh jitter buffer so there is only ever one producer
+        self.stop_receiver_thread(index)
+        ring_buffer = self.new_ring_buffer()
+        receiver_thread = SourceReceiverThread(self.receivers[index], ring_buffer, self.blocksize,
+                                               self.output_stream.samplerate, self.mix_engine.channels,
+                                               self.channel_matrices.get(self.ndi_names[index]))
+        self.ring_buffers[index] = ring_buffer
+        self.receiver_threads[index] = receiver_thread
+        receiver_thread.start()
+
+    def stop_receiver_thread(self, index):
+        receiver_thread = self.receiver_threads[index]
+        if receiver_thread is not None:
+            receiver_thread.stop()
+            self.receiver_threads[index] = None
+        return receiver_thread
+
+    def release_receiver(self, index):
+        # Stop reading the source, then hand its receiver back to the runtime, which
+        # closes it once nothing else in the process uses that source
+        receiver_thread = self.stop_receiver_thread(index)
+        if receiver_thread is not None:
+            receiver_thread.join(RECEIVER_JOIN_SECONDS)
+        if self.receivers[index] is not None:
+            self.receivers[index] = None
+            self.runtime.release_receiver(self.ndi_names[index])
+
     def init_ndi_sender(self):
         # Initialize the NDI sender object with a given name
-        self.sender = pyndi.Sender()
         self.ndi_name = 'Mixed NDI Audio'
-        self.ndi_source = pyndi.AudioSource(name=self.ndi_name)
-        self.sender.create_source(self.ndi_source)
+        # The sender stays pooled under its first name; renaming it changes only what the network sees
+        sender_name = self.ndi_name
+        self.sender = self.runtime.acquire_sender(sender_name)
+        self.sender_thread = NDISenderThread(self.sender, self.output_stream.samplerate, self.mix_engine.channels,
+                                             self.mix_engine.max_frames, self.queue_depth(SENDER_QUEUE_SECONDS, SENDER_POOL_SIZE),
+                                             release=lambda: self.runtime.release_sender(sender_name))
+        self.sender_thread.start()
 
     def change_ndi_name(self, new_name):
         # Change the name of the NDI sender object
         if new_name and new_name != self.ndi_name:
             self.ndi_name = new_name
-            self.ndi_source = pyndi.AudioSource(name=self.ndi_name)
-            self.sender.create_source(self.ndi_source)
-
-    def apply_eq(self, audio_data, bands, gains):
-        audio_segment = AudioSegment(audio_data.tobytes(), frame_rate=self.output_stream.samplerate, channels=self.output_stream.channels, sample_width=audio_data.dtype.itemsize)
-        equalized_audio = equalize(audio_segment, bands, gains)
-        return np.frombuffer(equalized_audio.raw_data, dtype=audio_data.dtype)
-
-    def apply_compression(self, audio_data, threshold, ratio, attack, release):
-        audio_segment = AudioSegment(audio_data.tobytes(), frame_rate=self.output_stream.samplerate, channels=self.output_stream.channels, sample_width=audio_data.dtype.itemsize)
-        compressed_audio = compressor(audio_segment, threshold, ratio, attack, release)
-        return np.frombuffer(compressed_audio.raw_data, dtype=audio_data.dtype)
-
-    def adjust_phase(self, audio_data, phase_shift):
-        # Convert phase shift from degrees to radians
-        phase_shift_rad = np.deg2rad(phase_shift)
-        complex_audio = librosa.stft(audio_data)
-        complex_audio *= np.exp(1j * phase_shift_rad)
-        return librosa.istft(complex_audio)
-    
-    def apply_audio_delay(self, audio_data, delay_ms):
-        # Calculate delay in samples
-        delay_samples = int(delay_ms * self.output_stream.samplerate / 1000)
-        
-        # Apply delay by inserting zeros before audio data
-        delayed_audio = np.concatenate((np.zeros(delay_samples), audio_data))
-
-        return delayed_audio
-
-    def play_audio_with_delay(volume_slider, mute_button, audio_data, delay_ms):
-        if not mute_button.var.get():
-            delayed_audio = self.apply_audio_delay(audio_data, delay_ms)
-            sd.play(volume_slider.get() * delayed_audio, blocking=False)
-
-    def mix_audio(self, indata, outdata, frames, time, status, volume_sliders, mute_buttons, master_volume_slider, audio_meters, mixed_audio_meter, eq_enabled, compression_enabled, phase_enabled, delay_ms):
-        # Mix the audio from different sources and output the mixed audio
-        mixed_audio = self.mix_sources(volume_sliders, mute_buttons, frames, delay_ms)
-        mixed_audio = self.apply_master_volume(mixed_audio, master_volume_slider.get())
-        self.play_audio_with_delay(volume_slider, mute_button, audio_data, delay_ms)
+            self.sender.set_name(new_name)
+
+    def add_bus(self, name, sender_name=None, default_send=0.0, pre_fader=False, mix_minus=None):
+        # Add an aux bus published as its own NDI source. mix_minus=<source> sends every
+        # source at unity post-fader except that one, e.g. the return feed for a remote guest.
+        with self.sources_lock:
+            if name in [bus['name'] for bus in self.routing.buses]:
+                raise ValueError(f"Bus {name} already exists")
+            sender_name = sender_name or f"{self.ndi_name} - {name}"
+            exclude = None
+            if mix_minus is not None:
+                exclude = self.source_index(mix_minus)
+                default_send = 1.0
+            sender = self.runtime.acquire_sender(sender_name)
+            sender_thread = NDISenderThread(sender, self.output_stream.samplerate, self.mix_engine.channels,
+                                            self.mix_engine.max_frames, self.queue_depth(SENDER_QUEUE_SECONDS, SENDER_POOL_SIZE),
+                                            release=lambda: self.runtime.release_sender(sender_name))
+            sender_thread.start()
+            limiter = DynamicsProcessor.limiter(self.output_stream.samplerate, self.mix_engine.channels,
+                                                self.mix_engine.max_frames, true_peak=False)
+            self.bus_senders = self.bus_senders + [sender_thread]
+            self.bus_limiters = self.bus_limiters + [limiter]
+            self.routing = self.routing.with_bus(name, sender_name, default_send, pre_fader, exclude)
+            return self.routing.num_buses - 1
+
+    def remove_bus(self, bus):
+        with self.sources_lock:
+            index = self.routing.bus_index(bus)
+            self.routing = self.routing.without_bus(index)
+            self.bus_senders[index].stop()
+            self.bus_senders = self.bus_senders[:index] + self.bus_senders[index + 1:]
+            self.bus_limiters = self.bus_limiters[:index] + self.bus_limiters[index + 1:]
 
+    def set_bus_send(self, bus, source, gain=None, pre_fader=None):
+        self.routing.set_send(self.routing.bus_index(bus), self.source_index(source), gain, pre_fader)
+
+    def set_source_gain(self, index, gain):
+        self.parameters.set_source(index, 'gain', gain)
+
+    def set_source_mute(self, index, muted):
+        self.parameters.set_source(index, 'mute', 1.0 if muted else 0.0)
+
+    def set_master_volume(self, gain):
+        self.parameters.set_master('gain', gain)
+
+    def set_source_delay_ms(self, index, delay_ms):
+        self.parameters.set_source(index, 'delay_ms', delay_ms)
+
+    def set_source_delay_frames(self, index, frames):
+        self.set_source_delay_ms(index, frames * 1000 / self.output_stream.samplerate)
+
+    def set_source_channel_matrix(self, index, channel_matrix):
+        # (bus channels, source channels) up/down-mix for one source; None restores the default
+        name = self.ndi_names[index]
+        if channel_matrix is None:
+            self.channel_matrices.pop(name, None)
+        else:
+            self.channel_matrices[name] = channel_matrix
+        receiver_thread = self.receiver_threads[index]
+        if receiver_thread is not None:
+            receiver_thread.set_channel_matrix(channel_matrix)
+
+    def set_eq_enabled(self, enabled):
+        self.parameters.set_master('eq_enabled', enabled)
+
+    def set_master_eq_band(self, band, **params):
+        # Band gains go through the parameter store; frequency, Q or type edit the EQ directly
+        check_eq_band_index(self.master_eq, band)
+        params = checked_eq_band(params)
+        if 'gain_db' in params and band < len(EQ_BAND_PARAMETERS):
+            self.parameters.update({EQ_BAND_PARAMETERS[band]: params.pop('gain_db')})
+        if params:
+            self.master_eq.set_band(band, **params)
+
+    def set_source_eq_enabled(self, index, enabled):
+        self.parameters.set_source(index, 'eq_enabled', enabled)
+
+    def set_source_eq_band(self, index, band, **params):
+        check_eq_band_index(self.source_eqs[index], band)
+        params = checked_eq_band(params)
+        if 'gain_db' in params and band < len(EQ_BAND_PARAMETERS):
+            self.parameters.update({EQ_BAND_PARAMETERS[band]: params.pop('gain_db')}, index)
+        if params:
+            self.source_eqs[index].set_band(band, **params)
+            if self.dsp_pool is not None:
+                self.dsp_pool.send(index, 'eq', 'set_band', band, **params)
+
+    def set_compression_enabled(self, enabled):
+        self.parameters.set_master('compression_enabled', enabled)
+
+    def set_automix_enabled(self, enabled):
+        self.parameters.set_master('automix_enabled', enabled)
+
+    def set_master_compression(self, threshold_db=None, **params):
+        if threshold_db is not None:
+            self.parameters.set_master('compression_threshold_db', threshold_db)
+        if params:
+            self.master_compressor.set_params(**params)
+
+    def set_source_compression_enabled(self, index, enabled):
+        self.parameters.set_source(index, 'compression_enabled', enabled)
+
+    def set_source_compression(self, index, threshold_db=None, **params):
+        if threshold_db is not None:
+            self.parameters.set_source(index, 'compression_threshold_db', threshold_db)
+        if params:
+            self.source_dynamics[index].set_params(**params)
+            if self.dsp_pool is not None:
+                self.dsp_pool.send(index, 'dynamics', 'set_params', **params)
+
+    def set_phase_enabled(self, enabled):
+        self.parameters.set_master('phase_enabled', enabled)
+
+    def set_master_phase(self, invert=None, angle_deg=None):
+        if invert is not None:
+            self.parameters.set_master('invert', invert)
+        if angle_deg is not None:
+            self.parameters.set_master('phase_deg', angle_deg)
+
+    def set_source_phase(self, index, invert=None, angle_deg=None):
+        if invert is not None:
+            self.parameters.set_source(index, 'invert', invert)
+        if angle_deg is not None:
+            self.parameters.set_source(index, 'phase_deg', angle_deg)
+
+    def apply_parameter(self, index, name, value):
+        # Store listener: push a changed parameter into the DSP object that owns it.
+        # Gains and mutes need nothing here because the mix engine reads them itself.
+        if self.mix_engine is None:
+            return
+        if index is None:
+            apply_dsp_parameter(name, value, self.master_eq, self.master_compressor, self.master_phase)
+        else:
+            apply_dsp_parameter(name, value, self.source_eqs[index], self.source_dynamics[index],
+                                self.source_phases[index], self.source_delays[index])
+            if self.dsp_pool is not None:
+                self.dsp_pool.send(index, None, None, name, value)
+        if name in ('eq_enabled', 'compression_enabled', 'phase_enabled', 'invert', 'phase_deg'):
+            self.update_chain(index)
+
+    def start(self):
+        self.output_stream.start()
+
+    def stop(self):
+        self.output_stream.stop()
+
+    def source_index(self, source):
+        # Accept a source index or an NDI source name
+        if isinstance(source, int) or source.isdigit():
+            index = int(source)
+            if not 0 <= index < len(self.ndi_names):
+                raise IndexError(f"No source with index {index}")
+            return index
+        return self.ndi_names.index(source)
+
+    def source_clock_state(self, index):
+        # Clock-drift and jitter-buffer metrics for one source
+        ring_buffer = self.ring_buffers[index]
+        receiver_thread = self.receiver_threads[index]
+        drift = receiver_thread.drift if receiver_thread is not None else None
+        return {'drift_ppm': drift.drift_ppm if drift is not None else 0.0,
+                'correction_ppm': drift.correction_ppm if drift is not None else 0.0,
+                'buffer_ms': drift.buffer_ms if drift is not None else 0.0,
+                'underruns': ring_buffer.underruns, 'overruns': ring_buffer.overruns}
+
+    def state(self):
+        # Plain-dict view of every parameter, for the control API and config snapshots
+        parameters = self.parameters
+        sources = []
+        for i, name in enumerate(self.ndi_names):
+            source = {'name': name, 'online': self.source_online[i]}
+            source.update({field: parameters.get_source(i, field) for field in SOURCE_PARAMETERS.names})
+            if self.mix_engine is not None:
+                source.update(self.source_clock_state(i))
+                source['automix_gain_db'] = float(level_to_db(self.mix_engine.automix.gains[i:i + 1])[0])
+            sources.append(source)
+        master = {field: parameters.get_master(field) for field in MASTER_PARAMETERS.names}
+        buses = [{'name': bus['name'], 'sender_name': bus['sender_name'], 'sends': bus['sends'], 'pre_fader': bus['pre_fader']}
+                 for bus in self.routing.bus_settings()] if self.routing is not None else []
+        return {'sender_name': self.ndi_name, 'sources': sources, 'master': master, 'buses': buses}
+
+    def settings(self):
+        # Everything worth saving, without live readings: parameters and EQ bands per source,
+        # the master, and bus routing keyed by source name so it survives reordering
+        parameters = self.parameters
+        sources = [{'name': name,
+                    'parameters': {field: parameters.get_source(i, field) for field in SOURCE_PARAMETERS.names},
+                    'eq_bands': [dict(band) for band in self.source_eqs[i].bands]}
+                   for i, name in enumerate(self.ndi_names) if i < len(self.source_eqs)]
+        master = {'parameters': {field: parameters.get_master(field) for field in MASTER_PARAMETERS.names},
+                  'eq_bands': [dict(band) for band in self.master_eq.bands]}
+        names = self.ndi_names
+        buses = [{'name': bus['name'], 'sender_name': bus['sender_name'],
+                  'mix_minus': names[bus['exclude']] if bus['exclude'] is not None else None,
+                  'sends': dict(zip(names, bus['sends'])), 'pre_fader': dict(zip(names, bus['pre_fader']))}
+                 for bus in self.routing.bus_settings()]
+        return {'sender_name': self.ndi_name, 'sources': sources, 'master': master, 'buses': buses}
+
+    def load_settings(self, settings):
+        # Apply saved settings to the sources that exist, matched by name. Receivers are left
+        # alone and missing buses are created, so this is safe to call mid-show.
+        if settings.get('sender_name'):
+            self.change_ndi_name(settings['sender_name'])
+        for source in settings.get('sources', []):
+            if source['name'] not in self.ndi_names:
+                continue
+            index = self.ndi_names.index(source['name'])
+            for band, params in enumerate(source.get('eq_bands', [])[:len(self.source_eqs[index].bands)]):
+                self.set_source_eq_band(index, band, **params)
+            self.parameters.update({name: value for name, value in source.get('parameters', {}).items()
+                                    if name in SOURCE_PARAMETERS.names}, index)
+        master = settings.get('master', {})
+        for band, params in enumerate(master.get('eq_bands', [])[:len(self.master_eq.bands)]):
+            self.set_master_eq_band(band, **params)
+        self.parameters.update({name: value for name, value in master.get('parameters', {}).items()
+                                if name in MASTER_PARAMETERS.names})
+        for bus in settings.get('buses', []):
+            if bus['name'] not in [existing['name'] for existing in self.routing.buses]:
+                mix_minus = bus.get('mix_minus') if bus.get('mix_minus') in self.ndi_names else None
+                self.add_bus(bus['name'], bus.get('sender_name'), mix_minus=mix_minus)
+            for name, gain in bus.get('sends', {}).items():
+                if name in self.ndi_names:
+                    self.set_bus_send(bus['name'], self.ndi_names.index(name), gain, bus.get('pre_fader', {}).get(name))
+
+    def compile_scene(self, settings):
+        # Turn saved settings into a Scene for the current sources and buses
+        names = tuple(self.ndi_names)
+        parameters = self.parameters
+        sources = parameters.sources.copy()
+        source_mask = np.zeros(len(names), dtype=bool)
+        source_bands = [None] * len(names)
+        for source in settings.get('sources', []):
+            if source['name'] not in names:
+                continue
+            index = names.index(source['name'])
+            source_mask[index] = True
+            for name, value in source.get('parameters', {}).items():
+                if name in SOURCE_PARAMETERS.names:
+                    sources[name][index] = ParameterStore.checked_value(name, value)
+            source_bands[index] = source.get('eq_bands')
+        master = parameters.master.copy()
+        for name, value in settings.get('master', {}).get('parameters', {}).items():
+            if name in MASTER_PARAMETERS.names:
+                master[name] = ParameterStore.checked_value(name, value)
+        routing = self.routing
+        bus_names = tuple(bus['name'] for bus in routing.buses)
+        sends = routing.sends.copy()
+        send_mask = np.zeros(sends.shape, dtype=bool)
+        for bus in settings.get('buses', []):
+            if bus['name'] not in bus_names:
+                continue
+            row = bus_names.index(bus['name'])
+            for name, gain in bus.get('sends', {}).items():
+                if name in names:
+                    sends[row, names.index(name)] = gain
+                    send_mask[row, names.index(name)] = True
+        return Scene(names, sources, source_mask, master, source_bands,
+                     settings.get('master', {}).get('eq_bands'), bus_names, sends, send_mask)
+
+    def recall_snapshot(self, name, settings, fade_seconds=DEFAULT_SCENE_FADE_SECONDS):
+        # Recall a saved snapshot, compiling it only when it or the sources and buses changed
+        cached = self.scene_cache.get(name)
+        if (cached is None or cached[0] is not settings or cached[1].names != tuple(self.ndi_names)
+                or cached[1].bus_names != tuple(bus['name'] for bus in self.routing.buses)):
+            cached = (settings, self.compile_scene(settings))
+            self.scene_cache[name] = cached
+        self.recall_scene(cached[1], fade_seconds)
+
+    def recall_scene(self, scene, fade_seconds=DEFAULT_SCENE_FADE_SECONDS):
+        # Source gains fade per sample in the callback; EQ gains and bus sends follow at
+        # control rate on a SceneFader; everything else switches at once
+        with self.sources_lock:
+            if scene.names != tuple(self.ndi_names):
+                raise ValueError("Scene was compiled for a different list of sources")
+            self.stop_scene_fade()
+            parameters = self.parameters
+            sources = parameters.sources.copy()
+            sources[scene.source_mask] = scene.sources[scene.source_mask]
+            master = scene.master.copy()
+            eq_moves = []
+            if fade_seconds > 0:
+                # EQ gains start where they are; the fader walks them to the scene
+                for name in EQ_BAND_PARAMETERS:
+                    for index in np.flatnonzero(sources[name] != parameters.sources[name]):
+                        eq_moves.append((int(index), name, parameters.sources[name][index].item(), sources[name][index].item()))
+                    if master[name][0] != parameters.master[name][0]:
+                        eq_moves.append((None, name, parameters.master[name][0].item(), master[name][0].item()))
+                    sources[name] = parameters.sources[name]
+                    master[name] = parameters.master[name]
+            for index, bands in enumerate(scene.source_bands):
+                for band, params in enumerate((bands or [])[:len(self.source_eqs[index].bands)]):
+                    self.set_source_eq_band(index, band, **{key: value for key, value in params.items() if key != 'gain_db'})
+            for band, params in enumerate((scene.master_bands or [])[:len(self.master_eq.bands)]):
+                self.set_master_eq_band(band, **{key: value for key, value in params.items() if key != 'gain_db'})
+
+            routing = self.routing
+            send_from = routing.sends.copy()
+            send_to = np.where(scene.send_mask, scene.sends, send_from) if scene.bus_names == tuple(
+                bus['name'] for bus in routing.buses) else send_from
+            if fade_seconds > 0:
+                self.mix_engine.start_fade(fade_seconds * self.output_stream.samplerate)
+            parameters.replace(sources, master)
+            self.scene_fader = SceneFader(self, eq_moves, routing, send_from, send_to, fade_seconds)
+            self.scene_fader.start()
+
+    def stop_scene_fade(self):
+        # Leave a running scene fade wherever it has got to
+        if self.scene_fader is not None:
+            self.scene_fader.stop()
+            self.scene_fader = None
+
+    def meter_state(self):
+        # Latest meter readings keyed by source name, with the bus under 'master'
+        snapshot = self.meter_snapshot()
+        bus = len(snapshot.peak_db) - 1
+        rows = list(enumerate(self.ndi_names[:bus])) + [(bus, 'master')]
+        return {name: {'peak_db': float(snapshot.peak_db[i]), 'rms_db': float(snapshot.rms_db[i]),
+                       'momentary_lufs': float(snapshot.momentary_lufs[i]),
+                       'short_term_lufs': float(snapshot.short_term_lufs[i])}
+                for i, name in rows}
+
+    def alarm_state(self):
+        # Active alarms per source (condition -> time raised) with the readings behind them
+        return self.signal_monitor.state
+
+    def telemetry_state(self):
+        # Callback timing and xrun counters, with each source's jitter-buffer underruns
+        state = self.telemetry.state(self.ndi_names)
+        for name, ring_buffer in zip(self.ndi_names, self.ring_buffers):
+            if name in state['sources']:
+                state['sources'][name].update(underruns=ring_buffer.underruns, overruns=ring_buffer.overruns)
+        state['blocksize'] = self.output_stream.blocksize
+        state['dsp_workers'] = len(self.dsp_pool.shards) if self.dsp_pool is not None else 0
+        state['dsp_late_blocks'] = self.dsp_pool.late_blocks if self.dsp_pool is not None else 0
+        state['deadline_us'] = self.output_stream.blocksize / self.output_stream.samplerate * 1e6
+        return state
+
+    def meter_snapshot(self):
+        # Latest published meter readings; safe to call from any thread
+        return self.meter.snapshot
+
+    def mix_audio(self, outdata, frames, time, status):
+        # Mix the audio from different sources straight into the output buffer
+        telemetry = self.telemetry
+        start = telemetry.begin(status)
+        engine = self.mix_engine
+        mixed_audio, start = self.mix_sources(engine, outdata, frames, telemetry, start)
 
         # Apply the EQ, compression, and phase adjustment if enabled
-        if eq_enabled:
-            mixed_audio = self.apply_eq(mixed_audio)
-        if compression_enabled:
-            mixed_audio = self.apply_compression(mixed_audio)
-        if phase_enabled:
-            mixed_audio = self.adjust_phase(mixed_audio)
-
-        mixed_audio = self.apply_peak_limiter(mixed_audio)  # Apply the peak limiter
-        self.update_audio_meters(mixed_audio, audio_meters, mixed_audio_meter)
-        outdata[:] = mixed_audio
-    
-    def mix_sources(self, volume_sliders, mute_buttons, frames, delay_ms):
-        # Mix audio sources according to their volume sliders and mute buttons
-        mixed_audio = np.zeros(frames)
-        for receiver, volume_slider, mute_button in zip(self.receivers, volume_sliders, mute_buttons):
-            audio_data = self.receive_audio(receiver, frames)
-            delayed_audio = self.apply_audio_delay(audio_data, delay_ms)  # Apply the delay to the audio source
-            self.play_audio_with_delay(volume_slider, mute_button, delayed_audio, delay_ms)
-            mixed_audio += delayed_audio * volume_slider.get()
-        return mixed_audio
-
-    def apply_master_volume(self, mixed_audio, master_volume_slider):
-        # Apply the master volume to the mixed audio
-        return mixed_audio * master_volume_slider.get()
-
-    def apply_eq(self, mixed_audio):
-        # Apply equalization to the mixed audio
-        audio_segment = AudioSegment(mixed_audio.tobytes(), frame_rate=self.output_stream.samplerate, channels=self.output_stream.channels, sample_width=mixed_audio.dtype.itemsize)
-        equalized_audio = equalize(audio_segment, bands, gains)
-        return np.frombuffer(equalized_audio.raw_data, dtype=mixed_audio.dtype)
-
-    def apply_compression(self, mixed_audio):
-        # Apply compression to the mixed audio
-        audio_segment = AudioSegment(mixed_audio.tobytes(), frame_rate=self.output_stream.samplerate, channels=self.output_stream.channels, sample_width=mixed_audio.dtype.itemsize)
-        compressed_audio = compressor(audio_segment, threshold, ratio, attack, release)
-        return np.frombuffer(compressed_audio.raw_data, dtype=mixed_audio.dtype)
-
-    def adjust_phase(self, mixed_audio):
-        # Apply phase adjustment to the mixed audio
-        phase_shift_rad = np.deg2rad(phase_shift)
-        complex_audio = librosa.stft(mixed_audio)
-        complex_audio *= np.exp(1j * phase_shift_rad)
-        return librosa.istft(complex_audio)
-
-    def receive_audio(self, receiver, frames):
-        # Receive audio data from the NDI source
-        audio_data = receiver.receive_audio(frames)
-        while len(audio_data) < frames:
-            audio_data = np.concatenate((audio_data, receiver.receive_audio(frames - len(audio_data))))
-        return audio_data
-
-    def update_audio_meters(self, mixed_audio, audio_meters, mixed_audio_meter):
-        # Update the individual audio meters and the mixed audio meter
-        for i, audio_meter in enumerate(audio_meters):
-            audio_data = self.receivers[i].receive_audio(len(mixed_audio))
-            audio_level = np.average(np.abs(audio_data))
-            self.update_audio_meter(audio_meter, audio_level)
-        mixed_audio_level = np.average(np.abs(mixed_audio))
-        self.update_audio_meter(mixed_audio_meter, mixed_audio_level)
-
-    def update_audio_meter(self, audio_meter, audio_level):
-        # Update the audio meter with the current audio level
-        audio_meter.delete("all")
-        audio_level_db = 20 * np.log10(audio_level)
-        audio_level_normalized = np.clip((audio_level_db + 60) / 60, 0, 1)
-        audio_meter.create_rectangle(0, 0, 200 * audio_level_normalized, 20, fill="green")
-
-    def apply_peak_limiter(self, mixed_audio, threshold=0.9):
-        # Apply a peak limiter to the mixed audio to avoid clipping
-        gain_reduction = np.max(np.abs(mixed_audio)) / threshold
-        if gain_reduction > 1:
-            mixed_audio /= gain_reduction
-        return mixed_audio
-       
+        for stage, processor in self.master_chain:
+            processor.process(mixed_audio)
+            start = telemetry.mark(stage, start)
+
+        self.master_limiter.process(mixed_audio)  # Brickwall the bus at the ceiling
+        start = telemetry.mark('limiter', start)
+        self.sender_thread.push(mixed_audio, frames)
+        start = telemetry.mark('send', start)
+        self.mix_buses(engine, frames)
+        start = telemetry.mark('buses', start)
+        self.meter.push(engine.source_block, mixed_audio, frames)
+        start = telemetry.mark('meters', start)
+        record_tap = self.record_tap
+        if record_tap is not None:
+            record_tap.push(engine.source_block, mixed_audio, frames)
+        telemetry.mark('record', start)
+        telemetry.end(frames)
+
+    def mix_buses(self, engine, frames):
+        # All aux buses in one batched product, then a safety limiter and NDI send per bus
+        routing = self.routing
+        if not routing.num_buses or routing.num_sources != engine.num_sources:
+            return
+        bus_block = routing.mix(engine.source_matrix, engine.parameters, frames)
+        for bus_audio, limiter, sender_thread in zip(bus_block, self.bus_limiters, self.bus_senders):
+            limiter.process(bus_audio[:frames])
+            sender_thread.push(bus_audio[:frames], frames)
+
+    def mix_sources(self, engine, outdata, frames, telemetry, start):
+        # Gather every source into the engine's block, then mix with the gain/mute/master vector
+        pool = self.dsp_pool
+        if pool is not None and pool.num_sources == engine.num_sources:
+            # Worker processes run the per-source DSP; this thread only feeds them and sums
+            pool.begin()
+            for i, ring_buffer in enumerate(self.ring_buffers[:engine.num_sources]):
+                ring_buffer.read_into(pool.source_buffer(i, frames, engine))
+            start = telemetry.mark('ring', start)
+            pool.run(engine.source_block, frames, DSP_DEADLINE_FRACTION * frames / self.output_stream.samplerate, telemetry)
+            start = telemetry.mark('workers', start)
+            mixed_audio = engine.mix(outdata, frames)
+            return mixed_audio, telemetry.mark('mix', start)
+        for i, (ring_buffer, chain) in enumerate(zip(self.ring_buffers[:engine.num_sources], self.source_chains)):
+            source_start = start
+            source_audio = engine.source_buffer(i, frames)
+            ring_buffer.read_into(source_audio)
+            start = telemetry.mark('ring', start)
+            for stage, processor in chain:
+                processor.process(source_audio)
+                start = telemetry.mark(stage, start)
+            telemetry.mark_source(i, source_start)
+        mixed_audio = engine.mix(outdata, frames)
+        return mixed_audio, telemetry.mark('mix', start)
+
 # User interface for the NDI Audio Mixer application
 class NDI_Audio_Mixer_UI:
     def __init__(self, ndi_audio_mixer):
@@ -229,7 +3362,7 @@ class NDI_Audio_Mixer_UI:
         self.init_effects_controls_frame()
         self.init_mixed_audio_frame()
         self.init_sender_name_frame()
-        self.root.mainloop()
+        self.init_meter_bars()
 
     def init_main_frame(self):
         self.main_frame = Frame(self.root)
@@ -240,10 +3373,28 @@ class NDI_Audio_Mixer_UI:
         self.ndi_sources_frame.pack(side=LEFT)
         self.init_source_controls()
 
+    def init_slider(self, parent, value, command, **options):
+        # A Scale that starts at the mixer's current value and calls command only when it moves.
+        # Tk runs a Scale's command after every set(), even from code, which would write the
+        # widget's rounded value over settings loaded from the config file.
+        slider = Scale(parent, orient=HORIZONTAL, **options)
+        slider.set(value)
+        shown = [float(slider.get())]
+
+        def moved(text):
+            if float(text) != shown[0]:
+                shown[0] = float(text)
+                command(float(text))
+        slider.configure(command=moved)
+        return slider
+
     def init_source_controls(self):
         self.volume_sliders = []
         self.mute_buttons = []
+        self.delay_sliders = []
+        self.polarity_buttons = []
         self.audio_meters = []
+        parameters = self.ndi_audio_mixer.parameters
 
         for i, ndi_name in enumerate(self.ndi_audio_mixer.ndi_names):
             source_frame = Frame(self.ndi_sources_frame)
@@ -252,17 +3403,32 @@ class NDI_Audio_Mixer_UI:
             source_label = Label(source_frame, text=ndi_name)
             source_label.pack(side=TOP)
 
-            volume_slider = Scale(source_frame, from_=0, to=1, resolution=0.01, orient=HORIZONTAL)
-            volume_slider.set(1)
+            volume_slider = self.init_slider(source_frame, parameters.get_source(i, 'gain'),
+                                             lambda value, i=i: self.ndi_audio_mixer.set_source_gain(i, value),
+                                             from_=0, to=1, resolution=0.01)
             volume_slider.pack(side=TOP)
             self.volume_sliders.append(volume_slider)
 
-            mute_button_var = IntVar()
-            mute_button = Checkbutton(source_frame, text="Mute", variable=mute_button_var)
+            mute_button_var = IntVar(value=int(parameters.get_source(i, 'mute')))
+            mute_button = Checkbutton(source_frame, text="Mute", variable=mute_button_var,
+                                      command=lambda i=i, var=mute_button_var: self.ndi_audio_mixer.set_source_mute(i, var.get()))
             mute_button.var = mute_button_var
             mute_button.pack(side=TOP)
             self.mute_buttons.append(mute_button)
 
+            delay_slider = self.init_slider(source_frame, parameters.get_source(i, 'delay_ms'),
+                                            lambda value, i=i: self.ndi_audio_mixer.set_source_delay_ms(i, value),
+                                            label="Delay (ms)", from_=0, to=int(MAX_DELAY_SECONDS * 1000), resolution=1)
+            delay_slider.pack(side=TOP)
+            self.delay_sliders.append(delay_slider)
+
+            polarity_var = IntVar(value=int(parameters.get_source(i, 'invert')))
+            polarity_button = Checkbutton(source_frame, text="Invert Polarity", variable=polarity_var,
+                                          command=lambda i=i, var=polarity_var: self.ndi_audio_mixer.set_source_phase(i, invert=bool(var.get())))
+            polarity_button.var = polarity_var
+            polarity_button.pack(side=TOP)
+            self.polarity_buttons.append(polarity_button)
+
             audio_meter = Canvas(source_frame, width=200, height=20, bg="white")
             audio_meter.pack(side=TOP)
             self.audio_meters.append(audio_meter)
@@ -274,17 +3440,10 @@ class NDI_Audio_Mixer_UI:
         master_volume_label = Label(self.mixer_controls_frame, text="Master Volume")
         master_volume_label.pack(side=TOP)
 
-        self.master_volume_slider = Scale(self.mixer_controls_frame, from_=0, to=1, resolution=0.01, orient=HORIZONTAL)
-        self.master_volume_slider.set(1)
+        self.master_volume_slider = self.init_slider(self.mixer_controls_frame, self.ndi_audio_mixer.parameters.get_master('gain'),
+                                                     self.ndi_audio_mixer.set_master_volume, from_=0, to=1, resolution=0.01)
         self.master_volume_slider.pack(side=TOP)
 
-        delay_label = Label(self.mixer_controls_frame, text="Delay (ms)")
-        delay_label.pack(side=TOP)
-
-        self.delay_slider = Scale(self.mixer_controls_frame, from_=0, to=100, resolution=1, orient=HORIZONTAL)
-        self.delay_slider.set(0)
-        self.delay_slider.pack(side=TOP)
-
     def init_mixed_audio_frame(self):
         self.mixed_audio_frame = Frame(self.main_frame)
         self.mixed_audio_frame.pack(side=LEFT, padx=10, pady=10)
@@ -312,45 +3471,183 @@ class NDI_Audio_Mixer_UI:
     def init_effects_controls_frame(self):
         self.effects_controls_frame = Frame(self.main_frame)
         self.effects_controls_frame.pack(side=LEFT, padx=10, pady=10)
+        parameters = self.ndi_audio_mixer.parameters
 
         # EQ controls
         eq_label = Label(self.effects_controls_frame, text="EQ")
         eq_label.pack(side=TOP)
 
-        self.eq_var = IntVar()
-        self.eq_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable EQ", variable=self.eq_var)
+        self.eq_var = IntVar(value=int(parameters.get_master('eq_enabled')))
+        self.eq_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable EQ", variable=self.eq_var,
+                                          command=lambda: self.ndi_audio_mixer.set_eq_enabled(bool(self.eq_var.get())))
         self.eq_checkbutton.pack(side=TOP)
 
+        self.eq_sliders = []
+        for band, band_name in enumerate(["Low", "Mid", "High"]):
+            eq_slider = self.init_slider(self.effects_controls_frame, parameters.get_master(EQ_BAND_PARAMETERS[band]),
+                                         lambda value, band=band: self.ndi_audio_mixer.set_master_eq_band(band, gain_db=value),
+                                         label=f"{band_name} (dB)", from_=-12, to=12, resolution=0.5)
+            eq_slider.pack(side=TOP)
+            self.eq_sliders.append(eq_slider)
+
         # Compression controls
         compression_label = Label(self.effects_controls_frame, text="Compression")
         compression_label.pack(side=TOP)
 
-        self.compression_var = IntVar()
-        self.compression_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable Compression", variable=self.compression_var)
+        self.compression_var = IntVar(value=int(parameters.get_master('compression_enabled')))
+        self.compression_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable Compression", variable=self.compression_var,
+                                                   command=lambda: self.ndi_audio_mixer.set_compression_enabled(bool(self.compression_var.get())))
         self.compression_checkbutton.pack(side=TOP)
 
+        self.compression_threshold_slider = self.init_slider(self.effects_controls_frame, parameters.get_master('compression_threshold_db'),
+                                                             lambda value: self.ndi_audio_mixer.set_master_compression(threshold_db=value),
+                                                             label="Threshold (dB)", from_=-40, to=0, resolution=1)
+        self.compression_threshold_slider.pack(side=TOP)
+
         # Phase adjustment controls
         phase_label = Label(self.effects_controls_frame, text="Phase Adjustment")
         phase_label.pack(side=TOP)
 
-        self.phase_var = IntVar()
-        self.phase_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable Phase Adjustment", variable=self.phase_var)
+        self.phase_var = IntVar(value=int(parameters.get_master('phase_enabled')))
+        self.phase_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable Phase Adjustment", variable=self.phase_var,
+                                             command=lambda: self.ndi_audio_mixer.set_phase_enabled(bool(self.phase_var.get())))
         self.phase_checkbutton.pack(side=TOP)
 
+        self.phase_slider = self.init_slider(self.effects_controls_frame, parameters.get_master('phase_deg'),
+                                             lambda value: self.ndi_audio_mixer.set_master_phase(angle_deg=value),
+                                             label="Phase (deg)", from_=-180, to=180, resolution=1)
+        self.phase_slider.pack(side=TOP)
+
+        # Auto-mix controls
+        automix_label = Label(self.effects_controls_frame, text="Auto-mix")
+        automix_label.pack(side=TOP)
+
+        self.automix_var = IntVar(value=int(parameters.get_master('automix_enabled')))
+        self.automix_checkbutton = Checkbutton(self.effects_controls_frame, text="Enable Gain Sharing", variable=self.automix_var,
+                                               command=lambda: self.ndi_audio_mixer.set_automix_enabled(bool(self.automix_var.get())))
+        self.automix_checkbutton.pack(side=TOP)
+
+    def init_meter_bars(self):
+        # Create each meter's RMS bar and peak marker once; refreshes only move them
+        self.meter_items = []
+        for audio_meter in self.audio_meters + [self.mixed_audio_meter]:
+            rms_bar = audio_meter.create_rectangle(0, 0, 0, 20, fill="green", width=0)
+            peak_marker = audio_meter.create_line(0, 0, 0, 20, fill="red")
+            self.meter_items.append((audio_meter, rms_bar, peak_marker))
+        self.meter_positions = [(-1, -1)] * len(self.meter_items)
+        self.meter_colours = ["green"] * len(self.meter_items)
+        self.meter_sequence = -1
+        self.root.after(METER_REFRESH_MS, self.refresh_meters)
+
+    def refresh_meters(self):
+        # Runs on the Tk thread at about 30 Hz and redraws only the bars that moved;
+        # a bar turns red while its source has an alarm raised
+        snapshot = self.ndi_audio_mixer.meter_snapshot()
+        if snapshot.sequence != self.meter_sequence:
+            self.meter_sequence = snapshot.sequence
+            rows = len(snapshot.peak_db)
+            alarms = self.ndi_audio_mixer.alarm_state()
+            names = self.ndi_audio_mixer.ndi_names
+            for i, (audio_meter, rms_bar, peak_marker) in enumerate(self.meter_items):
+                row = i if i < len(self.meter_items) - 1 else rows - 1
+                if row >= rows:
+                    continue
+                name = 'master' if row == rows - 1 else names[row] if row < len(names) else None
+                colour = "red" if alarms.get(name, {}).get('alarms') else "green"
+                if colour != self.meter_colours[i]:
+                    self.meter_colours[i] = colour
+                    audio_meter.itemconfig(rms_bar, fill=colour)
+                rms_x = int(200 * min(max((snapshot.rms_db[row] + 60) / 60, 0), 1))
+                peak_x = int(200 * min(max((snapshot.peak_db[row] + 60) / 60, 0), 1))
+                if (rms_x, peak_x) != self.meter_positions[i]:
+                    self.meter_positions[i] = (rms_x, peak_x)
+                    audio_meter.coords(rms_bar, 0, 0, rms_x, 20)
+                    audio_meter.coords(peak_marker, peak_x, 0, peak_x, 20)
+        self.root.after(METER_REFRESH_MS, self.refresh_meters)
+
     def set_sender_name(self):
         new_name = self.sender_name_entry.get()
         self.ndi_audio_mixer.change_ndi_name(new_name)
 
-        def run(self):
-            with self.ndi_audio_mixer.output_stream.callback(
-                    lambda indata, outdata, frames, time, status: self.ndi_audio_mixer.mix_audio(
-                        indata, outdata, frames, time, status,
-                        self.volume_sliders, self.mute_buttons,
-                        self.master_volume_slider, self.audio_meters,
-                        self.mixed_audio_meter)):
-                self.root.mainloop()
-
-# Create the NDI Audio Mixer and user interface
-ndi_audio_mixer = NDI_Audio_Mixer(ndi_names)
-ndi_audio_mixer_ui = NDI_Audio_Mixer_UI(ndi_audio_mixer)
-ndi_audio_mixer_ui.run()
\ No newline at end of file
+    def run(self):
+        # The output stream calls mix_audio itself; the sliders push their values into the mix engine
+        self.ndi_audio_mixer.start()
+        try:
+            self.root.mainloop()
+        finally:
+            self.ndi_audio_mixer.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='NDI Audio Mixer')
+    parser.add_argument('--headless', action='store_true', help='run the mix engine without the Tk interface')
+    parser.add_argument('--ndi-backend', choices=sorted(ndi_runtime.BACKENDS),
+                        help='NDI binding to use; fake generates test sources offline (default: NDI_BACKEND or the first one installed)')
+    parser.add_argument('--config', default=CONFIG_FILE_NAME, help='source configuration file')
+    parser.add_argument('--sender-name', help='name of the mixed NDI output')
+    parser.add_argument('--control-host', default=DEFAULT_CONTROL_HOST, help='address of the HTTP control API')
+    parser.add_argument('--control-port', type=int, default=DEFAULT_CONTROL_PORT, help='port of the HTTP control API (0 disables it)')
+    parser.add_argument('--latency', choices=sorted(LATENCY_PROFILES), default=DEFAULT_LATENCY_PROFILE,
+                        help='latency profile: talkback for small blocks, program for safe mixing')
+    parser.add_argument('--blocksize', type=int, help='initial block size in frames, overriding the profile')
+    parser.add_argument('--adaptive', action='store_true', help='step the block size within the profile from callback headroom')
+    parser.add_argument('--dsp-workers', type=int, default=0,
+                        help='worker processes for the per-source DSP (0 runs it in the audio callback)')
+    parser.add_argument('--metrics-interval', type=float, default=TELEMETRY_LOG_SECONDS,
+                        help='seconds between audio telemetry log lines (0 disables them)')
+    parser.add_argument('--record-dir', help='directory for multitrack recordings; enables the record tap')
+    parser.add_argument('--record-format', choices=RECORD_FORMATS, default='wav',
+                        help='wav writes one multichannel WAV/RF64, flac one file per track')
+    parser.add_argument('--record-rotate', type=float, default=RECORD_ROTATE_SECONDS, help='seconds per recording file')
+    parser.add_argument('--record-preroll', type=float, default=RECORD_PREROLL_SECONDS,
+                        help='seconds of audio from before the start that each recording includes')
+    parser.add_argument('--record', action='store_true', help='start recording as soon as the mixer runs')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    # Read the configuration file
+    config = Configuration(args.config)
+    configuration_data = config.read()
+    ndi_names = configuration_data['ndi_sources']
+
+    # Create the NDI Audio Mixer with its saved settings, and its control API
+    profile = dict(LATENCY_PROFILES[args.latency])
+    if args.blocksize:
+        profile['blocksize'] = args.blocksize
+    ndi_audio_mixer = NDI_Audio_Mixer(ndi_names, dsp_workers=args.dsp_workers, backend=args.ndi_backend, **profile)
+    if 'mixer' in configuration_data:
+        ndi_audio_mixer.load_settings(configuration_data['mixer'])
+    if args.sender_name:
+        ndi_audio_mixer.change_ndi_name(args.sender_name)
+    if args.control_port:
+        control_server = ControlServer(ndi_audio_mixer, args.control_host, args.control_port, config)
+        control_server.start()
+    autosave_thread = MixerAutosaveThread(config, ndi_audio_mixer)
+    autosave_thread.start()
+    if args.metrics_interval:
+        TelemetryLogThread(ndi_audio_mixer, args.metrics_interval).start()
+    if args.adaptive:
+        BlockSizeController(ndi_audio_mixer).start()
+    if args.record_dir:
+        ndi_audio_mixer.enable_recording(args.record_dir, args.record_format, args.record_rotate, args.record_preroll)
+        if args.record:
+            ndi_audio_mixer.start_recording()
+
+    if args.headless:
+        ndi_audio_mixer.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ndi_audio_mixer.stop()
+    else:
+        ndi_audio_mixer_ui = NDI_Audio_Mixer_UI(ndi_audio_mixer)
+        ndi_audio_mixer_ui.run()
+    ndi_audio_mixer.close_dsp_pool()
+    ndi_audio_mixer.disable_recording()
+    autosave_thread.stop()
+    autosave_thread.save()
+    config.flush()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,320 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import sys
+import time
+import types
+import wave
+import ndi_runtime
+import numpy as np
+
+# Offline render and benchmark harness for NDI Audio Mixer 7 Main.py. The mixer is built on
+# the runtime's fake NDI backend, whatever NDI_BACKEND says, with a stand-in for sounddevice.
+# Its fake receivers play test tones and noise or looped WAV files, and mix_audio is driven
+# as fast as it will go, so it runs without NDI sources, a sound card or Tk. Stage costs
+# come from the mixer's own callback telemetry.
+
+# Define constants
+MIXER_FILE_NAME = 'NDI Audio Mixer 7 Main.py'
+DEFAULT_SOURCE_COUNTS = '4,16,32'
+DEFAULT_BLOCK_SIZES = '256,512,1024'
+DEFAULT_SAMPLE_RATE = 48000
+DEFAULT_CHANNELS = 2
+DEFAULT_SECONDS = 5.0
+WARMUP_BLOCKS = 20
+DEFAULT_TOLERANCE = 0.25
+SOURCE_LEVEL_DB = -10.0  # above the default compression threshold, so the compressors work
+BASE_FREQUENCY = 110.0
+
+# A stand-in for sounddevice
+class FakeOutputStream:
+    # Holds the callback instead of opening a device; the benchmark calls it directly
+    def __init__(self, samplerate, blocksize, channels, dtype, callback, latency=None):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.channels = channels
+        self.dtype = dtype
+        self.callback = callback
+        self.latency = latency
+        self.active = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def fake_sounddevice():
+    sounddevice = types.ModuleType('sounddevice')
+    sounddevice.OutputStream = FakeOutputStream
+    return sounddevice
+
+def load_mixer(path):
+    # Import the mixer script as a module with the stand-in in place of the sound card;
+    # NDI needs no stand-in, each mixer is given a fake backend
+    sys.modules['sounddevice'] = fake_sounddevice()
+    spec = importlib.util.spec_from_file_location('ndi_audio_mixer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Test audio
+def read_wav(path):
+    # 16, 24 or 32-bit PCM WAV as (frames, channels) float32
+    with wave.open(path, 'rb') as wav:
+        samplerate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        data = wav.readframes(wav.getnframes())
+    if width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) << 8 | raw[:, 1].astype(np.int32) << 16 | raw[:, 2].astype(np.int32) << 24) >> 8
+        scale = 2 ** 23
+    elif width in (2, 4):
+        samples = np.frombuffer(data, dtype=np.int16 if width == 2 else np.int32)
+        scale = 2 ** (8 * width - 1)
+    else:
+        raise ValueError(f"Unsupported sample width {width} in {path}")
+    return samplerate, (samples.astype(np.float32) / scale).reshape(-1, channels)
+
+def source_specs(names, source_rate=None, wav_files=None):
+    # Fake backend sources: the WAV files round-robin as looped clips, else alternating tones and noise
+    clips = [read_wav(path) for path in wav_files or []]
+    specs = []
+    for i, name in enumerate(names):
+        if clips:
+            samplerate, clip = clips[i % len(clips)]
+            specs.append({'name': name, 'audio': 'clip', 'clip': clip, 'sample_rate': samplerate,
+                          'channels': clip.shape[1]})
+        else:
+            specs.append({'name': name, 'audio': 'tone' if i % 2 == 0 else 'noise',
+                          'frequency': BASE_FREQUENCY * (i + 1), 'level_db': SOURCE_LEVEL_DB,
+                          'sample_rate': source_rate})
+    return specs
+
+# Benchmark
+class MixerBenchmark:
+    # One mixer instance at a given source count and block size, with every effect
+    # switched on unless bypass is set, driven block by block from the fake backend
+    def __init__(self, mixer_module, num_sources, blocksize, samplerate=DEFAULT_SAMPLE_RATE,
+                 channels=DEFAULT_CHANNELS, source_rate=None, wav_files=None, buses=0, bypass=False):
+        self.module = mixer_module
+        self.blocksize = blocksize
+        self.samplerate = samplerate
+        self.channels = channels
+        names = [f"Benchmark Source {i + 1}" for i in range(num_sources)]
+        backend = ndi_runtime.FakeBackend(sources=source_specs(names, source_rate or samplerate, wav_files),
+                                          sample_rate=samplerate, channels=channels, realtime=False)
+        self.mixer = mixer_module.NDI_Audio_Mixer(names, samplerate=samplerate, channels=channels, blocksize=blocksize,
+                                                  backend=backend)
+        self.mixer.discovery_thread.stop()
+        self.mixer.sender_thread.stop()
+        self.mixer.meter.stop()
+        self.mixer.meter.join()
+        self.sources = [self.own_source(i) for i in range(num_sources)]
+        for bus in range(buses):
+            self.mixer.add_bus(f"Aux {bus + 1}", default_send=0.5)
+            self.mixer.bus_senders[bus].stop()
+        if not bypass:
+            self.enable_effects()
+        self.outdata = np.zeros((blocksize, channels), dtype=np.float32)
+        self.off_thread_ns = {'receive': 0, 'meter analysis': 0}
+        self.feed()
+
+    def own_source(self, index):
+        # Swap the mixer's free-running receiver thread (the fake backend does not pace it) for
+        # an unstarted one on a fresh ring buffer, which the benchmark steps once per callback
+        mixer = self.mixer
+        mixer.stop_receiver_thread(index).join()
+        ring_buffer = mixer.new_ring_buffer()
+        mixer.ring_buffers[index] = ring_buffer
+        return self.module.SourceReceiverThread(mixer.receivers[index], ring_buffer, self.blocksize,
+                                                mixer.output_stream.samplerate, mixer.mix_engine.channels)
+
+    def enable_effects(self):
+        mixer = self.mixer
+        mixer.set_eq_enabled(True)
+        for band, gain_db in enumerate((3.0, -2.0, 1.5)):
+            mixer.set_master_eq_band(band, gain_db=gain_db)
+        mixer.set_compression_enabled(True)
+        mixer.set_phase_enabled(True)
+        mixer.set_master_phase(angle_deg=45.0)
+        for i in range(len(mixer.ndi_names)):
+            mixer.set_source_eq_enabled(i, True)
+            for band, gain_db in enumerate((-3.0, 2.0, 4.0)):
+                mixer.set_source_eq_band(i, band, gain_db=gain_db)
+            mixer.set_source_compression_enabled(i, True)
+            mixer.set_source_phase(i, angle_deg=90.0)
+            mixer.set_source_delay_ms(i, 20.0 + i)
+
+    def feed(self):
+        # Top every jitter buffer up to its target latency plus one block, so the callback never underruns
+        start = time.perf_counter_ns()
+        for source in self.sources:
+            ring_buffer = source.ring_buffer
+            while ring_buffer.fill_level() < ring_buffer.target_latency + self.blocksize:
+                source.receive()
+        self.off_thread_ns['receive'] += time.perf_counter_ns() - start
+
+    def drain(self):
+        # Stand in for the sender and meter threads so their queues never fill
+        mixer = self.mixer
+        for sender_thread in [mixer.sender_thread] + mixer.bus_senders:
+            sender_thread.read_index = sender_thread.write_index
+        meter = mixer.meter
+        start = time.perf_counter_ns()
+        while meter.read_index < meter.write_index:
+            slot = meter.read_index % meter.slots
+            meter.analyse(meter.blocks[slot, :, :meter.slot_frames[slot]])
+            meter.read_index += 1
+        meter.publish()
+        self.off_thread_ns['meter analysis'] += time.perf_counter_ns() - start
+
+    def run_block(self):
+        # Feed one block per source, then time a single audio callback
+        self.feed()
+        start = time.perf_counter_ns()
+        self.mixer.mix_audio(self.outdata, self.blocksize, None, None)
+        elapsed = time.perf_counter_ns() - start
+        self.drain()
+        return elapsed
+
+    def reset_counters(self):
+        mixer = self.mixer
+        mixer.telemetry = self.module.CallbackTelemetry(mixer.output_stream.samplerate, len(mixer.ndi_names))
+        for stage in self.off_thread_ns:
+            self.off_thread_ns[stage] = 0
+
+    def run(self, blocks):
+        # Callback durations in nanoseconds, after a short warm-up
+        for _ in range(WARMUP_BLOCKS):
+            self.run_block()
+        self.reset_counters()
+        gc.collect()
+        durations = np.empty(blocks, dtype=np.int64)
+        for block in range(blocks):
+            durations[block] = self.run_block()
+        return durations
+
+    def stage_costs(self):
+        # Mean µs per block for each stage of the last run: the callback's own telemetry,
+        # plus the receive and meter analysis work that runs off the audio thread
+        telemetry = self.mixer.telemetry
+        blocks = max(telemetry.callbacks, 1)
+        costs = {'receive': self.off_thread_ns['receive'] / blocks / 1000}
+        for stage, total in zip(telemetry.stages, telemetry.stage_ns):
+            costs[stage] = total / blocks / 1000
+        costs['meter analysis'] = self.off_thread_ns['meter analysis'] / blocks / 1000
+        return costs
+
+    def close(self):
+        mixer = self.mixer
+        for sender_thread in mixer.bus_senders:
+            sender_thread.stop()
+        mixer.stop()
+
+def summarize(durations, blocksize, samplerate):
+    # Callback cost against the deadline of one block of audio
+    budget_us = blocksize / samplerate * 1e6
+    durations_us = durations / 1000
+    mean_us = float(durations_us.mean())
+    p99_us = float(np.percentile(durations_us, 99))
+    return {'budget_us': budget_us, 'mean_us': mean_us, 'p99_us': p99_us, 'max_us': float(durations_us.max()),
+            'realtime_factor': budget_us / mean_us, 'headroom': 1.0 - p99_us / budget_us,
+            'xruns': int((durations_us > budget_us).sum())}
+
+def print_results(results):
+    print(f"{'sources':>7} {'block':>6} {'budget':>8} {'mean':>8} {'p99':>8} {'max':>8} {'RTF':>7} {'headroom':>8} {'xruns':>5}")
+    for result in results:
+        print(f"{result['sources']:>7} {result['blocksize']:>6} {result['budget_us']:>8.0f} {result['mean_us']:>8.0f} "
+              f"{result['p99_us']:>8.0f} {result['max_us']:>8.0f} {result['realtime_factor']:>7.1f} "
+              f"{result['headroom']:>8.0%} {result['xruns']:>5}")
+    print()
+    print('Per-stage cost (µs per block; receive and meter analysis run off the audio thread)')
+    stages = list(results[0]['stages']) if results else []
+    print(f"{'sources':>7} {'block':>6} " + ' '.join(f"{stage:>{max(len(stage), 7)}}" for stage in stages))
+    for result in results:
+        print(f"{result['sources']:>7} {result['blocksize']:>6} " +
+              ' '.join(f"{result['stages'][stage]:>{max(len(stage), 7)}.1f}" for stage in stages))
+
+def check_results(results, max_load=None, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    # Failures: p99 callback time over max_load of the deadline, when one is given, or slower than the baseline
+    failures = []
+    previous = {(result['sources'], result['blocksize']): result for result in (baseline or [])}
+    for result in results:
+        key = (result['sources'], result['blocksize'])
+        if max_load is not None and result['p99_us'] > max_load * result['budget_us']:
+            failures.append(f"{key[0]} sources x {key[1]} frames: p99 {result['p99_us']:.0f} µs is over "
+                            f"{max_load:.0%} of the {result['budget_us']:.0f} µs deadline")
+        if key in previous and result['p99_us'] > previous[key]['p99_us'] * (1 + tolerance):
+            failures.append(f"{key[0]} sources x {key[1]} frames: p99 {result['p99_us']:.0f} µs regressed from "
+                            f"{previous[key]['p99_us']:.0f} µs")
+    return failures
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for the NDI Audio Mixer DSP chain')
+    parser.add_argument('--mixer', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), MIXER_FILE_NAME),
+                        help='mixer script to benchmark')
+    parser.add_argument('--sources', default=DEFAULT_SOURCE_COUNTS, help='comma-separated source counts')
+    parser.add_argument('--blocks', default=DEFAULT_BLOCK_SIZES, help='comma-separated block sizes in frames')
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help='audio rendered per configuration')
+    parser.add_argument('--samplerate', type=int, default=DEFAULT_SAMPLE_RATE, help='bus sample rate')
+    parser.add_argument('--channels', type=int, default=DEFAULT_CHANNELS, help='bus channel count')
+    parser.add_argument('--source-rate', type=int, help='source sample rate, to include resampling in receive')
+    parser.add_argument('--wav', nargs='+', help='WAV files fed to the sources round-robin instead of test tones')
+    parser.add_argument('--buses', type=int, default=0, help='aux buses to mix and send')
+    parser.add_argument('--bypass', action='store_true', help='leave EQ, compression, phase and delay switched off')
+    parser.add_argument('--max-load', type=float,
+                        help='fail when p99 callback time exceeds this fraction of the deadline '
+                             '(default: no absolute limit, since what passes depends on the machine)')
+    parser.add_argument('--baseline', help='results file from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed p99 slowdown against the baseline, as a fraction')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    mixer_module = load_mixer(args.mixer)
+    results = []
+    for num_sources in parse_list(args.sources):
+        for blocksize in parse_list(args.blocks):
+            blocks = max(1, int(args.seconds * args.samplerate / blocksize))
+            benchmark = MixerBenchmark(mixer_module, num_sources, blocksize, args.samplerate, args.channels,
+                                       args.source_rate, args.wav, args.buses, args.bypass)
+            try:
+                result = summarize(benchmark.run(blocks), blocksize, args.samplerate)
+                result['stages'] = benchmark.stage_costs()
+            finally:
+                benchmark.close()
+            result.update(sources=num_sources, blocksize=blocksize)
+            results.append(result)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    failures = check_results(results, args.max_load, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 import cv2
 import pyautogui
-import PyNDI as ndi
+import ndi_runtime
 import numpy as np
 import time
 import tkinter as tk
@@ -9,6 +9,12 @@ import logging
 
 logging.basicConfig(filename='ndi_capture.log', level=logging.DEBUG)
 
+SOURCE_NAME = "Python NDI Source"
+
+# NDI is initialized once per process and the sender is pooled, so Start and Retry reuse them
+runtime = ndi_runtime.get_runtime(default='PyNDI')
+sender = None
+
 # Get the screen size
 screen_width, screen_height = pyautogui.size()
 
@@ -28,8 +34,7 @@ def process_and_send(screenshot):
 
         screenshot = cv2.resize(screenshot, (screen_width, screen_height), interpolation=cv2.INTER_AREA)
 
-        frame = ndi.VideoFrame.from_ndarray(screenshot)
-        sender.send_video(frame)
+        sender.send_video(screenshot)
     except Exception as e:
         logging.error(f"Error during processing or sending: {str(e)}")
         error_label.config(text=f"Error during processing or sending: {str(e)}")
@@ -37,17 +42,19 @@ def process_and_send(screenshot):
     return True
 
 def initialize_ndi():
-    if not ndi.initialize():
-        logging.error("Cannot initialize NDI")
-        error_label.config(text="Cannot initialize NDI")
+    try:
+        runtime.open()
+    except Exception as e:
+        logging.error(f"Cannot initialize NDI: {str(e)}")
+        error_label.config(text=f"Cannot initialize NDI: {str(e)}")
         root.quit()
 
 def create_ndi_sender():
     global sender
-    source_name = "Python NDI Source"
-    source = ndi.Source(source_name)
+    if sender is not None:
+        return
     try:
-        sender = ndi.Sender(source, ndi.FOURCC_VIDEO_TYPE_BGRA)
+        sender = runtime.acquire_sender(SOURCE_NAME)
     except Exception as e:
         logging.error(f"Cannot create NDI sender: {str(e)}")
         error_label.config(text=f"Cannot create NDI sender: {str(e)}")
@@ -79,9 +86,6 @@ def capture_and_send(frame_interval):
         if display_position_var.get():
             print(pyautogui.position())
 
-    del sender
-    ndi.finalize()
-
 def start_capture():
     initialize_ndi()
     create_ndi_sender()
@@ -148,3 +152,7 @@ error_label.grid(row=4, column=0, columnspan=3)
 
 root.mainloop()
 
+if sender is not None:
+    runtime.release_sender(SOURCE_NAME)
+runtime.close()
+
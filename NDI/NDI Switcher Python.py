@@ -2,45 +2,64 @@ import cv2
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-import dash_ndi
+import ndi_runtime
 from dash.dependencies import Input, Output
 from flask import Response
 from base64 import b64encode
 
 app = dash.Dash(__name__)
 
-ndi_send = dash_ndi.NDISend("My NDI Switcher Output", ["My NDI Switcher Group"])
+# One NDI runtime for the whole app: the finder is shared by every callback, and each
+# source's video is read by one feed whose newest frame goes to the program output and
+# every preview, so no consumer steals frames from another
+runtime = ndi_runtime.get_runtime(default='dash_ndi')
+ndi_send = runtime.acquire_sender("My NDI Switcher Output", ["My NDI Switcher Group"])
+program_source = None
+program_feed = None
+program_sequence = 0
+
+def to_bgr(frame):
+    # Bindings deliver BGR or BGRA; JPEG wants three channels
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR) if frame.ndim == 3 and frame.shape[2] == 4 else frame
 
 @app.callback(Output("ndi-sources", "children"), [Input("interval", "n_intervals")])
 def update_sources(n_intervals):
-    ndi_instance = dash_ndi.NDI()
-    ndi_instance.connect()
-    sources = ndi_instance.get_sources()
+    sources = runtime.find_sources()
     return [html.Button(source, id=f"ndi-source-{source}") for source in sources]
 
-@app.callback(Output("ndi-preview", "src"), [Input(f"ndi-source-{source}", "n_clicks") for source in dash_ndi.NDI().get_sources()])
+@app.callback(Output("ndi-preview", "src"), [Input(f"ndi-source-{source}", "n_clicks") for source in runtime.find_sources()])
 def switch_source(*args):
+    global program_source, program_feed, program_sequence
     ctx = dash.callback_context
     if not ctx.triggered:
         return ""
     source_name = ctx.triggered[0]["prop_id"].split("-")[-1]
-    dash_ndi.NDI().switch_source(source_name)
+    if source_name != program_source:
+        # Hold the new program source's feed before letting go of the old one
+        feed = runtime.acquire_video(source_name)
+        if program_source is not None:
+            runtime.release_video(program_source)
+        program_source, program_feed, program_sequence = source_name, feed, 0
     return f"/ndi-video/{source_name}"
 
 @app.server.route("/ndi-video/<source_name>")
 def serve_ndi_video(source_name):
     def generate():
-        ndi_receiver = dash_ndi.NDIReceiver(source_name)
-        while True:
-            try:
-                frame = ndi_receiver.recv()
-                if frame is None:
-                    continue
-                image = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
-                _, jpeg = cv2.imencode(".jpg", image)
-                yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n")
-            except Exception as e:
-                print(f"Error receiving NDI video: {e}")
+        feed = runtime.acquire_video(source_name)
+        sequence = 0
+        try:
+            while True:
+                try:
+                    frame, sequence = feed.latest(sequence)
+                    if frame is None:
+                        continue
+                    _, jpeg = cv2.imencode(".jpg", to_bgr(frame))
+                    yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n")
+                except Exception as e:
+                    print(f"Error receiving NDI video: {e}")
+        finally:
+            # The browser went away; the feed stops once nothing else uses it
+            runtime.release_video(source_name)
     return Response(generate(), mimetype="multipart/x-mixed-replace; boundary=frame")
 
 @app.callback(Output("ndi-video-preview", "src"), [Input("ndi-preview", "src")])
@@ -49,8 +68,17 @@ def update_preview(src):
 
 @app.callback(Output("ndi-video", "src"), [Input("interval", "n_intervals")])
 def update_video(n_intervals):
+    global program_sequence
     try:
-        _, jpeg = cv2.imencode(".jpg", ndi_send.recv())
+        feed = program_feed
+        if feed is None:
+            return ""
+        # Forward the program feed's newest frame to the output and show it
+        frame, program_sequence = feed.latest(program_sequence)
+        if frame is None:
+            return ""
+        ndi_send.send_video(frame)
+        _, jpeg = cv2.imencode(".jpg", to_bgr(frame))
         return f"data:image/jpeg;base64,{b64encode(jpeg.tobytes()).decode('utf-8')}"
     except Exception as e:
         print(f"Error updating NDI video: {e}")
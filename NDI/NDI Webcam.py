@@ -5,8 +5,7 @@ import pyfakewebcam
 import tkinter as tk
 from tkinter import ttk
 from threading import Thread
-from ndi_find import ndi_find
-from ndi_receive import ndi_receive
+import ndi_runtime
 
 # set the available resolutions
 resolutions = {
@@ -29,9 +28,11 @@ source_var.set('')
 source_dropdown = ttk.Combobox(window, textvariable=source_var)
 source_dropdown.pack(side=tk.TOP, padx=10, pady=10)
 
+# one NDI runtime for the app; each source is connected once and its receiver reused
+runtime = ndi_runtime.get_runtime(default='ndi_find')
+
 # fill the dropdown menu with available NDI sources
-sources = ndi_find()
-source_names = [source['name'] for source in sources]
+source_names = runtime.find_sources()
 source_dropdown['values'] = source_names
 
 # create a label and dropdown menu to select the webcam device
@@ -46,9 +47,6 @@ webcam_dropdown.pack(side=tk.TOP, padx=10, pady=10)
 webcam_devices = pyfakewebcam.list_devices()
 webcam_dropdown['values'] = webcam_devices
 
-# create an NDI receiver object
-recv = ndi_receive()
-
 # set the NDI source name to receive from
 recv_name = None
 
@@ -58,19 +56,30 @@ fourcc = cv2.VideoWriter_fourcc(*'MJPG')
 
 # create a fake webcam object
 webcam = None
+webcam_name = None
 
 # function to start capturing frames from the NDI stream
 def start_capture():
     global recv_name
     global webcam
+    recv = None
+    connected_name = None
     while True:
-        if recv_name is None:
+        # connect only when the selected source changes, not on every frame
+        if recv_name != connected_name:
+            if recv is not None:
+                runtime.release_receiver(connected_name)
+                recv = None
+            connected_name = recv_name
+            if connected_name:
+                recv = runtime.acquire_receiver(connected_name)
+        if recv is None:
+            time.sleep(1/fps)
             continue
-        recv.connect(recv_name)
-        frame = recv.recv()
+        frame = recv.receive_video()
         if frame is None:
             continue
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB if frame.shape[2] == 4 else cv2.COLOR_BGR2RGB)
         frame = cv2.resize(frame, (width, height))
         if webcam is not None:
             webcam.schedule_frame(frame)
@@ -94,8 +103,11 @@ update_source()
 # function to update the selected webcam device
 def update_webcam_device():
     global webcam
+    global webcam_name
     device_name = webcam_var.get()
-    webcam = pyfakewebcam.FakeWebcam(device_name, width, height)
+    if device_name and device_name != webcam_name:
+        webcam = pyfakewebcam.FakeWebcam(device_name, width, height)
+        webcam_name = device_name
     window.after(1000 // fps, update_webcam_device)
 
 # start updating the selected webcam device
@@ -104,3 +116,4 @@ update_webcam_device()
 # start the tkinter event loop
 start_capture_thread()
 window.mainloop()
+runtime.close()
@@ -0,0 +1,629 @@
+import importlib
+import os
+import queue
+import threading
+import time
+import zlib
+import numpy as np
+
+# One front end for the NDI bindings these tools use (pyndi, PyNDI, dash_ndi and the
+# ndi_find/ndi_receive pair), plus an in-process fake that needs no NDI runtime at all.
+# Every backend offers the same three calls:
+#
+#   backend.find_sources()         names of the sources on the network
+#   backend.receiver(name)         receive_audio(frames), receive_video(), audio_sample_rate, audio_channels
+#   backend.sender(name, groups)   send_audio(planar, sample_rate), send_video(frame), set_name(name)
+#
+# Received audio is float32, interleaved or (frames, channels); sent audio is planar
+# (channels, frames). Video frames are uint8 (height, width, channels) arrays in BGR or
+# BGRA order. Each handle keeps the binding's own object as .handle, for the calls only
+# that binding has. Choose a backend with open_backend(name) or the NDI_BACKEND
+# environment variable; otherwise the tool's default binding, then the first importable
+# one, wins. The fake backend is only used when asked for by name, so a missing binding
+# never goes unnoticed.
+#
+# Tools share one NDIRuntime per process (get_runtime()): the backend is opened once,
+# and receivers and senders are pooled by name with reference counts, so a handle is
+# connected once per source and reused, never once per frame or per button press.
+# A receiver hands each frame to whichever caller reads it first, so several consumers
+# of one source's video share a VideoFeed (acquire_video()) instead: one thread reads
+# the receiver and every consumer gets the newest frame.
+
+# Define constants
+BACKEND_ENVIRONMENT_VARIABLE = 'NDI_BACKEND'
+DEFAULT_BACKEND_ORDER = ['pyndi', 'PyNDI', 'dash_ndi', 'ndi_find']
+RECEIVE_TIMEOUT_SECONDS = 0.1
+FIND_CACHE_SECONDS = 1.0
+FAKE_WIDTH = 1280
+FAKE_HEIGHT = 720
+FAKE_FRAME_RATE = 30.0
+FAKE_SAMPLE_RATE = 48000
+FAKE_CHANNELS = 2
+FAKE_LEVEL_DB = -20.0
+FAKE_SOURCES = [
+    {'name': 'FAKE (Bars)', 'video': 'bars', 'audio': 'tone', 'frequency': 1000.0},
+    {'name': 'FAKE (Pattern)', 'video': 'pattern', 'audio': 'noise'},
+]
+LOOPBACK_QUEUE_BLOCKS = 32
+# 75% colour bars from left to right: white, yellow, cyan, green, magenta, red, blue (BGR)
+COLOUR_BARS = [(191, 191, 191), (0, 191, 191), (191, 191, 0), (0, 191, 0), (191, 0, 191), (0, 0, 191), (191, 0, 0)]
+
+# Handles
+class Receiver:
+    # What every backend's receiver looks like; each overrides the calls its binding supports
+    audio_sample_rate = None
+    audio_channels = None
+
+    def __init__(self, name, handle=None):
+        self.name = name
+        self.handle = handle
+
+    def receive_audio(self, frames):
+        raise NotImplementedError(f"{type(self).__name__} cannot receive audio")
+
+    def receive_video(self):
+        raise NotImplementedError(f"{type(self).__name__} cannot receive video")
+
+    def close(self):
+        pass
+
+class Sender:
+    def __init__(self, name, handle=None):
+        self.name = name
+        self.handle = handle
+
+    def send_audio(self, planar, sample_rate=None):
+        raise NotImplementedError(f"{type(self).__name__} cannot send audio")
+
+    def send_video(self, frame):
+        raise NotImplementedError(f"{type(self).__name__} cannot send video")
+
+    def set_name(self, name):
+        self.name = name
+
+    def close(self):
+        pass
+
+# pyndi
+class PyndiBackend:
+    # Audio finder, receivers and senders, as the audio mixer has always used them
+    name = 'pyndi'
+
+    def __init__(self):
+        self.module = importlib.import_module('pyndi')
+        self.handle = self.module.Finder()
+        self.sources = {}
+
+    def find_sources(self):
+        self.sources = {source.name: source for source in self.handle.get_sources()}
+        return list(self.sources)
+
+    def receiver(self, name):
+        if name not in self.sources:
+            self.find_sources()
+        if name not in self.sources:
+            raise LookupError(f"No NDI source named {name}")
+        receiver = self.module.Receiver()
+        receiver.create_receiver(self.sources[name])
+        return PyndiReceiver(name, receiver)
+
+    def sender(self, name, groups=None):
+        sender = self.module.Sender()
+        sender.create_source(self.module.AudioSource(name=name))
+        return PyndiSender(name, sender, self.module)
+
+    def close(self):
+        pass
+
+class PyndiReceiver(Receiver):
+    @property
+    def audio_sample_rate(self):
+        return self.handle.audio_sample_rate
+
+    @property
+    def audio_channels(self):
+        return self.handle.audio_channels
+
+    def receive_audio(self, frames):
+        return self.handle.receive_audio(frames)
+
+class PyndiSender(Sender):
+    def __init__(self, name, handle, module):
+        super().__init__(name, handle)
+        self.module = module
+
+    def send_audio(self, planar, sample_rate=None):
+        self.handle.send_audio(planar, sample_rate=sample_rate)
+
+    def set_name(self, name):
+        self.handle.create_source(self.module.AudioSource(name=name))
+        self.name = name
+
+# PyNDI
+class PyNDIBackend:
+    # BGRA video senders, as the screen capture tools use them
+    name = 'PyNDI'
+
+    def __init__(self):
+        self.module = importlib.import_module('PyNDI')
+        if not self.module.initialize():
+            raise RuntimeError("Cannot initialize NDI")
+
+    def find_sources(self):
+        raise NotImplementedError("The PyNDI backend cannot find sources")
+
+    def receiver(self, name):
+        raise NotImplementedError("The PyNDI backend cannot receive")
+
+    def sender(self, name, groups=None):
+        ndi = self.module
+        return PyNDISender(name, ndi.Sender(ndi.Source(name), ndi.FOURCC_VIDEO_TYPE_BGRA), ndi)
+
+    def close(self):
+        self.module.finalize()
+
+class PyNDISender(Sender):
+    def __init__(self, name, handle, module):
+        super().__init__(name, handle)
+        self.module = module
+
+    def send_video(self, frame):
+        self.handle.send_video(self.module.VideoFrame.from_ndarray(frame))
+
+# dash_ndi
+class DashNDIBackend:
+    # One connected finder for the whole process; .handle also switches sources
+    name = 'dash_ndi'
+
+    def __init__(self):
+        self.module = importlib.import_module('dash_ndi')
+        self.handle = self.module.NDI()
+        self.handle.connect()
+
+    def find_sources(self):
+        return list(self.handle.get_sources())
+
+    def receiver(self, name):
+        return DashNDIReceiver(name, self.module.NDIReceiver(name))
+
+    def sender(self, name, groups=None):
+        return DashNDISender(name, self.module.NDISend(name, list(groups or [])))
+
+    def close(self):
+        pass
+
+class DashNDIReceiver(Receiver):
+    def receive_video(self):
+        return self.handle.recv()
+
+class DashNDISender(Sender):
+    def send_video(self, frame):
+        self.handle.send(frame)
+
+# ndi_find / ndi_receive
+class NdiFindBackend:
+    name = 'ndi_find'
+
+    def __init__(self):
+        self.find = importlib.import_module('ndi_find').ndi_find
+        self.receive = importlib.import_module('ndi_receive').ndi_receive
+
+    def find_sources(self):
+        return [source['name'] for source in self.find()]
+
+    def receiver(self, name):
+        receiver = self.receive()
+        receiver.connect(name)
+        return NdiFindReceiver(name, receiver)
+
+    def sender(self, name, groups=None):
+        raise NotImplementedError("The ndi_find backend cannot send")
+
+    def close(self):
+        pass
+
+class NdiFindReceiver(Receiver):
+    def receive_video(self):
+        return self.handle.recv()
+
+# Test signals
+def colour_bars(width, height):
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., 3] = 255
+    edges = np.linspace(0, width, len(COLOUR_BARS) + 1).astype(int)
+    for colour, left, right in zip(COLOUR_BARS, edges[:-1], edges[1:]):
+        frame[:, left:right, :3] = colour
+    return frame
+
+def bars_frame(bars, index):
+    # Colour bars with a white block sweeping along the bottom, so stalls and dropped frames show
+    frame = bars.copy()
+    height, width = frame.shape[:2]
+    size = max(height // 8, 1)
+    x = index * 8 % max(width - size, 1)
+    frame[height - 2 * size:height - size, x:x + size, :3] = 255
+    return frame
+
+def pattern_frame(width, height, index):
+    # Diagonal ramps scrolling one step per frame: every pixel changes on every frame,
+    # the worst case for anything that compresses or diffs frames
+    x = (np.arange(width) % 256).astype(np.uint8)
+    y = ((np.arange(height) + index) % 256).astype(np.uint8)
+    ramp = x[None, :] + y[:, None]  # uint8, so it wraps at 256
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., 0] = ramp
+    frame[..., 1] = ramp[:, ::-1]
+    frame[..., 2] = 255 - ramp
+    frame[..., 3] = 255
+    return frame
+
+# Fake backend
+class FakeBackend:
+    # Deterministic sources generated in-process, plus loopback: whatever goes out through
+    # a fake sender shows up as a source that fake receivers can pull back. With realtime
+    # on, receivers block like a live stream; turn it off to load-test flat out.
+    name = 'fake'
+
+    def __init__(self, sources=None, width=FAKE_WIDTH, height=FAKE_HEIGHT, frame_rate=FAKE_FRAME_RATE,
+                 sample_rate=FAKE_SAMPLE_RATE, channels=FAKE_CHANNELS, realtime=True, seed=0):
+        self.sources = {spec['name']: spec for spec in (FAKE_SOURCES if sources is None else sources)}
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.realtime = realtime
+        self.seed = seed
+        self.loopback = {}
+        self.lock = threading.Lock()
+
+    def find_sources(self):
+        with self.lock:
+            return list(self.sources) + [name for name in self.loopback if name not in self.sources]
+
+    def receiver(self, name):
+        with self.lock:
+            sender = self.loopback.get(name)
+        if sender is not None:
+            return LoopbackReceiver(name, sender)
+        if name not in self.sources:
+            raise LookupError(f"No NDI source named {name}")
+        return FakeReceiver(name, self.sources[name], self)
+
+    def sender(self, name, groups=None):
+        sender = FakeSender(name, self)
+        with self.lock:
+            self.loopback[name] = sender
+        return sender
+
+    def rename(self, sender, name):
+        with self.lock:
+            if self.loopback.get(sender.name) is sender:
+                del self.loopback[sender.name]
+            self.loopback[name] = sender
+
+    def remove(self, sender):
+        with self.lock:
+            if self.loopback.get(sender.name) is sender:
+                del self.loopback[sender.name]
+
+    def close(self):
+        pass
+
+class FakeReceiver(Receiver):
+    # Generates its source's test signals on demand. Audio is a tone, seeded noise or
+    # the spec's 'clip', a float32 (frames, channels) array played in a loop; video is
+    # bars or a moving pattern. The same name and seed always give the same samples and pixels.
+    def __init__(self, name, spec, backend):
+        super().__init__(name, spec)
+        self.spec = spec
+        self.audio_sample_rate = spec.get('sample_rate', backend.sample_rate)
+        self.audio_channels = spec.get('channels', backend.channels)
+        self.frame_rate = spec.get('frame_rate', backend.frame_rate)
+        self.width = spec.get('width', backend.width)
+        self.height = spec.get('height', backend.height)
+        self.realtime = backend.realtime
+        self.level = 10 ** (spec.get('level_db', FAKE_LEVEL_DB) / 20)
+        self.rng = np.random.default_rng([backend.seed, zlib.crc32(name.encode())])
+        self.bars = colour_bars(self.width, self.height) if spec.get('video') == 'bars' else None
+        self.audio_position = 0
+        self.video_position = 0
+        self.start = None
+
+    def pace(self, position, rate):
+        # Block until position / rate seconds after the first call, as a live stream would
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now
+        delay = self.start + position / rate - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def receive_audio(self, frames):
+        kind = self.spec.get('audio')
+        if kind is None:
+            if self.realtime:
+                time.sleep(RECEIVE_TIMEOUT_SECONDS)
+            return None
+        position = self.audio_position
+        self.audio_position += frames
+        self.pace(self.audio_position, self.audio_sample_rate)
+        if kind == 'clip':
+            clip = self.spec['clip']
+            return clip[(position + np.arange(frames)) % len(clip)]
+        if kind == 'tone':
+            t = (position + np.arange(frames)) / self.audio_sample_rate
+            mono = self.level * np.sin(2 * np.pi * self.spec.get('frequency', 1000.0) * t)
+        elif kind == 'noise':
+            mono = self.level * self.rng.standard_normal(frames)
+        else:
+            mono = np.zeros(frames)
+        return np.repeat(mono.astype(np.float32)[:, None], self.audio_channels, axis=1)
+
+    def receive_video(self):
+        kind = self.spec.get('video')
+        if kind is None:
+            if self.realtime:
+                time.sleep(RECEIVE_TIMEOUT_SECONDS)
+            return None
+        index = self.video_position
+        self.video_position += 1
+        self.pace(self.video_position, self.frame_rate)
+        if kind == 'bars':
+            return bars_frame(self.bars, index)
+        return pattern_frame(self.width, self.height, index)
+
+class FakeSender(Sender):
+    # Keeps the newest video frame and a short queue of audio blocks for loopback receivers
+    def __init__(self, name, backend):
+        super().__init__(name)
+        self.backend = backend
+        self.sample_rate = backend.sample_rate
+        self.channels = backend.channels
+        self.audio = queue.Queue(LOOPBACK_QUEUE_BLOCKS)
+        self.video = None
+        self.video_sequence = 0
+        self.video_ready = threading.Condition()
+        self.sent_audio_blocks = 0
+        self.dropped_audio_blocks = 0
+
+    def send_audio(self, planar, sample_rate=None):
+        # Copy, since callers reuse their send buffers
+        block = np.array(np.asarray(planar, dtype=np.float32).T)
+        self.sample_rate = sample_rate or self.sample_rate
+        self.channels = block.shape[1]
+        self.sent_audio_blocks += 1
+        try:
+            self.audio.put_nowait(block)
+        except queue.Full:
+            self.dropped_audio_blocks += 1
+
+    def send_video(self, frame):
+        with self.video_ready:
+            self.video = np.array(frame)
+            self.video_sequence += 1
+            self.video_ready.notify_all()
+
+    def set_name(self, name):
+        self.backend.rename(self, name)
+        self.name = name
+
+    def close(self):
+        self.backend.remove(self)
+
+class LoopbackReceiver(Receiver):
+    # Audio blocks go to whichever loopback receiver takes them first; every receiver sees each new frame
+    def __init__(self, name, sender):
+        super().__init__(name, sender)
+        self.video_sequence = 0
+
+    @property
+    def audio_sample_rate(self):
+        return self.handle.sample_rate
+
+    @property
+    def audio_channels(self):
+        return self.handle.channels
+
+    def receive_audio(self, frames):
+        try:
+            return self.handle.audio.get(timeout=RECEIVE_TIMEOUT_SECONDS)
+        except queue.Empty:
+            return None
+
+    def receive_video(self):
+        sender = self.handle
+        with sender.video_ready:
+            if not sender.video_ready.wait_for(lambda: sender.video_sequence != self.video_sequence,
+                                               RECEIVE_TIMEOUT_SECONDS):
+                return None
+            self.video_sequence = sender.video_sequence
+            return sender.video
+
+# Video fan-out
+class VideoFeed(threading.Thread):
+    # The one reader of a source's video. It keeps the newest frame and a sequence number;
+    # each consumer remembers the last sequence it saw and waits for a newer one, so a
+    # slow consumer skips frames without taking them from anyone else.
+    def __init__(self, runtime, name):
+        super().__init__(daemon=True)
+        self.runtime = runtime
+        self.name = name
+        self.receiver = runtime.acquire_receiver(name)
+        self.frame = None
+        self.sequence = 0
+        self.error = None
+        self.ready = threading.Condition()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                frame = self.receiver.receive_video()
+                if frame is None:
+                    continue
+                with self.ready:
+                    self.frame = frame
+                    self.sequence += 1
+                    self.ready.notify_all()
+        except Exception as error:
+            # Consumers see the failure instead of waiting on a feed that went quiet
+            with self.ready:
+                self.error = error
+                self.ready.notify_all()
+
+    def latest(self, sequence=0, timeout=RECEIVE_TIMEOUT_SECONDS):
+        # The newest frame after sequence and its own sequence, or (None, sequence) on timeout
+        with self.ready:
+            self.ready.wait_for(lambda: self.sequence != sequence or self.error is not None, timeout)
+            if self.error is not None:
+                raise self.error
+            if self.sequence == sequence:
+                return None, sequence
+            return self.frame, self.sequence
+
+    def close(self):
+        self.stop_event.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join(RECEIVE_TIMEOUT_SECONDS * 2)
+        self.runtime.release_receiver(self.name)
+
+# Backend selection
+BACKENDS = {
+    'pyndi': PyndiBackend,
+    'PyNDI': PyNDIBackend,
+    'dash_ndi': DashNDIBackend,
+    'ndi_find': NdiFindBackend,
+    'fake': FakeBackend,
+}
+
+def register_backend(name, factory):
+    # Add or replace a backend; factory(**options) must return an object with the calls above
+    BACKENDS[name] = factory
+
+def open_backend(name=None, default=None, **options):
+    # An explicit name, else NDI_BACKEND, else the default binding and then the usual order
+    name = name or os.environ.get(BACKEND_ENVIRONMENT_VARIABLE)
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown NDI backend {name!r}; choose from {', '.join(BACKENDS)}")
+        return BACKENDS[name](**options)
+    for name in ([default] if default else []) + DEFAULT_BACKEND_ORDER:
+        try:
+            return BACKENDS[name](**options)
+        except ImportError:
+            continue
+    raise ImportError(f"No NDI binding found; install one or set {BACKEND_ENVIRONMENT_VARIABLE}=fake")
+
+# Shared runtime
+class NDIRuntime:
+    # One backend per process, opened on first use, with receivers and senders pooled by
+    # name. Acquiring a name that is already open hands back the same handle and bumps
+    # its count; the handle is closed when its last user releases it. Source lists come
+    # from the backend's one finder, cached briefly so UI polling does not rescan.
+    # backend is a name for open_backend() or an already opened backend.
+    def __init__(self, backend=None, default=None, **options):
+        self.backend_name = backend if backend is None or isinstance(backend, str) else backend.name
+        self.default = default
+        self.options = options
+        self.backend = None if backend is None or isinstance(backend, str) else backend
+        self.lock = threading.RLock()
+        self.receivers = {}
+        self.senders = {}
+        self.video_feeds = {}
+        self.sources = []
+        self.sources_time = None
+
+    def open(self):
+        with self.lock:
+            if self.backend is None:
+                self.backend = open_backend(self.backend_name, self.default, **self.options)
+            return self.backend
+
+    def find_sources(self, max_age=FIND_CACHE_SECONDS):
+        with self.lock:
+            now = time.monotonic()
+            if self.sources_time is None or now - self.sources_time >= max_age:
+                self.sources = self.open().find_sources()
+                self.sources_time = now
+            return list(self.sources)
+
+    def acquire_receiver(self, name):
+        return self.acquire(self.receivers, name, lambda: self.open().receiver(name))
+
+    def release_receiver(self, name):
+        self.release(self.receivers, name)
+
+    def acquire_video(self, name):
+        # The source's shared VideoFeed, started by its first user
+        with self.lock:
+            started = name in self.video_feeds
+            feed = self.acquire(self.video_feeds, name, lambda: VideoFeed(self, name))
+            if not started:
+                feed.start()
+            return feed
+
+    def release_video(self, name):
+        self.release(self.video_feeds, name)
+
+    def acquire_sender(self, name, groups=None):
+        return self.acquire(self.senders, name, lambda: self.open().sender(name, groups))
+
+    def release_sender(self, name):
+        self.release(self.senders, name)
+
+    def acquire(self, pool, name, create):
+        with self.lock:
+            entry = pool.get(name)
+            if entry is None:
+                entry = pool[name] = [create(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, pool, name):
+        with self.lock:
+            entry = pool.get(name)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del pool[name]
+        entry[0].close()
+
+    def state(self):
+        with self.lock:
+            return {'backend': self.backend.name if self.backend is not None else None,
+                    'receivers': {name: users for name, (_, users) in self.receivers.items()},
+                    'senders': {name: users for name, (_, users) in self.senders.items()},
+                    'video_feeds': {name: users for name, (_, users) in self.video_feeds.items()}}
+
+    def close(self):
+        # Stop the video feeds, close every pooled handle, then the backend itself (PyNDI finalizes here, once)
+        with self.lock:
+            feeds = [feed for feed, _ in self.video_feeds.values()]
+            self.video_feeds.clear()
+        for feed in feeds:
+            feed.close()
+        with self.lock:
+            handles = [handle for pool in (self.receivers, self.senders) for handle, _ in pool.values()]
+            self.receivers.clear()
+            self.senders.clear()
+            backend, self.backend = self.backend, None
+        for handle in handles:
+            handle.close()
+        if backend is not None:
+            backend.close()
+
+shared_runtime = None
+shared_runtime_lock = threading.Lock()
+
+def get_runtime(backend=None, default=None, **options):
+    # The process-wide runtime, created by the first caller; later callers share it
+    global shared_runtime
+    with shared_runtime_lock:
+        if shared_runtime is None:
+            shared_runtime = NDIRuntime(backend, default, **options)
+        return shared_runtime
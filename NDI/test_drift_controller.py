@@ -0,0 +1,92 @@
+import importlib.util
+import os
+import sys
+import types
+import numpy as np
+import pytest
+
+# Five simulated minutes of a source whose clock runs fast or slow against the sound card.
+# The mixer's own SourceRingBuffer and DriftController run against a simulated clock;
+# the resampler is modelled as an exact fractional sample count, so only the loop is tested.
+
+MIXER_FILE_NAME = 'NDI Audio Mixer 7 Main.py'
+SAMPLE_RATE = 48000
+FRAMES = 1024
+LATENCY_MS = 40
+SIMULATED_SECONDS = 300.0
+BUFFER_SETTLED_AFTER_SECONDS = 60.0
+DRIFT_SETTLED_AFTER_SECONDS = 120.0
+
+class FakeOutputStream:
+    # Stands in for the sound card; the simulation drives the ring buffer directly
+    def __init__(self, *args, **kwargs):
+        pass
+
+def load_mixer():
+    # Import the mixer script with a stand-in for sounddevice, so no audio stack is needed
+    sounddevice = types.ModuleType('sounddevice')
+    sounddevice.OutputStream = FakeOutputStream
+    sys.modules['sounddevice'] = sounddevice
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), MIXER_FILE_NAME)
+    spec = importlib.util.spec_from_file_location('ndi_audio_mixer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+mixer = load_mixer()
+
+def simulate(ppm, jitter_seconds=0.0, seconds=SIMULATED_SECONDS, seed=0):
+    # Sender blocks arrive every FRAMES samples of the sender's clock (plus network jitter),
+    # the callback reads FRAMES samples every FRAMES / SAMPLE_RATE seconds; returns the
+    # drift estimate and buffer level once a second, and the ring buffer
+    rng = np.random.default_rng(seed)
+    now = [0.0]
+    ring_buffer = mixer.SourceRingBuffer(SAMPLE_RATE, 2, SAMPLE_RATE * LATENCY_MS // 1000, clock=lambda: now[0])
+    drift = mixer.DriftController(SAMPLE_RATE, ring_buffer.target_latency)
+    block = np.zeros((2 * FRAMES, 2), dtype=np.float32)
+    out = np.zeros((FRAMES, 2), dtype=np.float32)
+    send_period = FRAMES / (SAMPLE_RATE * (1 + ppm * 1e-6))
+    read_period = FRAMES / SAMPLE_RATE
+    sent = 0
+    send_time = read_time = next_report = 0.0
+    fraction = 0.0
+    ratio_adjust = 1.0
+    history = []
+    while min(send_time, read_time) < seconds:
+        if send_time <= read_time:
+            now[0] = send_time
+            fraction += FRAMES / ratio_adjust
+            count = int(fraction)
+            fraction -= count
+            ring_buffer.write(block[:count])
+            if ring_buffer.primed:
+                ratio_adjust = drift.update(ring_buffer.buffered_frames(send_time, SAMPLE_RATE), send_time)
+            sent += 1
+            send_time = sent * send_period + rng.uniform(0.0, jitter_seconds)
+        else:
+            now[0] = read_time
+            ring_buffer.read_into(out)
+            read_time += read_period
+            if read_time >= next_report:
+                history.append((read_time, drift.drift_ppm, drift.buffer_ms))
+                next_report += 1.0
+    return np.array(history), ring_buffer
+
+@pytest.mark.parametrize('ppm', [200.0, -200.0, 500.0, -500.0])
+def test_drift_estimate_converges(ppm):
+    history, ring_buffer = simulate(ppm)
+    buffer_settled = history[history[:, 0] >= BUFFER_SETTLED_AFTER_SECONDS]
+    assert np.all(np.abs(buffer_settled[:, 2] - LATENCY_MS) < 1.0)
+    drift_settled = history[history[:, 0] >= DRIFT_SETTLED_AFTER_SECONDS]
+    assert np.all(np.abs(drift_settled[:, 1] - ppm) < 5.0)
+    assert ring_buffer.underruns == 0
+    assert ring_buffer.overruns == 0
+
+def test_drift_estimate_converges_with_jitter():
+    history, ring_buffer = simulate(200.0, jitter_seconds=0.01)
+    buffer_settled = history[history[:, 0] >= BUFFER_SETTLED_AFTER_SECONDS]
+    assert np.all(np.abs(buffer_settled[:, 2] - LATENCY_MS) < 1.0)
+    drift_settled = history[history[:, 0] >= DRIFT_SETTLED_AFTER_SECONDS]
+    assert abs(np.mean(drift_settled[:, 1]) - 200.0) < 5.0
+    assert np.all(np.abs(drift_settled[:, 1] - 200.0) < 25.0)
+    assert ring_buffer.underruns == 0